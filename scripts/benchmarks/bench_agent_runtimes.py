@@ -0,0 +1,142 @@
+# scripts/benchmarks/bench_agent_runtimes.py
+#
+# Compares running N agents as N separate interpreters (what `replicas: N`
+# gives, one container per agent) with the process-pool supervisor
+# (AGENT_RUNTIME=pool, src/rl_agent/supervisor.py) running the same N agents.
+#
+# Reports, per setup: processes started, memory per logical agent (PSS from
+# /proc/<pid>/smaps_rollup, so pages shared after fork are not double counted),
+# pulls/sec (from the beliefs:version counter every update bumps) and pulls per
+# CPU-second, i.e. pulls/sec per fully used core. Linux only.
+#
+# Usage (needs a running Redis and slot machine API; the agents update its live beliefs):
+#   python scripts/benchmarks/bench_agent_runtimes.py --agents 20 --pull-interval 0.1 \
+#       --redis-host localhost --api-url http://localhost:8000
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import redis
+
+AGENT_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "src", "rl_agent")
+BELIEFS_VERSION_KEY = "beliefs:version"
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+def process_tree(root_pid: int) -> list[int]:
+    """`root_pid` and all its descendants, from /proc."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    pids, stack = [], [root_pid]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+
+def pss_mb(pid: int) -> float:
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return 0.0
+
+
+def cpu_seconds(pid: int) -> float:
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS # utime + stime
+    except (OSError, IndexError, ValueError):
+        return 0.0
+
+
+def sample(roots: list[int]) -> tuple[int, float, float]:
+    pids = [pid for root in roots for pid in process_tree(root)]
+    return len(pids), sum(pss_mb(pid) for pid in pids), sum(cpu_seconds(pid) for pid in pids)
+
+
+def bench(args, setup: str) -> dict:
+    client = redis.Redis(host=args.redis_host, port=args.redis_port)
+    env = {
+        **os.environ,
+        "REDIS_HOST": args.redis_host, "REDIS_PORT": str(args.redis_port), "API_BASE_URL": args.api_url,
+        "PULL_INTERVAL_SECONDS": str(args.pull_interval), "LOG_INTERVAL_SECONDS": "3600",
+    }
+    if setup == "pool":
+        env.update({"AGENT_RUNTIME": "pool", "POOL_AGENT_COUNT": str(args.agents), "POOL_PROCESSES": str(args.processes)})
+        commands = [env]
+    else:
+        # One interpreter per agent; distinct metrics ports, as separate containers would have.
+        commands = [{**env, "AGENT_RUNTIME": "sync", "METRICS_PORT": str(9200 + i)} for i in range(args.agents)]
+
+    procs = [
+        subprocess.Popen([sys.executable, "-u", "main.py"], cwd=AGENT_DIR, env=e,
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for e in commands
+    ]
+    try:
+        time.sleep(args.warmup)
+        roots = [p.pid for p in procs]
+        _, _, cpu_before = sample(roots)
+        version_before = int(client.get(BELIEFS_VERSION_KEY) or 0)
+        started = time.monotonic()
+        time.sleep(args.duration)
+        elapsed = time.monotonic() - started
+        num_processes, memory, cpu_after = sample(roots)
+        pulls = int(client.get(BELIEFS_VERSION_KEY) or 0) - version_before
+    finally:
+        for p in procs:
+            p.send_signal(signal.SIGTERM)
+        for p in procs:
+            try:
+                p.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+    return {
+        "setup": setup,
+        "processes": num_processes,
+        "memory_per_agent_mb": memory / args.agents,
+        "pulls_per_sec": pulls / elapsed,
+        "pulls_per_cpu_second": pulls / max(cpu_after - cpu_before, 1e-9),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark one process per agent against the process-pool supervisor.")
+    parser.add_argument("--redis-host", default=os.getenv("REDIS_HOST", "localhost"))
+    parser.add_argument("--redis-port", type=int, default=int(os.getenv("REDIS_PORT", 6379)))
+    parser.add_argument("--api-url", default=os.getenv("API_BASE_URL", "http://localhost:8000"))
+    parser.add_argument("--agents", type=int, default=20)
+    parser.add_argument("--processes", type=int, default=0, help="Pool workers; 0 = one per available core.")
+    parser.add_argument("--pull-interval", type=float, default=0.1, help="Seconds between an agent's pulls.")
+    parser.add_argument("--warmup", type=float, default=10.0)
+    parser.add_argument("--duration", type=float, default=20.0)
+    args = parser.parse_args()
+
+    print(f"{'setup':>12} {'processes':>10} {'MB/agent':>9} {'pulls/s':>9} {'pulls/cpu-s':>12}")
+    for setup in ("per-process", "pool"):
+        r = bench(args, setup)
+        print(f"{r['setup']:>12} {r['processes']:>10} {r['memory_per_agent_mb']:>9.2f} {r['pulls_per_sec']:>9.1f} "
+              f"{r['pulls_per_cpu_second']:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
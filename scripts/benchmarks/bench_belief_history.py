@@ -0,0 +1,70 @@
+# scripts/benchmarks/bench_belief_history.py
+#
+# Costs of the visualizer's belief history (src/visualizer/history.py), fed
+# with synthetic posteriors at one snapshot per simulated second:
+#   - record: time per snapshot, and memory, which stays fixed however long
+#     the run (compared with keeping every snapshot, the naive alternative)
+#   - query: latency and JSON size of one GET /history body (history_payload)
+#     for dashboard ranges from 15 minutes to 7 days
+#
+# Usage (no services needed):
+#   python scripts/benchmarks/bench_belief_history.py
+#   python scripts/benchmarks/bench_belief_history.py --arms 5 100 --days 8
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(__file__), "..", "..", "src")
+sys.path.insert(0, os.path.join(ROOT, "rl_agent")) # belief_store.py and instrumentation.py, copied into the image
+sys.path.insert(0, os.path.join(ROOT, "visualizer"))
+from app import history_payload  # noqa: E402
+from history import BeliefHistory  # noqa: E402
+
+RANGES = {"15m": 900, "1h": 3600, "6h": 21600, "24h": 86400, "7d": 604800}
+
+
+def simulate(num_arms: int, seconds: int, rng: np.random.Generator) -> tuple[BeliefHistory, float, float]:
+    """A history after `seconds` snapshots of drifting posteriors; returns it, the end time and seconds/record."""
+    history = BeliefHistory([str(i) for i in range(num_arms)])
+    t0 = 1_700_000_000.0
+    mu = rng.normal(0.0, 1.0, num_arms)
+    posteriors = np.tile([0.0, 1.0, 0.2, 0.2], (num_arms, 1))
+    started = time.perf_counter()
+    for s in range(seconds):
+        mu += rng.normal(0.0, 0.01, num_arms)
+        posteriors[:, 0] = mu
+        posteriors[:, 1:] += (1.0, 0.5, 0.5)
+        history.record(t0 + s, posteriors)
+    return history, t0 + seconds, (time.perf_counter() - started) / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the multi-resolution belief history.")
+    parser.add_argument("--arms", type=int, nargs="+", default=[5, 100])
+    parser.add_argument("--days", type=float, default=2.0, help="Simulated run length, at one snapshot per second.")
+    parser.add_argument("--points", type=int, default=500, help="Points per query, as the dashboard asks.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    seconds = int(args.days * 86400)
+    for num_arms in args.arms:
+        history, end, record_s = simulate(num_arms, seconds, rng)
+        naive_mb = seconds * num_arms * 4 * 8 / 1e6 # every (K, 4) float64 snapshot kept
+        print(f"\narms={num_arms}: {seconds:,} snapshots, record {1e6 * record_s:.1f} us each, "
+              f"memory {history.nbytes / 1e6:.2f} MB (keeping every snapshot: {naive_mb:.1f} MB)")
+        print(f"{'range':>6} {'tier':>5} {'points':>7} {'query ms':>9} {'body kB':>8}")
+        for name, span in RANGES.items():
+            t0 = time.perf_counter()
+            body = history_payload(history, end - span, end, args.points)
+            elapsed = time.perf_counter() - t0
+            payload = json.loads(body)
+            print(f"{name:>6} {payload['tier']:>5} {len(payload['t']):>7} {1000.0 * elapsed:>9.2f} {len(body) / 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# scripts/benchmarks/bench_belief_storage.py
+#
+# Compares the two belief layouts (BELIEF_STORAGE) for several arm counts:
+#   hash    one arm:<id> hash of four text fields per arm
+#   packed  all arms as float64 in one string (src/rl_agent/belief_store.py)
+#
+# Reports, per layout: Redis memory (MEMORY USAGE summed over the layout's
+# keys), latency of a full posterior read (ThompsonSamplingAgent._read_posteriors)
+# and latency of one single-reward update_belief.
+#
+# Usage (needs a running Redis; uses a scratch database that gets FLUSHED):
+#   python scripts/benchmarks/bench_belief_storage.py --host localhost --db 15
+#   python scripts/benchmarks/bench_belief_storage.py --arms 10 1000 100000
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import redis
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src", "rl_agent"))
+from agent import ThompsonSamplingAgent  # noqa: E402
+from belief_store import PACKED_BELIEFS_KEY, PACKED_ARMS_KEY  # noqa: E402
+
+
+def memory_usage(client: redis.Redis, keys: list[str]) -> int:
+    pipe = client.pipeline(transaction=False)
+    for key in keys:
+        pipe.memory_usage(key, samples=0)
+    return sum(size or 0 for size in pipe.execute())
+
+
+def timed(fn, duration: float, min_runs: int = 5) -> np.ndarray:
+    """Calls `fn` repeatedly for about `duration` seconds and returns the latencies in ms."""
+    latencies = []
+    start = time.perf_counter()
+    while len(latencies) < min_runs or time.perf_counter() - start < duration:
+        t0 = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+    return np.array(latencies)
+
+
+def bench(client: redis.Redis, num_arms: int, storage: str, duration: float) -> dict:
+    client.flushdb()
+    arm_ids = [str(i) for i in range(num_arms)]
+    agent = ThompsonSamplingAgent(arm_ids=arm_ids, redis_client=client, belief_storage=storage)
+
+    keys = [PACKED_BELIEFS_KEY, PACKED_ARMS_KEY] if storage == "packed" else [f"arm:{a}" for a in arm_ids]
+    memory = memory_usage(client, keys)
+    reads = timed(agent._read_posteriors, duration)
+    updates = timed(lambda: agent.update_belief(random.choice(arm_ids), random.gauss(0.0, 1.0)), duration)
+
+    return {
+        "arms": num_arms,
+        "storage": storage,
+        "memory_bytes": memory,
+        "read_p50_ms": float(np.percentile(reads, 50)),
+        "read_p99_ms": float(np.percentile(reads, 99)),
+        "update_p50_ms": float(np.percentile(updates, 50)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the hash and packed belief layouts.")
+    parser.add_argument("--host", default=os.getenv("REDIS_HOST", "localhost"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("REDIS_PORT", 6379)))
+    parser.add_argument("--db", type=int, default=15)
+    parser.add_argument("--duration", type=float, default=2.0, help="Seconds per measurement.")
+    parser.add_argument("--arms", type=int, nargs="+", default=[10, 100, 1_000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    client = redis.Redis(host=args.host, port=args.port, db=args.db)
+    print(f"{'arms':>8} {'storage':>8} {'memory':>12} {'bytes/arm':>10} {'read p50 ms':>12} "
+          f"{'read p99 ms':>12} {'update p50 ms':>14}")
+    for num_arms in args.arms:
+        for storage in ("hash", "packed"):
+            r = bench(client, num_arms, storage, args.duration)
+            print(f"{r['arms']:>8} {r['storage']:>8} {r['memory_bytes']:>12,} {r['memory_bytes'] / num_arms:>10.1f} "
+                  f"{r['read_p50_ms']:>12.3f} {r['read_p99_ms']:>12.3f} {r['update_p50_ms']:>14.3f}")
+    client.flushdb()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# scripts/benchmarks/bench_delta_updates.py
+#
+# Update throughput versus staleness as replicas scale, for a converged fleet
+# where every replica updates the same hot arm:
+#   script     one atomic Lua update (and stream append) per reward
+#   delta@T    sufficient statistics accumulated per replica and merged into
+#              Redis every T seconds (BELIEF_UPDATE_MODE=delta)
+#
+# Replicas are ThompsonSamplingAgent instances shared round-robin by a few
+# worker threads. Reports, per configuration: rewards applied/sec, Redis round
+# trips per reward, mean staleness (seconds between a reward arriving and it
+# reaching the shared posterior) and a lost-update check on the hot arm.
+#
+# Usage (needs a running Redis; uses a scratch database that gets FLUSHED):
+#   python scripts/benchmarks/bench_delta_updates.py --host localhost --db 15
+#   python scripts/benchmarks/bench_delta_updates.py --replicas 10 100 500 --flush-intervals 0.1 1.0
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import redis
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src", "rl_agent"))
+from agent import ThompsonSamplingAgent  # noqa: E402
+
+ARM_IDS = ["0", "1", "2", "3", "4"]
+HOT_ARM = "1"
+
+
+def bench(pool: redis.ConnectionPool, num_replicas: int, flush_interval, threads: int, duration: float) -> dict:
+    client = redis.Redis(connection_pool=pool)
+    client.flushdb()
+    mode = "script" if flush_interval is None else "delta"
+    replicas = [
+        ThompsonSamplingAgent(
+            arm_ids=ARM_IDS, redis_client=redis.Redis(connection_pool=pool),
+            update_mode=mode, flush_interval=flush_interval or 0.0,
+        )
+        for _ in range(num_replicas)
+    ]
+    stop = threading.Event()
+
+    def worker(owned):
+        rewards = np.random.normal(5.0, 1.0, 10_000)
+        i = 0
+        while not stop.is_set():
+            for agent in owned:
+                agent.update_belief(HOT_ARM, float(rewards[i % len(rewards)]))
+                i += 1
+
+    workers = [threading.Thread(target=worker, args=(replicas[t::threads],)) for t in range(min(threads, num_replicas))]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    # Staleness covers the rewards flushed during the run; the rest are merged
+    # by hand below, only so the lost-update check sees everything.
+    staleness = sum(a.stats["staleness_seconds"] for a in replicas)
+    pending = sum(int(a._pending_stats[0].sum()) for a in replicas)
+    for agent in replicas:
+        agent.flush()
+
+    updates = sum(a.stats["updates"] for a in replicas)
+    nu = float(client.hget(f"arm:{HOT_ARM}", "nu"))
+    return {
+        "mode": mode if flush_interval is None else f"delta@{flush_interval:g}",
+        "replicas": num_replicas,
+        "updates_per_sec": updates / elapsed,
+        "round_trips_per_update": sum(a.stats["round_trips"] for a in replicas) / updates,
+        "staleness_ms": 1000.0 * staleness / max(updates - pending, 1) if mode == "delta" else 0.0,
+        # nu grows by exactly 1 per applied reward, so this checks no update was lost.
+        "lost_updates": int(round(1.0 + updates - nu)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark delta-accumulated belief updates against per-reward updates.")
+    parser.add_argument("--host", default=os.getenv("REDIS_HOST", "localhost"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("REDIS_PORT", 6379)))
+    parser.add_argument("--db", type=int, default=15)
+    parser.add_argument("--replicas", type=int, nargs="+", default=[10, 50, 100, 500])
+    parser.add_argument("--flush-intervals", type=float, nargs="+", default=[0.1, 0.5, 1.0])
+    parser.add_argument("--threads", type=int, default=8, help="Worker threads driving the replicas.")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per configuration.")
+    args = parser.parse_args()
+
+    pool = redis.ConnectionPool(host=args.host, port=args.port, db=args.db, max_connections=args.threads + 4)
+    print(f"{'mode':>10} {'replicas':>9} {'updates/s':>12} {'rt/update':>10} {'staleness ms':>13} {'lost':>5}")
+    for num_replicas in args.replicas:
+        for flush_interval in [None, *args.flush_intervals]:
+            r = bench(pool, num_replicas, flush_interval, args.threads, args.duration)
+            print(f"{r['mode']:>10} {r['replicas']:>9} {r['updates_per_sec']:>12,.0f} {r['round_trips_per_update']:>10.4f} "
+                  f"{r['staleness_ms']:>13.1f} {r['lost_updates']:>5}")
+    redis.Redis(connection_pool=pool).flushdb()
+
+
+if __name__ == "__main__":
+    main()
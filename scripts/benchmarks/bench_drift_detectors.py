@@ -0,0 +1,109 @@
+# scripts/benchmarks/bench_drift_detectors.py
+#
+# Benchmarks the change-point detectors in src/rl_agent/drift_detector.py on
+# synthetic reward traces:
+#   - throughput in observations/sec for batched update() and vectorized step()
+#   - detection delay versus false-alarm rate while sweeping each detector's threshold
+#
+# Every trace is N(pre_mean, std) until the change point and N(post_mean, std) after it.
+#
+# Usage:
+#   python scripts/benchmarks/bench_drift_detectors.py
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src", "rl_agent"))
+from drift_detector import DETECTORS  # noqa: E402
+
+# Threshold-like parameter swept per detector, from sensitive to conservative.
+SWEEPS = {
+    "page_hinkley": ("threshold", [10.0, 25.0, 50.0, 100.0]),
+    "cusum": ("threshold", [5.0, 8.0, 10.0, 15.0]),
+    "adwin": ("delta", [0.1, 0.01, 0.002, 0.0001]),
+}
+
+
+def make_traces(rng, num_traces, length, change_at, pre_mean, post_mean, std):
+    traces = rng.normal(pre_mean, std, size=(num_traces, length))
+    traces[:, change_at:] += post_mean - pre_mean
+    return traces
+
+
+def throughput(name, rng, num_streams=100, batch_size=1000, batches=20):
+    detector = DETECTORS[name](num_streams)
+    values = rng.normal(0.0, 1.0, size=(batches, batch_size))
+    start = time.perf_counter()
+    for i, batch in enumerate(values):
+        detector.update(i % num_streams, batch)
+    batch_rate = values.size / (time.perf_counter() - start)
+
+    detector = DETECTORS[name](num_streams)
+    steps = 200 if name == "adwin" else 2000
+    values = rng.normal(0.0, 1.0, size=(steps, num_streams))
+    streams = np.arange(num_streams)
+    start = time.perf_counter()
+    for row in values:
+        detector.step(streams, row)
+    step_rate = values.size / (time.perf_counter() - start)
+    return batch_rate, step_rate
+
+
+def delay_vs_false_alarms(name, param, value, traces, change_at):
+    num_traces, length = traces.shape
+    detector = DETECTORS[name](num_traces, **{param: value})
+    streams = np.arange(num_traces)
+    false_alarms = 0
+    first_detection = np.full(num_traces, -1)
+    for t in range(length):
+        directions = detector.step(streams, traces[:, t])
+        if t < change_at:
+            false_alarms += int(np.count_nonzero(directions))
+        else:
+            newly = (directions != 0) & (first_detection < 0)
+            first_detection[newly] = t
+    detected = first_detection >= 0
+    delay = float(np.mean(first_detection[detected] - change_at)) if detected.any() else float("nan")
+    return {
+        "false_alarms_per_1k": 1000.0 * false_alarms / (num_traces * change_at),
+        "mean_delay": delay,
+        "missed": 1.0 - detected.mean(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming drift detectors.")
+    parser.add_argument("--traces", type=int, default=200)
+    parser.add_argument("--length", type=int, default=3000)
+    parser.add_argument("--change-at", type=int, default=2000)
+    parser.add_argument("--pre-mean", type=float, default=5.0)
+    parser.add_argument("--post-mean", type=float, default=4.0)
+    parser.add_argument("--std", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    print("Throughput (observations/sec)")
+    print(f"{'detector':>14} {'update()':>14} {'step()':>14}")
+    for name in DETECTORS:
+        batch_rate, step_rate = throughput(name, rng)
+        print(f"{name:>14} {batch_rate:>14,.0f} {step_rate:>14,.0f}")
+
+    traces = make_traces(rng, args.traces, args.length, args.change_at, args.pre_mean, args.post_mean, args.std)
+    print(f"\nDetection delay vs false alarms ({args.pre_mean} -> {args.post_mean}, std {args.std}, {args.traces} traces)")
+    print(f"{'detector':>14} {'param':>16} {'FA/1k obs':>10} {'delay':>8} {'missed':>7}")
+    for name, (param, values) in SWEEPS.items():
+        # ADWIN is a per-observation Python loop; keep its sweep small.
+        subset = traces[: max(args.traces // 10, 10)] if name == "adwin" else traces
+        for value in values:
+            r = delay_vs_false_alarms(name, param, value, subset, args.change_at)
+            print(f"{name:>14} {f'{param}={value:g}':>16} {r['false_alarms_per_1k']:>10.3f} "
+                  f"{r['mean_delay']:>8.1f} {r['missed']:>7.1%}")
+
+
+if __name__ == "__main__":
+    main()
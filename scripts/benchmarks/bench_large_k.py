@@ -0,0 +1,120 @@
+# scripts/benchmarks/bench_large_k.py
+#
+# Decision latency of select_arm at large arm counts, for three selection setups:
+#   full          one vectorized Thompson sample per arm (SAMPLE_CHUNK_SIZE=0)
+#   chunked       the same, drawn SAMPLE_CHUNK_SIZE arms at a time
+#   pruned        ARM_SELECTION=pruned: only the CandidateIndex contenders plus one
+#                 exact draw for the arms at the prior (src/rl_agent/arm_index.py),
+#                 or every arm when the index keeps more than half of them
+# over three belief states written straight into the packed layout:
+#   cold          every arm at the prior
+#   warm          1% of the arms explored with 1-100 rewards each
+#   converged     every arm explored a few times, the best 1% thousands of times
+#
+# All setups use the packed storage with a long posterior cache, so decisions
+# are measured on a cached snapshot; "refresh ms" is the snapshot read (plus
+# the index build, when pruning) that every POSTERIOR_CACHE_TTL_SECONDS costs.
+# "coverage" is the share of full-mode decisions that the pruned setup could
+# have made (arm among the candidates or at the prior): at least 1 - tolerance.
+#
+# Usage (needs a running Redis; uses a scratch database that gets FLUSHED):
+#   python scripts/benchmarks/bench_large_k.py --host localhost --db 15
+#   python scripts/benchmarks/bench_large_k.py --arms 100000 --decisions 5000
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import redis
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src", "rl_agent"))
+from agent import ThompsonSamplingAgent, normal_gamma_update  # noqa: E402
+from belief_store import BELIEF_PRIOR, PACKED_BELIEFS_KEY, pack_beliefs  # noqa: E402
+
+SETUPS = {
+    "full": {"arm_selection": "full", "sample_chunk_size": 0},
+    "chunked": {"arm_selection": "full"},
+    "pruned": {"arm_selection": "pruned"},
+}
+
+
+def belief_state(num_arms: int, state: str, rng: np.random.Generator) -> np.ndarray:
+    """(K, 4) posteriors after drawing rewards ~ N(true mean, 1), true means ~ N(0, 1)."""
+    true_means = rng.normal(0.0, 1.0, num_arms)
+    pulls = np.zeros(num_arms, dtype=np.int64)
+    if state == "warm":
+        explored = rng.choice(num_arms, size=max(1, num_arms // 100), replace=False)
+        pulls[explored] = rng.integers(1, 101, size=len(explored))
+    elif state == "converged":
+        pulls[:] = 3
+        pulls[np.argsort(-true_means)[:max(1, num_arms // 100)]] = 2000
+    posteriors = np.tile(np.asarray(BELIEF_PRIOR), (num_arms, 1))
+    n = pulls[pulls > 0]
+    mean = rng.normal(true_means[pulls > 0], 1.0 / np.sqrt(n))
+    m2 = rng.chisquare(np.maximum(n - 1, 1)) * (n > 1)
+    posteriors[pulls > 0] = normal_gamma_update(posteriors[pulls > 0], n, mean, m2)
+    return posteriors
+
+
+def bench(client, arm_ids, setup: dict, decisions: int, tolerance: float) -> tuple[dict, ThompsonSamplingAgent]:
+    agent = ThompsonSamplingAgent(
+        arm_ids=arm_ids, redis_client=client, belief_storage="packed", posterior_cache_ttl=3600.0,
+        prune_tolerance=tolerance, **setup,
+    )
+    t0 = time.perf_counter()
+    agent.select_arm() # Reads the snapshot (and builds the index)
+    refresh = time.perf_counter() - t0
+    latencies = np.empty(decisions)
+    for i in range(decisions):
+        t0 = time.perf_counter()
+        agent.select_arm()
+        latencies[i] = time.perf_counter() - t0
+    return {
+        "refresh_ms": 1000.0 * refresh,
+        "p50_us": 1e6 * float(np.percentile(latencies, 50)),
+        "p99_us": 1e6 * float(np.percentile(latencies, 99)),
+    }, agent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark arm selection at large arm counts.")
+    parser.add_argument("--host", default=os.getenv("REDIS_HOST", "localhost"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("REDIS_PORT", 6379)))
+    parser.add_argument("--db", type=int, default=15)
+    parser.add_argument("--arms", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--states", nargs="+", default=["cold", "warm", "converged"])
+    parser.add_argument("--decisions", type=int, default=2000, help="Timed decisions per setup.")
+    parser.add_argument("--coverage-decisions", type=int, default=200, help="Full-mode decisions checked for coverage.")
+    parser.add_argument("--tolerance", type=float, default=0.01, help="PRUNE_TOLERANCE of the pruned setup.")
+    args = parser.parse_args()
+
+    client = redis.Redis(host=args.host, port=args.port, db=args.db)
+    rng = np.random.default_rng(0)
+    print(f"{'arms':>8} {'state':>10} {'setup':>8} {'refresh ms':>11} {'p50 us':>9} {'p99 us':>9} "
+          f"{'candidates':>11} {'coverage':>9}")
+    for num_arms in args.arms:
+        arm_ids = [str(i) for i in range(num_arms)]
+        for state in args.states:
+            client.flushdb()
+            ThompsonSamplingAgent(arm_ids=arm_ids, redis_client=client, belief_storage="packed")
+            client.set(PACKED_BELIEFS_KEY, pack_beliefs(belief_state(num_arms, state, rng)))
+            agents = {}
+            for name, setup in SETUPS.items():
+                r, agents[name] = bench(client, arm_ids, setup, args.decisions, args.tolerance)
+                candidates = coverage = ""
+                if name == "pruned":
+                    index = agents[name]._index
+                    candidates = f"{len(index.candidates):,}"
+                    allowed = index.is_prior.copy()
+                    allowed[index.candidates] = True
+                    full = agents["full"]
+                    coverage = f"{np.mean([allowed[full._thompson_choices()] for _ in range(args.coverage_decisions)]):.3f}"
+                print(f"{num_arms:>8} {state:>10} {name:>8} {r['refresh_ms']:>11.2f} {r['p50_us']:>9.1f} "
+                      f"{r['p99_us']:>9.1f} {candidates:>11} {coverage:>9}")
+    client.flushdb()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# scripts/benchmarks/bench_orchestrator_modes.py
+#
+# Compares the orchestrator's convergence detection in polling mode (re-read
+# every arm each CHECK_INTERVAL_SECONDS) and push mode (follow the belief
+# updates published by the agents). Simulated agents pull the arms of
+# slot_machine_api/config.py directly, without the HTTP API.
+#
+# Reports, per mode: time until convergence is declared, Redis commands/sec
+# sent by the orchestrator, and pub/sub messages/sec it received.
+#
+# Usage (needs a running Redis; uses a scratch database that gets FLUSHED):
+#   python scripts/benchmarks/bench_orchestrator_modes.py --host localhost --db 15
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import redis
+
+ROOT = os.path.join(os.path.dirname(__file__), "..", "..", "src")
+sys.path.insert(0, os.path.join(ROOT, "rl_agent"))
+sys.path.insert(0, os.path.join(ROOT, "orchestrator"))
+from agent import ThompsonSamplingAgent  # noqa: E402
+from simulator import load_arm_configs  # noqa: E402
+import orchestrator  # noqa: E402
+
+
+class CountingRedis(redis.Redis):
+    """Counts the commands sent through this client (pub/sub traffic is counted separately)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.commands = 0
+
+    def execute_command(self, *args, **options):
+        self.commands += 1
+        return super().execute_command(*args, **options)
+
+
+def run_agents(pool, arm_configs, num_agents, pull_rate, stop):
+    arm_ids = sorted(arm_configs)
+
+    def worker():
+        agent = ThompsonSamplingAgent(arm_ids=arm_ids, redis_client=redis.Redis(connection_pool=pool))
+        interval = 1.0 / pull_rate
+        while not stop.is_set():
+            arm_id = agent.select_arm(mode="LEARNING")
+            config = arm_configs[arm_id]
+            agent.update_belief(arm_id, float(np.random.normal(config["mean"], config["std_dev"])))
+            time.sleep(interval)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(num_agents)]
+    for t in threads:
+        t.start()
+    return threads
+
+
+def bench(args, mode):
+    pool = redis.ConnectionPool(host=args.host, port=args.port, db=args.db)
+    admin = redis.Redis(connection_pool=pool)
+    admin.flushdb()
+    arm_configs = load_arm_configs()
+    ThompsonSamplingAgent(arm_ids=sorted(arm_configs), redis_client=admin) # initialize the prior
+
+    client = CountingRedis(host=args.host, port=args.port, db=args.db, decode_responses=True)
+    stream_client = redis.Redis(host=args.host, port=args.port, db=args.db)
+    orchestrator.CHECK_INTERVAL_SECONDS = args.check_interval
+    monitor = orchestrator.SystemMonitor(client, sorted(arm_configs), stream_client, orchestrator_mode=mode)
+
+    stop = threading.Event()
+    started = time.monotonic()
+    threads = run_agents(pool, arm_configs, args.agents, args.pull_rate, stop)
+    while monitor.mode == "CONVERGENCE_DETECTION" and time.monotonic() - started < args.timeout:
+        monitor.run()
+        if not monitor.push:
+            time.sleep(args.check_interval)
+    elapsed = time.monotonic() - started
+    stop.set()
+    for t in threads:
+        t.join()
+
+    return {
+        "mode": mode,
+        "converged": monitor.mode == "DRIFT_MONITORING",
+        "detection_seconds": elapsed,
+        "commands_per_sec": client.commands / elapsed,
+        "messages_per_sec": (monitor.updates_seen if monitor.push else 0) / elapsed,
+        "best_arm": monitor.converged_best_arm,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark polling vs push convergence detection.")
+    parser.add_argument("--host", default=os.getenv("REDIS_HOST", "localhost"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("REDIS_PORT", 6379)))
+    parser.add_argument("--db", type=int, default=15)
+    parser.add_argument("--agents", type=int, default=10)
+    parser.add_argument("--pull-rate", type=float, default=1.0, help="Pulls/sec per agent.")
+    parser.add_argument("--check-interval", type=float, default=orchestrator.CHECK_INTERVAL_SECONDS)
+    parser.add_argument("--timeout", type=float, default=600.0)
+    args = parser.parse_args()
+
+    print(f"{'mode':>8} {'converged':>10} {'best':>5} {'detect (s)':>11} {'cmds/s':>8} {'msgs/s':>8}")
+    for mode in ("polling", "push"):
+        r = bench(args, mode)
+        print(f"{r['mode']:>8} {str(r['converged']):>10} {str(r['best_arm']):>5} {r['detection_seconds']:>11.1f} "
+              f"{r['commands_per_sec']:>8.2f} {r['messages_per_sec']:>8.2f}")
+    redis.Redis(host=args.host, port=args.port, db=args.db).flushdb()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# scripts/benchmarks/bench_pull_throughput.py
+#
+# Compares pulls/sec of one client against the slot machine API:
+# one GET /choose_arm per pull (what the agent did) versus minibatches
+# through POST /choose_arms in each response format.
+#
+# Usage (needs the API running, e.g. via docker-compose):
+#   python scripts/benchmarks/bench_pull_throughput.py --api http://localhost:8000
+
+import argparse
+import os
+import time
+
+import msgpack
+import numpy as np
+import requests
+
+
+def bench_single(api_url: str, duration: float) -> float:
+    pulls = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        response = requests.get(f"{api_url}/choose_arm", params={"arm_id": 1})
+        response.raise_for_status()
+        response.json()["reward"]
+        pulls += 1
+    return pulls / (time.perf_counter() - start)
+
+
+def bench_batch(api_url: str, batch_size: int, fmt: str, duration: float) -> float:
+    pulls = 0
+    # Spread the batch over the five default arms, like a learning agent would.
+    counts = np.full(5, batch_size // 5)
+    counts[0] += batch_size - counts.sum()
+    body = {"pulls": [[arm_id, int(count)] for arm_id, count in enumerate(counts)]}
+
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        response = requests.post(f"{api_url}/choose_arms", params={"format": fmt}, json=body)
+        response.raise_for_status()
+        if fmt == "raw":
+            np.frombuffer(response.content, dtype="<f8")
+        elif fmt == "msgpack":
+            np.frombuffer(msgpack.unpackb(response.content)["rewards"], dtype="<f8")
+        else:
+            np.asarray(response.json()["rewards"])
+        pulls += batch_size
+    return pulls / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark single vs batched arm pulls.")
+    parser.add_argument("--api", default=os.getenv("API_BASE_URL", "http://localhost:8000"))
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds per configuration.")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    single = bench_single(args.api, args.duration)
+    print(f"{'mode':>22} {'pulls/s':>12} {'speedup':>8}")
+    print(f"{'GET /choose_arm':>22} {single:>12.1f} {1.0:>8.1f}")
+    for batch_size in args.batch_sizes:
+        for fmt in ("json", "msgpack", "raw"):
+            rate = bench_batch(args.api, batch_size, fmt, args.duration)
+            label = f"batch={batch_size} {fmt}"
+            print(f"{label:>22} {rate:>12.1f} {rate / single:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
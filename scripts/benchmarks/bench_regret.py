@@ -0,0 +1,57 @@
+# scripts/benchmarks/bench_regret.py
+#
+# Regret benchmark on the in-process simulator (src/rl_agent/simulator.py).
+# Replays the README drift demo (arm 1 -> 0.0, arm 0 -> 6.0) halfway through
+# the run and prints cumulative regret, convergence/drift counts and
+# simulated steps/sec for each drift detector.
+#
+# Usage:
+#   python scripts/benchmarks/bench_regret.py --instances 1000 --steps 2000
+#   python scripts/benchmarks/bench_regret.py --fail-above 700   # regression gate
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src", "rl_agent"))
+from simulator import BanditSimulator  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated regret benchmark.")
+    parser.add_argument("--instances", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--check-every", type=int, default=10)
+    parser.add_argument("--detectors", nargs="+", default=["page_hinkley", "cusum"])
+    parser.add_argument("--no-drift", action="store_true", help="Skip the scripted drift.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fail-above", type=float, default=None,
+                        help="Exit with status 1 if the final mean cumulative regret exceeds this value.")
+    args = parser.parse_args()
+
+    drift_at = args.steps // 2
+    schedule = [] if args.no_drift else [(drift_at, "1", 0.0), (drift_at, "0", 6.0)]
+    checkpoints = sorted({args.steps // 4, drift_at - 1, 3 * args.steps // 4, args.steps - 1})
+
+    header = " ".join(f"{f'R@{c + 1}':>9}" for c in checkpoints)
+    print(f"{'detector':>14} {header} {'p90 final':>10} {'converged':>10} {'drifts':>7} {'steps/s':>12}")
+    worst = 0.0
+    for detector in args.detectors:
+        result = BanditSimulator(
+            num_instances=args.instances, num_steps=args.steps, drift_schedule=schedule,
+            check_every=args.check_every, drift_detector=detector, seed=args.seed,
+        ).run()
+        curve = result["cumulative_regret"]
+        values = " ".join(f"{curve[c]:>9.1f}" for c in checkpoints)
+        print(f"{detector:>14} {values} {result['regret_quantiles'][2, -1]:>10.1f} "
+              f"{int(result['convergences'].sum()):>10} {int(result['drift_detections'].sum()):>7} "
+              f"{result['steps_per_sec']:>12,.0f}")
+        worst = max(worst, float(curve[-1]))
+
+    if args.fail_above is not None and worst > args.fail_above:
+        print(f"FAIL: final cumulative regret {worst:.1f} is above {args.fail_above}.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# scripts/benchmarks/bench_reward_generation.py
+#
+# Compares the slot machine API's reward generation before and after per-arm
+# streams (src/slot_machine_api/rewards.py):
+#   global   one call into NumPy's global RandomState per pull (or per arm of a
+#            batch), as the handlers did before
+#   streams  per-arm Generators with pre-generated buffers that pulls index into
+#
+# Reports raw rewards/sec of the generator alone, then p50/p99 latency of the
+# /choose_arm and /choose_arms handlers called in-process (no HTTP), and checks
+# that two seeded runs with differently batched pulls serve identical rewards.
+#
+# Usage (no services needed):
+#   python scripts/benchmarks/bench_reward_generation.py
+#   python scripts/benchmarks/bench_reward_generation.py --pulls 200000 --batch 1000
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(__file__), "..", "..", "src")
+sys.path.insert(0, os.path.join(ROOT, "rl_agent")) # instrumentation.py, copied next to the API in its image
+sys.path.insert(0, os.path.join(ROOT, "slot_machine_api"))
+import main as api  # noqa: E402
+from rewards import RewardStreams  # noqa: E402
+
+
+class GlobalRandom:
+    """
+    The previous reward path behind the RewardStreams interface: the handlers'
+    np.random.normal(loc=..., scale=...) calls on NumPy's global RandomState.
+    """
+
+    def next(self, arm_id: str) -> float:
+        return np.random.normal(loc=0.0, scale=1.0)
+
+    def take(self, arm_id: str, count: int) -> np.ndarray:
+        return np.random.normal(loc=0.0, scale=1.0, size=count)
+
+
+def generator_rate(source, arm_ids: list[str], pulls: int, batch: int) -> float:
+    """Rewards/sec of `source` alone: single draws when batch == 1, else `batch` draws spread over the arms."""
+    started = time.perf_counter()
+    if batch == 1:
+        for i in range(pulls):
+            source.next(arm_ids[i % len(arm_ids)])
+    else:
+        per_arm = max(batch // len(arm_ids), 1)
+        for _ in range(pulls // batch):
+            for arm_id in arm_ids:
+                source.take(arm_id, per_arm)
+    return pulls / (time.perf_counter() - started)
+
+
+def handler_latency(source, arm_ids: list[str], calls: int, batch: int) -> tuple[float, float]:
+    """p50/p99 microseconds of one handler call with `source` serving the rewards."""
+    api.reward_streams = source
+    per_arm = max(batch // len(arm_ids), 1)
+    body = api.ArmPullBatch(pulls=[(int(arm_id), per_arm) for arm_id in arm_ids])
+    latencies = np.empty(calls)
+    for i in range(calls):
+        t0 = time.perf_counter()
+        if batch == 1:
+            api.choose_arm(int(arm_ids[i % len(arm_ids)]))
+        else:
+            api.choose_arms(body, format="raw")
+        latencies[i] = time.perf_counter() - t0
+    return 1e6 * float(np.percentile(latencies, 50)), 1e6 * float(np.percentile(latencies, 99))
+
+
+def replay_identical(arm_ids: list[str], seed: int) -> bool:
+    """Two runs with the same seed, one pulling singly and one in uneven batches, serve the same rewards."""
+    single, batched = RewardStreams(arm_ids, seed), RewardStreams(arm_ids, seed, buffer_size=100)
+    a = np.concatenate([[single.next(arm_id) for _ in range(1000)] for arm_id in arm_ids])
+    b = np.concatenate([np.concatenate([batched.take(arm_id, n) for n in (1, 63, 400, 536)]) for arm_id in arm_ids])
+    return bool(np.array_equal(a, b))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark global RNG calls against per-arm buffered reward streams.")
+    parser.add_argument("--pulls", type=int, default=100_000, help="Rewards drawn per generator measurement.")
+    parser.add_argument("--calls", type=int, default=20_000, help="Handler calls per latency measurement.")
+    parser.add_argument("--batch", type=int, default=1000, help="Pulls per /choose_arms request.")
+    parser.add_argument("--buffer-size", type=int, default=4096)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    arm_ids = list(api.current_arm_configs)
+    sources = {
+        "global": lambda: GlobalRandom(),
+        "streams": lambda: RewardStreams(arm_ids, args.seed, buffer_size=args.buffer_size),
+    }
+
+    print(f"{'source':>8} {'pulls/call':>11} {'rewards/s':>12} {'handler p50 us':>15} {'handler p99 us':>15}")
+    for batch in (1, args.batch):
+        for name, make in sources.items():
+            rate = generator_rate(make(), arm_ids, args.pulls, batch)
+            p50, p99 = handler_latency(make(), arm_ids, args.calls if batch == 1 else args.calls // 10, batch)
+            print(f"{name:>8} {batch:>11} {rate:>12,.0f} {p50:>15.2f} {p99:>15.2f}")
+    print(f"\nseeded replay identical across batchings: {replay_identical(arm_ids, args.seed)}")
+
+
+if __name__ == "__main__":
+    main()
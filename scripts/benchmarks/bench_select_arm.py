@@ -0,0 +1,68 @@
+# scripts/benchmarks/bench_select_arm.py
+#
+# Measures decisions/sec and Redis commands per decision of
+# ThompsonSamplingAgent.select_arm for several arm counts, with and without
+# the local posterior cache.
+#
+# Usage (needs a running Redis; uses a scratch database that gets FLUSHED):
+#   python scripts/benchmarks/bench_select_arm.py --host localhost --db 15
+
+import argparse
+import os
+import sys
+import time
+
+import redis
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src", "rl_agent"))
+from agent import ThompsonSamplingAgent  # noqa: E402
+
+
+def total_commands(client: redis.Redis) -> int:
+    return int(client.info("stats")["total_commands_processed"])
+
+
+def bench(client: redis.Redis, num_arms: int, cache_ttl: float, duration: float) -> dict:
+    client.flushdb()
+    arm_ids = [str(i) for i in range(num_arms)]
+    agent = ThompsonSamplingAgent(arm_ids=arm_ids, redis_client=client, posterior_cache_ttl=cache_ttl)
+
+    decisions = 0
+    # Each INFO call is itself one command; it is subtracted below.
+    commands_before = total_commands(client)
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        agent.select_arm(mode="LEARNING")
+        decisions += 1
+    elapsed = time.perf_counter() - start
+    commands = total_commands(client) - commands_before - 1
+
+    return {
+        "arms": num_arms,
+        "cache_ttl": cache_ttl,
+        "decisions_per_sec": decisions / elapsed,
+        "commands_per_decision": commands / decisions,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ThompsonSamplingAgent.select_arm.")
+    parser.add_argument("--host", default=os.getenv("REDIS_HOST", "localhost"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("REDIS_PORT", 6379)))
+    parser.add_argument("--db", type=int, default=15)
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds per configuration.")
+    parser.add_argument("--arms", type=int, nargs="+", default=[5, 100, 10_000])
+    parser.add_argument("--cache-ttl", type=float, nargs="+", default=[0.0, 0.5])
+    args = parser.parse_args()
+
+    client = redis.Redis(host=args.host, port=args.port, db=args.db)
+    print(f"{'arms':>8} {'cache_ttl':>10} {'decisions/s':>14} {'cmds/decision':>14}")
+    for num_arms in args.arms:
+        for cache_ttl in args.cache_ttl:
+            r = bench(client, num_arms, cache_ttl, args.duration)
+            print(f"{r['arms']:>8} {r['cache_ttl']:>10.2f} {r['decisions_per_sec']:>14.1f} {r['commands_per_decision']:>14.2f}")
+    client.flushdb()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# scripts/benchmarks/bench_sharded_experiments.py
+#
+# Aggregate decision throughput of many experiments as Redis nodes are added.
+#
+# Experiments are placed on the nodes by the consistent-hashing router of
+# src/rl_agent/sharding.py, and their keys are namespaced per experiment
+# (belief_store.ExperimentKeys). For each node count, --workers processes each
+# run ThompsonSamplingAgents for their share of --experiments experiments,
+# round-robin: select a batch of arms, draw the rewards in-process (no API),
+# update the beliefs. Reports, per node count: experiments per node, and
+# decisions (pulls) and decision batches per second over all workers.
+#
+# The nodes are either existing Redis instances (--nodes) or local ones
+# started for the run (--spawn, needs the redis-server binary on the PATH).
+#
+# Usage (FLUSHES every node it uses):
+#   python scripts/benchmarks/bench_sharded_experiments.py --spawn 4
+#   python scripts/benchmarks/bench_sharded_experiments.py --nodes localhost:6380 localhost:6381 \
+#       --node-counts 1 2 --experiments 64 --workers 16 --storage packed
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import numpy as np
+import redis
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src", "rl_agent"))
+from agent import ThompsonSamplingAgent  # noqa: E402
+from sharding import ShardRouter, parse_nodes  # noqa: E402
+
+
+def spawn_nodes(count: int, base_port: int) -> tuple[list[tuple[str, int]], list[subprocess.Popen]]:
+    """Starts `count` throwaway redis-server processes (no persistence) on consecutive ports."""
+    if shutil.which("redis-server") is None:
+        sys.exit("ERROR: --spawn needs redis-server on the PATH; pass existing nodes with --nodes instead.")
+    nodes, processes = [], []
+    for port in range(base_port, base_port + count):
+        processes.append(subprocess.Popen(
+            ["redis-server", "--port", str(port), "--save", "", "--appendonly", "no"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        ))
+        nodes.append(("localhost", port))
+    for host, port in nodes:
+        client = redis.Redis(host=host, port=port)
+        for _ in range(50):
+            try:
+                client.ping()
+                break
+            except redis.ConnectionError:
+                time.sleep(0.1)
+    return nodes, processes
+
+
+def worker(nodes, experiments, seed, args, barrier, results):
+    """Runs the agents of `experiments` for --seconds once every worker is ready; reports (pulls, batches)."""
+    router = ShardRouter(nodes)
+    clients = {node: redis.Redis(host=node[0], port=node[1]) for node in nodes}
+    arm_ids = [str(i) for i in range(args.arms)]
+    rng = np.random.default_rng(seed)
+    agents = [
+        (ThompsonSamplingAgent(arm_ids=arm_ids, redis_client=clients[router.node_for(experiment)],
+                               belief_storage=args.storage, experiment=experiment),
+         rng.normal(0.0, 1.0, args.arms))
+        for experiment in experiments
+    ]
+    barrier.wait()
+    pulls = batches = 0
+    deadline = time.perf_counter() + args.seconds
+    while time.perf_counter() < deadline:
+        for agent, means in agents:
+            counts = agent.select_arms(args.batch)
+            agent.update_beliefs({arm_id: rng.normal(means[int(arm_id)], 1.0, count) for arm_id, count in counts.items()})
+            pulls += args.batch
+            batches += 1
+    results.put((pulls, batches))
+
+
+def run(nodes, args) -> tuple[dict, float, float]:
+    """Experiments per node, and aggregate pulls/sec and batches/sec over `nodes`."""
+    for host, port in nodes:
+        redis.Redis(host=host, port=port).flushdb()
+    experiments = [f"exp-{i}" for i in range(args.experiments)]
+    placement = {node: len(names) for node, names in ShardRouter(nodes).group(experiments).items()}
+    barrier = multiprocessing.Barrier(args.workers)
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker, args=(nodes, experiments[i::args.workers], i, args, barrier, results))
+        for i in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    totals = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    pulls = sum(pulls for pulls, _ in totals)
+    batches = sum(batches for _, batches in totals)
+    return placement, pulls / args.seconds, batches / args.seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark experiments sharded over several Redis nodes.")
+    parser.add_argument("--nodes", nargs="+", default=[], help="Existing nodes, as host:port.")
+    parser.add_argument("--spawn", type=int, default=0, help="Start this many local redis-server nodes instead.")
+    parser.add_argument("--base-port", type=int, default=6390, help="First port of the spawned nodes.")
+    parser.add_argument("--node-counts", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--experiments", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=8, help="Agent processes, sharing the experiments.")
+    parser.add_argument("--arms", type=int, default=10)
+    parser.add_argument("--storage", choices=["hash", "packed"], default="hash")
+    parser.add_argument("--batch", type=int, default=10, help="Pulls per decision batch.")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    processes = []
+    if args.spawn:
+        nodes, processes = spawn_nodes(args.spawn, args.base_port)
+    else:
+        nodes = parse_nodes(",".join(args.nodes), "localhost", 6379)
+    try:
+        print(f"{'nodes':>5} {'experiments per node':>24} {'pulls/s':>12} {'batches/s':>10}")
+        for count in args.node_counts:
+            if count > len(nodes):
+                print(f"{count:>5} skipped: only {len(nodes)} node(s) available")
+                continue
+            placement, pulls_per_s, batches_per_s = run(nodes[:count], args)
+            spread = "/".join(str(placement.get(node, 0)) for node in nodes[:count])
+            print(f"{count:>5} {spread:>24} {pulls_per_s:>12,.0f} {batches_per_s:>10,.0f}")
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# scripts/benchmarks/bench_warm_restart.py
+#
+# Restart-to-productive time after Redis loses its state, cold (agents start
+# over from the prior) vs warm (agents restore beliefs from the orchestrator's
+# checkpoint, src/rl_agent/checkpoint.py).
+#
+# For each arm count, one ThompsonSamplingAgent learns a synthetic bandit
+# (rewards drawn in-process, no API) until it is productive, its state is
+# checkpointed, and the database is flushed. A new agent then starts cold, and
+# after another flush a third one starts from the checkpoint. The agent counts
+# as productive once the mean regret per pull of a whole batch drops below
+# --regret-target. Reports, per start: initialization time (snapshot load and
+# restore included), batches, pulls, seconds and regret until productive,
+# plus the snapshot's size and write / mmap load times.
+#
+# Usage (needs a running Redis; uses a scratch database that gets FLUSHED):
+#   python scripts/benchmarks/bench_warm_restart.py --host localhost --db 15
+#   python scripts/benchmarks/bench_warm_restart.py --arms 10 1000 --storage packed --batch 200
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import redis
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src", "rl_agent"))
+from agent import ThompsonSamplingAgent  # noqa: E402
+from belief_store import pack_beliefs  # noqa: E402
+from checkpoint import load_snapshot, write_snapshot  # noqa: E402
+
+
+def run_until_productive(agent, means: np.ndarray, args, rng: np.random.Generator) -> dict:
+    """Pulls batches until one has a mean regret per pull below the target (or --max-batches runs out)."""
+    started = time.perf_counter()
+    best = means.max()
+    regret, pulls = 0.0, 0
+    for batch in range(1, args.max_batches + 1):
+        counts = agent.select_arms(args.batch)
+        agent.update_beliefs({
+            arm_id: rng.normal(means[int(arm_id)], 1.0, count) for arm_id, count in counts.items()
+        })
+        batch_regret = sum(count * (best - means[int(arm_id)]) for arm_id, count in counts.items())
+        regret += batch_regret
+        pulls += args.batch
+        if batch_regret / args.batch < args.regret_target:
+            return {"batches": batch, "pulls": pulls, "seconds": time.perf_counter() - started, "regret": regret, "done": True}
+    return {"batches": args.max_batches, "pulls": pulls, "seconds": time.perf_counter() - started, "regret": regret, "done": False}
+
+
+def start(client: redis.Redis, arm_ids: list[str], args, checkpoint_path: str = "") -> tuple[ThompsonSamplingAgent, float]:
+    """A fresh agent on an empty database, and the seconds its initialization took."""
+    client.flushdb()
+    started = time.perf_counter()
+    agent = ThompsonSamplingAgent(
+        arm_ids=arm_ids, redis_client=client, belief_storage=args.storage, checkpoint_path=checkpoint_path,
+    )
+    return agent, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold vs checkpointed warm restarts.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6379)
+    parser.add_argument("--db", type=int, default=15)
+    parser.add_argument("--arms", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--storage", choices=["hash", "packed"], default="packed")
+    parser.add_argument("--batch", type=int, default=100, help="Pulls per decision batch.")
+    parser.add_argument("--regret-target", type=float, default=0.1, help="Mean regret per pull that counts as productive.")
+    parser.add_argument("--max-batches", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    client = redis.Redis(host=args.host, port=args.port, db=args.db)
+    checkpoint_dir = tempfile.mkdtemp(prefix="bandit-checkpoint-")
+    print(f"{'arms':>6} {'start':>5} {'init ms':>9} {'batches':>8} {'pulls':>9} {'seconds':>8} {'regret':>10}")
+    for num_arms in args.arms:
+        rng = np.random.default_rng(args.seed)
+        means = rng.normal(0.0, 1.0, num_arms)
+        arm_ids = [str(i) for i in range(num_arms)]
+        path = os.path.join(checkpoint_dir, f"{num_arms}.snap")
+
+        # Learn, then checkpoint what was learned, as the orchestrator would.
+        agent, _ = start(client, arm_ids, args)
+        run_until_productive(agent, means, args, rng)
+        t0 = time.perf_counter()
+        rows = np.frombuffer(pack_beliefs(agent._read_posteriors(), agent.epoch), dtype="<f8").reshape(-1, 5)
+        size = write_snapshot(path, {"beliefs": rows}, {"arm_ids": arm_ids}, agent.epoch)
+        write_ms = 1000.0 * (time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        load_snapshot(path).posteriors_for(arm_ids)
+        load_ms = 1000.0 * (time.perf_counter() - t0)
+
+        for name, checkpoint_path in (("cold", ""), ("warm", path)):
+            agent, init_seconds = start(client, arm_ids, args, checkpoint_path)
+            result = run_until_productive(agent, means, args, rng)
+            batches = f"{result['batches']}" if result["done"] else f">{result['batches']}"
+            print(f"{num_arms:>6} {name:>5} {1000.0 * init_seconds:>9.1f} {batches:>8} {result['pulls']:>9,} "
+                  f"{result['seconds']:>8.2f} {result['regret']:>10.1f}")
+        print(f"{'':>6} snapshot {size / 1e3:.1f} kB, write {write_ms:.2f} ms, mmap load {load_ms:.2f} ms")
+    client.flushdb()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# scripts/benchmarks/soak_drift_detection.py
+#
+# Unattended soak run of drift detection against a live stack: loads a drift
+# scenario into the slot machine API (POST /scenario, see
+# src/slot_machine_api/scenario_engine.py), then follows the scenario clock
+# and the orchestrator's detection metrics until every change point has
+# passed (plus --tail clock units) or --duration runs out.
+#
+# The orchestrator scores each detection against the scenario's ground truth
+# (bandit_orchestrator_detection_delay, bandit_orchestrator_false_alarms_total);
+# this script diffs those metrics between polls to log every detection, and
+# reports detections, false alarms, missed changes and the mean delay in
+# scenario clock units (pulls or seconds).
+#
+# Usage (needs the API, agents and orchestrator running, e.g. via docker-compose):
+#   python scripts/benchmarks/soak_drift_detection.py --api-url http://localhost:8000 \
+#       --metrics-url http://localhost:9100/metrics
+#   python scripts/benchmarks/soak_drift_detection.py --scenario my_scenario.json --duration 86400
+
+import argparse
+import json
+import os
+import time
+
+import requests
+from prometheus_client.parser import text_string_to_metric_families
+
+DEFAULT_SCENARIO = os.path.join(os.path.dirname(__file__), "..", "..", "src", "slot_machine_api", "scenarios", "soak.json")
+
+
+def detection_metrics(metrics_url: str) -> tuple[int, float, int]:
+    """(detections scored, summed delay, false alarms) from the orchestrator's /metrics."""
+    count, total, false_alarms = 0, 0.0, 0
+    text = requests.get(metrics_url, timeout=5).text
+    for family in text_string_to_metric_families(text):
+        for sample in family.samples:
+            if sample.name == "bandit_orchestrator_detection_delay_count":
+                count += int(sample.value)
+            elif sample.name == "bandit_orchestrator_detection_delay_sum":
+                total += sample.value
+            elif sample.name == "bandit_orchestrator_false_alarms_total":
+                false_alarms += int(sample.value)
+    return count, total, false_alarms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak-test drift detection against a scheduled drift scenario.")
+    parser.add_argument("--api-url", default=os.getenv("API_BASE_URL", "http://localhost:8000"))
+    parser.add_argument("--metrics-url", default="http://localhost:9100/metrics", help="The orchestrator's /metrics.")
+    parser.add_argument("--scenario", default=DEFAULT_SCENARIO, help="Scenario JSON file to load.")
+    parser.add_argument("--duration", type=float, default=3600.0, help="Max wall-clock seconds.")
+    parser.add_argument("--tail", type=float, default=20000.0, help="Clock units to keep running after the last change point.")
+    parser.add_argument("--poll", type=float, default=5.0, help="Seconds between two polls.")
+    args = parser.parse_args()
+
+    with open(args.scenario) as f:
+        response = requests.post(f"{args.api_url}/scenario", json=json.load(f), timeout=5)
+    response.raise_for_status()
+    scenario = response.json()
+    clock, change_points = scenario["clock"], scenario["change_points"]
+    stop_at = max([point["t"] for point in change_points], default=0.0) + args.tail
+    print(f"Loaded {args.scenario}: {len(change_points)} change points on a {clock} clock, running to {stop_at:.0f}.")
+
+    count0, total0, false0 = detection_metrics(args.metrics_url)
+    count, total, false_alarms = count0, total0, false0
+    now = 0.0
+    started = time.monotonic()
+    while time.monotonic() - started < args.duration:
+        time.sleep(args.poll)
+        now = requests.get(f"{args.api_url}/scenario", timeout=5).json()["now"]
+        new_count, new_total, new_false = detection_metrics(args.metrics_url)
+        if new_count > count:
+            print(f"[{now:>10.0f} {clock}] {new_count - count} detection(s), mean delay {(new_total - total) / (new_count - count):.0f}")
+        if new_false > false_alarms:
+            print(f"[{now:>10.0f} {clock}] {new_false - false_alarms} false alarm(s)")
+        count, total, false_alarms = new_count, new_total, new_false
+        if now >= stop_at:
+            break
+
+    passed = sum(point["t"] <= now for point in change_points)
+    detections = count - count0
+    print(f"\n{'changes passed':>15} {'detections':>11} {'false alarms':>13} {'missed':>7} {'mean delay':>11}")
+    mean_delay = f"{(total - total0) / detections:.0f}" if detections else "-"
+    print(f"{passed:>15} {detections:>11} {false_alarms - false0:>13} {max(passed - detections, 0):>7} {mean_delay:>11}")
+
+
+if __name__ == "__main__":
+    main()
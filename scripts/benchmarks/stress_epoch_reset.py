@@ -0,0 +1,165 @@
+# scripts/benchmarks/stress_epoch_reset.py
+#
+# Injects drift resets while many agents update the beliefs concurrently, and
+# checks that no reward pulled before a reset survives it.
+#
+# Worker threads drive ThompsonSamplingAgents through select -> pull -> update
+# as fast as they can. The simulated world pays a constant reward that changes
+# at every drift (10, 20, 30, ...); the injector switches the world first and
+# then resets the beliefs, as the orchestrator does after detecting the drift.
+# Just before each reset every arm's posterior is checked: with a constant
+# reward r the conjugate update gives mu * nu - mu0 * nu0 = r * (nu - nu0), so
+# an arm whose implied mean is not the current world's reward holds rewards
+# from before the last reset.
+#
+#   epoch    one INCR of the belief epoch (reset_beliefs, what the orchestrator does)
+#   rewrite  the old reset, one HSET of the prior per arm (or one SET of the
+#            packed array), with in-flight updates still accepted
+#
+# Also reports how long one reset takes for several arm counts.
+#
+# Usage (needs a running Redis; uses a scratch database that gets FLUSHED):
+#   python scripts/benchmarks/stress_epoch_reset.py --host localhost --db 15
+#   python scripts/benchmarks/stress_epoch_reset.py --storage packed --update-mode delta --resets 50
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import redis
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src", "rl_agent"))
+from agent import INITIAL_BELIEFS, ThompsonSamplingAgent  # noqa: E402
+from belief_store import (  # noqa: E402
+    BELIEF_PRIOR, BELIEFS_EPOCH_KEY, BELIEFS_VERSION_KEY, PACKED_BELIEFS_KEY, PackedBeliefs, reset_beliefs,
+)
+
+
+def rewrite_reset(client: redis.Redis, arm_ids: list[str], storage: str):
+    """The reset the orchestrator used to do: every arm rewritten to the prior, in the current epoch."""
+    epoch = int(client.get(BELIEFS_EPOCH_KEY) or 0)
+    if storage == "packed":
+        client.set(PACKED_BELIEFS_KEY, PackedBeliefs(arm_ids).initial_snapshot(epoch=epoch))
+    else:
+        for arm_id in arm_ids:
+            client.hset(f"arm:{arm_id}", mapping={**INITIAL_BELIEFS, "epoch": epoch})
+    client.incr(BELIEFS_VERSION_KEY)
+
+
+def contaminated_arms(checker: ThompsonSamplingAgent, reward: float) -> int:
+    """Arms whose posterior holds any reward other than `reward`."""
+    posteriors = checker._read_shared_posteriors()
+    mu0, nu0 = BELIEF_PRIOR[:2]
+    mu, nu = posteriors[:, 0], posteriors[:, 1]
+    updated = nu > nu0 + 0.5
+    implied = (mu[updated] * nu[updated] - mu0 * nu0) / (nu[updated] - nu0)
+    return int(np.sum(~np.isclose(implied, reward, rtol=1e-9, atol=0.0)))
+
+
+def stress(args, pool: redis.ConnectionPool, reset: str) -> dict:
+    client = redis.Redis(connection_pool=pool)
+    client.flushdb()
+    arm_ids = [str(i) for i in range(args.arms)]
+
+    def make_agent():
+        return ThompsonSamplingAgent(
+            arm_ids=arm_ids, redis_client=redis.Redis(connection_pool=pool), update_mode=args.update_mode,
+            belief_storage=args.storage, flush_interval=args.flush_interval,
+        )
+
+    agents = [make_agent() for _ in range(args.agents)]
+    checker = make_agent()
+    world = {"reward": 10.0}
+    stop = threading.Event()
+
+    def worker(owned):
+        while not stop.is_set():
+            for agent in owned:
+                arm_id = agent.select_arm("LEARNING")
+                agent.update_belief(arm_id, world["reward"]) # The pull: whatever the world pays right now
+
+    threads = [threading.Thread(target=worker, args=(agents[t::args.threads],)) for t in range(args.threads)]
+    for t in threads:
+        t.start()
+
+    contaminated, reset_seconds = [], []
+    started = time.perf_counter()
+    for _ in range(args.resets):
+        time.sleep(args.reset_interval)
+        contaminated.append(contaminated_arms(checker, world["reward"]))
+        world["reward"] += 10.0 # Drift happens in the world first, the reset follows its detection
+        t0 = time.perf_counter()
+        if reset == "epoch":
+            reset_beliefs(client, BELIEFS_VERSION_KEY)
+        else:
+            rewrite_reset(client, arm_ids, args.storage)
+        reset_seconds.append(time.perf_counter() - t0)
+    time.sleep(args.reset_interval)
+    contaminated.append(contaminated_arms(checker, world["reward"]))
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    updates = sum(a.stats["updates"] for a in agents)
+    return {
+        "reset": reset,
+        "updates_per_sec": updates / elapsed,
+        "stale_dropped": sum(a.stats["stale_rewards"] for a in agents),
+        "contaminated_checks": sum(c > 0 for c in contaminated),
+        "checks": len(contaminated),
+        "reset_p50_ms": 1000.0 * float(np.median(reset_seconds)),
+    }
+
+
+def reset_cost(client: redis.Redis, num_arms: int, storage: str, repeats: int = 5) -> tuple[float, float]:
+    """Median seconds of one epoch reset and one rewrite reset with `num_arms` arms."""
+    client.flushdb()
+    arm_ids = [str(i) for i in range(num_arms)]
+    ThompsonSamplingAgent(arm_ids=arm_ids, redis_client=client, belief_storage=storage)
+    timings = {"epoch": [], "rewrite": []}
+    for _ in range(repeats):
+        for name, fn in (("epoch", lambda: reset_beliefs(client, BELIEFS_VERSION_KEY)),
+                         ("rewrite", lambda: rewrite_reset(client, arm_ids, storage))):
+            t0 = time.perf_counter()
+            fn()
+            timings[name].append(time.perf_counter() - t0)
+    return float(np.median(timings["epoch"])), float(np.median(timings["rewrite"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress drift resets during heavy concurrent belief updates.")
+    parser.add_argument("--host", default=os.getenv("REDIS_HOST", "localhost"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("REDIS_PORT", 6379)))
+    parser.add_argument("--db", type=int, default=15)
+    parser.add_argument("--storage", choices=["hash", "packed"], default="hash")
+    parser.add_argument("--update-mode", choices=["script", "watch", "delta"], default="script")
+    parser.add_argument("--flush-interval", type=float, default=0.05, help="Delta mode flush interval, in seconds.")
+    parser.add_argument("--arms", type=int, default=10)
+    parser.add_argument("--agents", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=8, help="Worker threads driving the agents.")
+    parser.add_argument("--resets", type=int, default=20)
+    parser.add_argument("--reset-interval", type=float, default=0.25, help="Seconds between two injected drifts.")
+    parser.add_argument("--cost-arms", type=int, nargs="+", default=[10, 1_000, 100_000])
+    args = parser.parse_args()
+
+    pool = redis.ConnectionPool(host=args.host, port=args.port, db=args.db, max_connections=args.threads + 4)
+    print(f"{'reset':>8} {'updates/s':>10} {'stale dropped':>14} {'contaminated':>13} {'reset p50 ms':>13}")
+    for reset in ("epoch", "rewrite"):
+        r = stress(args, pool, reset)
+        print(f"{r['reset']:>8} {r['updates_per_sec']:>10,.0f} {r['stale_dropped']:>14,} "
+              f"{r['contaminated_checks']:>6}/{r['checks']:<6} {r['reset_p50_ms']:>13.3f}")
+
+    client = redis.Redis(connection_pool=pool)
+    print(f"\n{'arms':>8} {'epoch reset ms':>15} {'rewrite reset ms':>17}")
+    for num_arms in args.cost_arms:
+        epoch_s, rewrite_s = reset_cost(client, num_arms, args.storage)
+        print(f"{num_arms:>8} {1000.0 * epoch_s:>15.3f} {1000.0 * rewrite_s:>17.3f}")
+    client.flushdb()
+
+
+if __name__ == "__main__":
+    main()
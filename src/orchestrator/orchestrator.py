@@ -5,8 +5,18 @@ import numpy as np
 import time
 import sys
 import requests
-from collections import deque
 import os
+import socket
+import math
+from prometheus_client import Counter, Enum, Gauge, Histogram
+
+# Shared with the agent; copied next to this file in the orchestrator image.
+from arms_client import fetch_arm_ids
+from drift_detector import DriftMonitor
+from belief_store import BELIEF_FIELDS, ExperimentKeys, PackedBeliefs, apply_epoch, pack_beliefs, reset_beliefs
+from checkpoint import BeliefLog, experiment_path, load_snapshot, log_path, write_snapshot
+from sharding import ShardRouter, parse_nodes
+from instrumentation import LATENCY_BUCKETS, start_metrics_server
 
 # --- Configuration ---
 # --- MODIFIED: Read config from environment variables ---
@@ -14,34 +24,190 @@ REDIS_HOST = os.getenv("REDIS_HOST", "redis")
 API_URL = os.getenv("API_BASE_URL", "http://slot-machine-api:8000")
 # --------------------------------------------------------
 REDIS_PORT = 6379
-CHECK_INTERVAL_SECONDS = 10
+# Experiments to supervise, comma-separated; "" is the single default experiment.
+# Several are supervised from this one process (see ExperimentFleet), each on
+# the node of REDIS_NODES (comma-separated "host:port", sharding.py) holding it.
+EXPERIMENTS = [experiment.strip() for experiment in os.getenv("EXPERIMENTS", "").split(",") if experiment.strip()]
+REDIS_NODES = os.getenv("REDIS_NODES", "")
+CHECK_INTERVAL_SECONDS = float(os.getenv("CHECK_INTERVAL_SECONDS", 10))
 CONVERGENCE_THRESHOLD = 0.01
 CONVERGENCE_DURATION_CHECKS = 5
-DRIFT_WINDOW_SIZE = 50
-DRIFT_THRESHOLD_FACTOR = 0.7
+# Change-point detector run over every arm's rewards: page_hinkley, cusum or adwin.
+DRIFT_DETECTOR = os.getenv("DRIFT_DETECTOR", "page_hinkley")
 FORCED_EXPLORATION_SECONDS = 30 # Duration for the re-learning phase
 
+# --- Reward stream (written by the agents, see rl_agent/agent.py) ---
+REWARD_STREAM_GROUP = "orchestrator"
+REWARD_STREAM_CONSUMER = os.getenv("HOSTNAME", socket.gethostname())
+STREAM_READ_COUNT = 1000 # Max stream entries per XREADGROUP call
+STREAM_BLOCK_MS = 1000 # Max time a drift check waits for new rewards
+
+# --- Push-based convergence detection ---
+# "polling" re-reads every arm each CHECK_INTERVAL_SECONDS; "push" follows the
+# belief updates the agents publish and decides as soon as the criterion holds.
+ORCHESTRATOR_MODE = os.getenv("ORCHESTRATOR_MODE", "polling")
+# Belief layout written by the agents: "hash" or "packed" (see rl_agent/belief_store.py).
+BELIEF_STORAGE = os.getenv("BELIEF_STORAGE", "hash")
+# "probability_of_best": the leading arm beats every other arm with probability
+#   >= CONVERGENCE_CONFIDENCE under the current posteriors.
+# "stability": the summed net change of every arm's mean stays below
+#   CONVERGENCE_THRESHOLD for CONVERGENCE_WINDOW_SECONDS.
+CONVERGENCE_CRITERION = os.getenv("CONVERGENCE_CRITERION", "probability_of_best")
+CONVERGENCE_CONFIDENCE = float(os.getenv("CONVERGENCE_CONFIDENCE", 0.99))
+CONVERGENCE_MIN_PULLS = int(os.getenv("CONVERGENCE_MIN_PULLS", 30)) # Pulls of the leading arm required first
+CONVERGENCE_WINDOW_SECONDS = float(os.getenv("CONVERGENCE_WINDOW_SECONDS", 10))
+PUSH_WAIT_SECONDS = 1.0 # Max time one push-mode iteration waits for an update
+
+# --- Checkpoints (see rl_agent/checkpoint.py) ---
+# Snapshot of the beliefs, the drift detector state and the orchestrator's mode,
+# written every CHECKPOINT_SECONDS and on every mode change; "" disables it. The
+# orchestrator resumes from it on startup, and agents restore beliefs from it
+# when Redis holds none, so the path must be on a volume shared with them.
+# With CHECKPOINT_LOG_SECONDS above 0 the belief rows that changed are appended
+# to "<CHECKPOINT_PATH>.log" that often in between.
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", "")
+CHECKPOINT_SECONDS = float(os.getenv("CHECKPOINT_SECONDS", 60))
+CHECKPOINT_LOG_SECONDS = float(os.getenv("CHECKPOINT_LOG_SECONDS", 0))
+
+# --- Prometheus metrics (served on METRICS_PORT, see instrumentation.py) ---
+MONITOR_MODES = ["CONVERGENCE_DETECTION", "DRIFT_MONITORING"]
+TICK_SECONDS = Histogram(
+    "bandit_orchestrator_tick_seconds", "Duration of one monitor iteration, blocking waits included.", ["mode"],
+    buckets=LATENCY_BUCKETS,
+)
+MODE = Enum(
+    "bandit_orchestrator_mode", "Current orchestrator mode (of the last experiment to change it, with several).",
+    states=MONITOR_MODES,
+)
+EXPERIMENTS_BY_MODE = Gauge("bandit_orchestrator_experiments", "Supervised experiments, by mode.", ["mode"])
+MODE_TRANSITIONS = Counter(
+    "bandit_orchestrator_mode_transitions_total", "Orchestrator mode changes.", ["from_mode", "to_mode"],
+)
+DRIFT_DETECTIONS = Counter("bandit_orchestrator_drift_detections_total", "Drifts detected, per arm.", ["arm"])
+# Scored against the ground truth of a drift scenario running in the API (GET /scenario).
+DETECTION_DELAY = Histogram(
+    "bandit_orchestrator_detection_delay", "Scenario clock units (pulls or seconds) from a ground-truth change to its detection.",
+    ["clock"], buckets=(10, 30, 100, 300, 1000, 3000, 10000, 30000, 100000, 300000),
+)
+FALSE_ALARMS = Counter(
+    "bandit_orchestrator_false_alarms_total", "Drifts detected with no scenario change point since convergence.",
+)
+CHECKPOINT_WRITE_SECONDS = Histogram(
+    "bandit_orchestrator_checkpoint_seconds", "Time to write a snapshot or a log append, belief read included.", ["kind"],
+    buckets=LATENCY_BUCKETS,
+)
+CHECKPOINT_BYTES = Counter("bandit_orchestrator_checkpoint_bytes_total", "Bytes written to checkpoint files.", ["kind"])
+
+def probability_not_best(beliefs: dict, best_arm: str) -> float:
+    """
+    Upper bound (union bound) on the probability that some other arm's true mean
+    exceeds `best_arm`'s, using a normal approximation of each arm's Student-t
+    marginal posterior for the mean: location mu, variance beta / (alpha * nu).
+    """
+    best = beliefs[best_arm]
+    best_var = best['beta'] / (best['alpha'] * best['nu'])
+    total = 0.0
+    for arm_id, params in beliefs.items():
+        if arm_id == best_arm: continue
+        spread = math.sqrt(best_var + params['beta'] / (params['alpha'] * params['nu']))
+        total += 0.5 * math.erfc((best['mu'] - params['mu']) / (spread * math.sqrt(2.0)))
+    return total
+
+def get_scenario(api_url: str):
+    """The API's active drift scenario (GET /scenario), or None if there is none or it cannot be read."""
+    try:
+        response = requests.get(f"{api_url}/scenario", timeout=2)
+        response.raise_for_status()
+        scenario = response.json()
+    except Exception:
+        return None
+    return scenario if scenario.get("active") else None
+
 class SystemMonitor:
-    def __init__(self, redis_client, arm_ids):
+    def __init__(self, redis_client, arm_ids, stream_client, orchestrator_mode=ORCHESTRATOR_MODE, experiment=""):
         self.redis = redis_client
+        self.keys = ExperimentKeys(experiment)
+        self.tag = f" [{experiment}]" if experiment else "" # Log prefix of the experiment
+        # Rewards are stored as raw float64 bytes, so the stream is read without response decoding.
+        self.stream_redis = stream_client
         self.arm_ids = arm_ids
+        # The packed snapshot is binary too, so it is also read through the raw client.
+        self.packed = PackedBeliefs(arm_ids) if BELIEF_STORAGE == "packed" else None
         self.mode = "CONVERGENCE_DETECTION"
+        MODE.state(self.mode)
         self.previous_beliefs = self._get_current_beliefs()
         self.consecutive_stable_checks = 0
         self.converged_best_arm = None
         self.converged_belief_mean = None
-        self.recent_rewards = deque(maxlen=DRIFT_WINDOW_SIZE)
+        self.converged_at_clock = None # Scenario clock at convergence, if a scenario is running
+        self.drift_monitor = DriftMonitor(arm_ids, detector=DRIFT_DETECTOR)
+        self._last_drift_log = 0.0
+        self._ensure_consumer_group()
+        self.push = orchestrator_mode == "push"
+        self.pubsub = None
+        if self.push:
+            self._subscribe_to_belief_updates()
+
+    def _ensure_consumer_group(self):
+        try:
+            self.stream_redis.xgroup_create(self.keys.reward_stream, REWARD_STREAM_GROUP, id="$", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
 
     def _get_current_beliefs(self):
-        beliefs = {}
-        for arm_id in self.arm_ids:
-            raw_belief = self.redis.hgetall(f"arm:{arm_id}")
-            if raw_belief:
-                beliefs[arm_id] = {k: float(v) for k, v in raw_belief.items()}
-        return beliefs
-
-    def check_convergence(self):
-        current_beliefs = self._get_current_beliefs()
+        """Every arm's beliefs as of the current epoch (arms not updated since the last reset read as the prior)."""
+        _, posteriors = self.read_posteriors()
+        return self.beliefs_from(posteriors)
+
+    def beliefs_from(self, posteriors):
+        """The beliefs dict of _get_current_beliefs from (K, 4) posteriors."""
+        return {
+            arm_id: dict(zip(BELIEF_FIELDS, map(float, row)))
+            for arm_id, row in zip(self.arm_ids, posteriors)
+            if not np.isnan(row).any()
+        }
+
+    def read_posteriors(self):
+        """
+        (epoch, (K, 4) posteriors ordered like arm_ids) as of the current epoch,
+        in one round trip; rows of arms without beliefs are NaN.
+        """
+        pipe = self.stream_redis.pipeline(transaction=False)
+        count = self.queue_posterior_read(pipe)
+        return self.parse_posterior_read(pipe.execute()[-count:])
+
+    def queue_posterior_read(self, pipe) -> int:
+        """
+        Queues the reads of read_posteriors on a pipeline of the raw client,
+        which may batch several experiments; returns how many replies they take.
+        """
+        pipe.get(self.keys.epoch)
+        if self.packed is None:
+            for arm_id in self.arm_ids:
+                pipe.hmget(self.keys.arm(arm_id), (*BELIEF_FIELDS, "epoch"))
+            return 1 + len(self.arm_ids)
+        # All arms from the packed snapshot in one GET (plus the layout, until it is known).
+        pipe.get(self.keys.packed_beliefs)
+        if self.packed.has_layout:
+            return 2
+        pipe.get(self.keys.packed_arms)
+        return 3
+
+    def parse_posterior_read(self, replies):
+        """read_posteriors' result from the replies of queue_posterior_read."""
+        epoch = int(replies[0] or 0)
+        if self.packed is None:
+            rows = np.array(replies[1:], dtype=np.float64).reshape(-1, 5) # Missing fields (None) become NaN
+            return epoch, apply_epoch(rows[:, :4], rows[:, 4], epoch)
+        if not self.packed.has_layout:
+            if replies[2] is None: return epoch, np.full((len(self.arm_ids), 4), np.nan)
+            self.packed.set_layout(replies[2])
+        return epoch, self.packed.decode(replies[1], epoch)
+
+    def check_convergence(self, current_beliefs=None):
+        """One polling check; `current_beliefs` (as from _get_current_beliefs) may be read by the caller."""
+        current_beliefs = self._get_current_beliefs() if current_beliefs is None else current_beliefs
         if not current_beliefs or not self.previous_beliefs:
             self.previous_beliefs = current_beliefs
             return
@@ -51,11 +217,11 @@ class SystemMonitor:
             for arm_id in self.arm_ids
             if arm_id in current_beliefs and arm_id in self.previous_beliefs
         )
-        print(f"INFO (CONVERGENCE): Beliefs change: {total_change:.6f}")
+        print(f"INFO (CONVERGENCE){self.tag}: Beliefs change: {total_change:.6f}")
 
         if total_change < CONVERGENCE_THRESHOLD:
             self.consecutive_stable_checks += 1
-            print(f"INFO (CONVERGENCE): Stable check #{self.consecutive_stable_checks}/{CONVERGENCE_DURATION_CHECKS}.")
+            print(f"INFO (CONVERGENCE){self.tag}: Stable check #{self.consecutive_stable_checks}/{CONVERGENCE_DURATION_CHECKS}.")
         else:
             self.consecutive_stable_checks = 0
 
@@ -64,95 +230,420 @@ class SystemMonitor:
         if self.consecutive_stable_checks >= CONVERGENCE_DURATION_CHECKS:
             self.handle_convergence(current_beliefs)
 
+    def _subscribe_to_belief_updates(self):
+        """Subscribes first, then takes one snapshot, so no update falls in between."""
+        self.pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.subscribe(self.keys.updates_channel)
+        self.beliefs = self._get_current_beliefs()
+        # Stability criterion state: means at the start of the current stable stretch,
+        # and the summed |mu - anchor| over arms, maintained in O(1) per update.
+        self.anchor_mu = {arm_id: params['mu'] for arm_id, params in self.beliefs.items()}
+        self.anchor_time = time.monotonic()
+        self.aggregate_change = 0.0
+        self.updates_seen = 0
+        self._last_push_log = time.monotonic()
+
+    def _apply_belief_update(self, data: str):
+        arm_key, mu, nu, alpha, beta = data.split()
+        arm_id = arm_key.rsplit(":", 1)[1] # The key may carry an experiment prefix
+        if arm_id not in self.anchor_mu:
+            self.anchor_mu[arm_id] = float(mu)
+        old_mu = self.beliefs.get(arm_id, {}).get('mu', self.anchor_mu[arm_id])
+        self.beliefs[arm_id] = {'mu': float(mu), 'nu': float(nu), 'alpha': float(alpha), 'beta': float(beta)}
+        anchor = self.anchor_mu[arm_id]
+        self.aggregate_change += abs(float(mu) - anchor) - abs(old_mu - anchor)
+        self.updates_seen += 1
+
+    def _push_convergence_holds(self) -> bool:
+        if len(self.beliefs) < len(self.arm_ids):
+            return False
+        if CONVERGENCE_CRITERION == "stability":
+            if self.aggregate_change >= CONVERGENCE_THRESHOLD:
+                # Beliefs moved: restart the stable stretch from here.
+                self.anchor_mu = {arm_id: params['mu'] for arm_id, params in self.beliefs.items()}
+                self.anchor_time = time.monotonic()
+                self.aggregate_change = 0.0
+                return False
+            return time.monotonic() - self.anchor_time >= CONVERGENCE_WINDOW_SECONDS
+
+        best_arm = max(self.beliefs, key=lambda arm: self.beliefs[arm]['mu'])
+        if self.beliefs[best_arm]['nu'] < CONVERGENCE_MIN_PULLS:
+            return False
+        return probability_not_best(self.beliefs, best_arm) <= 1.0 - CONVERGENCE_CONFIDENCE
+
+    def process_belief_updates(self):
+        """Push mode: waits for published belief updates, applies them all, then tests convergence once."""
+        message = self.pubsub.get_message(timeout=PUSH_WAIT_SECONDS)
+        while message:
+            if message["type"] == "message":
+                self._apply_belief_update(message["data"])
+            message = self.pubsub.get_message()
+
+        if time.monotonic() - self._last_push_log >= CHECK_INTERVAL_SECONDS:
+            self._last_push_log = time.monotonic()
+            print(f"INFO (CONVERGENCE): {self.updates_seen} belief updates received. Aggregate change: {self.aggregate_change:.6f}")
+
+        if self._push_convergence_holds():
+            self.pubsub.close()
+            self.pubsub = None
+            self.handle_convergence(self.beliefs)
+
     def handle_convergence(self, converged_beliefs):
         if not converged_beliefs: return
         
         self.converged_best_arm = max(converged_beliefs, key=lambda arm: converged_beliefs[arm]['mu'])
         self.converged_belief_mean = converged_beliefs[self.converged_best_arm]['mu']
-        self.mode = "DRIFT_MONITORING"
-        self.redis.set("system:mode", "MONITORING")
+        self._set_mode("DRIFT_MONITORING")
+        self.redis.set(self.keys.mode, "MONITORING")
+        # Only rewards pulled after convergence count towards the drift baseline.
+        self.stream_redis.xgroup_setid(self.keys.reward_stream, REWARD_STREAM_GROUP, id="$")
+        self.drift_monitor.reset()
+        scenario = get_scenario(API_URL)
+        self.converged_at_clock = scenario["now"] if scenario else None
 
         # FIXED: Added 'f' for f-string formatting
         print("\n" + "="*60)
-        print(f">>> SYSTEM CONVERGED on Arm {self.converged_best_arm} with believed mean {self.converged_belief_mean:.2f}")
+        print(f">>> SYSTEM{self.tag} CONVERGED on Arm {self.converged_best_arm} with believed mean {self.converged_belief_mean:.2f}")
         print(">>> SWITCHING TO DRIFT MONITORING MODE.")
         print("="*60 + "\n")
 
-    def check_drift(self):
-        last_reward_str = self.redis.get(f"arm:{self.converged_best_arm}:last_reward")
-        if last_reward_str:
-            self.recent_rewards.append(float(last_reward_str))
-            self.redis.delete(f"arm:{self.converged_best_arm}:last_reward")
+    def _score_detection(self):
+        """
+        With a drift scenario running in the API, records how long after the first
+        ground-truth change since convergence the drift was detected, or a false alarm.
+        """
+        scenario = get_scenario(API_URL)
+        if scenario is None or self.converged_at_clock is None or scenario["now"] < self.converged_at_clock:
+            return # No scenario, or it was (re)loaded since convergence
+        changes = [point for point in scenario["change_points"] if self.converged_at_clock < point["t"] <= scenario["now"]]
+        if not changes:
+            FALSE_ALARMS.inc()
+            print(f"INFO (SCENARIO): No ground-truth change since convergence at {self.converged_at_clock:.0f} {scenario['clock']}: false alarm.")
+            return
+        change = changes[0]
+        delay = scenario["now"] - change["t"]
+        DETECTION_DELAY.labels(scenario["clock"]).observe(delay)
+        print(f"INFO (SCENARIO): Detected {delay:.0f} {scenario['clock']} after the {change['kind']} change of arm(s) {', '.join(change['arms'])} at {change['t']:.0f}.")
 
-        if len(self.recent_rewards) < DRIFT_WINDOW_SIZE:
-            print(f"INFO (DRIFT): Collecting rewards for baseline... ({len(self.recent_rewards)}/{DRIFT_WINDOW_SIZE})")
+    def check_drift(self):
+        # Blocking batch read of every reward appended since the last check.
+        # NOACK: a lost batch only delays drift detection, so no pending list is kept.
+        try:
+            response = self.stream_redis.xreadgroup(
+                REWARD_STREAM_GROUP, REWARD_STREAM_CONSUMER, {self.keys.reward_stream: ">"},
+                count=STREAM_READ_COUNT, block=STREAM_BLOCK_MS, noack=True,
+            )
+        except redis.ResponseError as e:
+            if "NOGROUP" not in str(e):
+                raise
+            self.recover_consumer_group()
             return
+        for _, entries in response or []:
+            self.process_rewards(entries)
 
-        current_avg_reward = sum(self.recent_rewards) / len(self.recent_rewards)
-        drift_threshold = self.converged_belief_mean * DRIFT_THRESHOLD_FACTOR
-        
-        print(f"INFO (DRIFT): Monitoring Arm {self.converged_best_arm}. Current Avg Reward: {current_avg_reward:.2f}, Drift Threshold: < {drift_threshold:.2f}")
-        
-        if current_avg_reward < drift_threshold:
-            self.handle_drift()
+    def recover_consumer_group(self):
+        """Redis lost its state (e.g. it restarted): recreates the stream's group and tells the agents the mode again."""
+        print(f"WARN{self.tag}: Reward stream consumer group missing. Recreating it.")
+        self._ensure_consumer_group()
+        self.redis.set(self.keys.mode, "MONITORING")
 
-    def handle_drift(self):
-        avg_reward = sum(self.recent_rewards) / len(self.recent_rewards) if self.recent_rewards else 0
-        drift_threshold_value = self.converged_belief_mean * DRIFT_THRESHOLD_FACTOR
-        
+    def process_rewards(self, entries):
+        """Feeds a batch of reward stream entries to the drift detector, handling the first drift that matters."""
+        for _, fields in entries:
+            arm_id = fields[b"arm"].decode()
+            if arm_id not in self.drift_monitor.arm_index: continue
+            direction = self.drift_monitor.update(arm_id, np.frombuffer(fields[b"rewards"], dtype="<f8"))
+            # Only changes that can alter the best arm matter: the best arm getting
+            # worse, or any other arm getting better.
+            if (arm_id == self.converged_best_arm and direction < 0) or (arm_id != self.converged_best_arm and direction > 0):
+                self.handle_drift(arm_id, direction)
+                return
+
+        # The loop now runs once per stream batch; keep the status log at its old pace.
+        if time.monotonic() - self._last_drift_log >= CHECK_INTERVAL_SECONDS:
+            self._last_drift_log = time.monotonic()
+            observed = int(self.drift_monitor.observations.sum())
+            print(f"INFO (DRIFT){self.tag}: Monitoring Arm {self.converged_best_arm} with {self.drift_monitor.detector_name}. Rewards observed since convergence: {observed}")
+
+    def handle_drift(self, drifted_arm, direction):
+        DRIFT_DETECTIONS.labels(drifted_arm).inc()
         # FIXED: Added 'f' for f-string formatting
         print("\n" + "!"*60)
-        print(f">>> DRIFT DETECTED on Arm {self.converged_best_arm}!")
-        print(f">>> Average reward {avg_reward:.2f} is below the threshold of {drift_threshold_value:.2f}.")
+        print(f">>> DRIFT DETECTED{self.tag} on Arm {drifted_arm}!")
+        print(f">>> {self.drift_monitor.detector_name} flagged its mean reward going {'up' if direction > 0 else 'down'} (converged best arm: {self.converged_best_arm}).")
         print(f">>> TRIGGERING SYSTEM-WIDE FORCED EXPLORATION for {FORCED_EXPLORATION_SECONDS} seconds.")
         print("!"*60 + "\n")
+        self._score_detection()
 
         # FIXED: Set mode to FORCED_EXPLORATION with an expiry for a clear re-learning phase.
-        self.redis.set("system:mode", "FORCED_EXPLORATION", ex=FORCED_EXPLORATION_SECONDS)
+        self.redis.set(self.keys.mode, "FORCED_EXPLORATION", ex=FORCED_EXPLORATION_SECONDS)
         
-        initial_beliefs = {'mu': '0.0', 'nu': '1.0', 'alpha': '0.2', 'beta': '0.2'}
-        for arm_id in self.arm_ids:
-            self.redis.hset(f"arm:{arm_id}", mapping=initial_beliefs)
+        # Resets every arm in O(1), in either layout: arms read as the prior until
+        # their next update, and updates still in flight from before the drift are dropped.
+        epoch = reset_beliefs(self.redis, self.keys.version, self.keys.epoch)
+        print(f"INFO{self.tag}: Beliefs reset to the prior (epoch {epoch}).")
         
-        self.mode = "CONVERGENCE_DETECTION"
+        self._set_mode("CONVERGENCE_DETECTION")
         self.previous_beliefs = self._get_current_beliefs()
         self.consecutive_stable_checks = 0
-        self.recent_rewards.clear()
+        self.drift_monitor.reset()
         self.converged_best_arm = None
         self.converged_belief_mean = None
+        self.converged_at_clock = None
+        if self.push:
+            self._subscribe_to_belief_updates()
+
+    def checkpoint_state(self):
+        """(meta, arrays) of this monitor's state for a snapshot, beliefs excluded."""
+        meta = {
+            "mode": self.mode,
+            "converged_best_arm": self.converged_best_arm,
+            "converged_belief_mean": self.converged_belief_mean,
+            "converged_at_clock": self.converged_at_clock,
+            "detector": self.drift_monitor.detector_name,
+        }
+        arrays = {f"detector.{name}": array for name, array in self.drift_monitor.state().items()}
+        return meta, arrays
+
+    def restore(self, snapshot) -> bool:
+        """Resumes the mode, convergence and drift detector state of a snapshot taken for the same arms and detector."""
+        meta = snapshot.meta
+        if snapshot.arm_ids != self.arm_ids or meta.get("detector") != self.drift_monitor.detector_name:
+            print(f"WARN{self.tag}: The checkpoint {snapshot.path} was taken for other arms or another detector. Starting fresh.")
+            return False
+        self.drift_monitor.load_state(snapshot.sections("detector."))
+        self.converged_best_arm = meta["converged_best_arm"]
+        self.converged_belief_mean = meta["converged_belief_mean"]
+        self.converged_at_clock = meta["converged_at_clock"]
+        if meta["mode"] != self.mode:
+            self._set_mode(meta["mode"])
+        if self.mode == "DRIFT_MONITORING":
+            self.redis.set(self.keys.mode, "MONITORING")
+            if self.pubsub is not None:
+                self.pubsub.close()
+                self.pubsub = None
+        age = time.time() - snapshot.created
+        print(f"INFO{self.tag}: Resumed {self.mode} from the checkpoint {snapshot.path} ({age:.0f}s old, converged arm: {self.converged_best_arm}).")
+        return True
+
+    def _set_mode(self, mode):
+        MODE_TRANSITIONS.labels(self.mode, mode).inc()
+        MODE.state(mode)
+        self.mode = mode
 
     def run(self):
-        if self.mode == "CONVERGENCE_DETECTION":
+        with TICK_SECONDS.labels(self.mode).time():
+            self._tick()
+
+    def _tick(self):
+        if self.mode == "CONVERGENCE_DETECTION" and self.push:
+            self.process_belief_updates()
+        elif self.mode == "CONVERGENCE_DETECTION":
             self.check_convergence()
         elif self.mode == "DRIFT_MONITORING":
             self.check_drift()
 
+class Checkpointer:
+    """
+    Writes the monitor's state and every arm's beliefs to a snapshot file every
+    `interval` seconds, and as soon as the mode or the converged arm changes.
+    With `log_interval` above 0, the belief rows that changed since are appended
+    to the snapshot's log every `log_interval` seconds in between.
+    """
+
+    def __init__(self, monitor, path: str, interval: float, log_interval: float = 0.0):
+        self.monitor = monitor
+        self.path = path
+        self.interval = interval
+        self.log_interval = log_interval
+        self.log = BeliefLog(log_path(path)) if log_interval > 0 else None
+        self._snapshot_at = 0.0
+        self._log_at = 0.0
+        self._snapshot_state = None # (mode, converged arm) of the last snapshot
+        self._written = None # Belief rows as of the last snapshot or log append
+
+    def tick(self):
+        """Writes a snapshot or a log append if one is due. I/O errors are logged, not raised."""
+        now = time.monotonic()
+        state = (self.monitor.mode, self.monitor.converged_best_arm)
+        snapshot_due = now - self._snapshot_at >= self.interval or state != self._snapshot_state
+        log_due = self.log is not None and self._written is not None and now - self._log_at >= self.log_interval
+        if not (snapshot_due or log_due):
+            return
+        kind = "snapshot" if snapshot_due else "log"
+        started = time.perf_counter()
+        t = time.time()
+        epoch, posteriors = self.monitor.read_posteriors()
+        if np.isnan(posteriors).any():
+            # Redis holds no (complete) belief state, e.g. it just restarted: keep the last checkpoint.
+            self._log_at = now
+            return
+        rows = np.frombuffer(pack_beliefs(posteriors, epoch), dtype="<f8").reshape(-1, 5)
+        try:
+            if snapshot_due:
+                meta, arrays = self.monitor.checkpoint_state()
+                meta["arm_ids"] = self.monitor.arm_ids
+                written = write_snapshot(self.path, {"beliefs": rows, **arrays}, meta, epoch, created=t)
+                if self.log is not None:
+                    self.log.truncate()
+                self._snapshot_at = self._log_at = now
+                self._snapshot_state = state
+            else:
+                changed = np.flatnonzero((rows != self._written).any(axis=1))
+                written = self.log.append(t, changed, rows[changed]) if len(changed) else 0
+                self._log_at = now
+        except OSError as e:
+            print(f"ERROR: Could not write the checkpoint {self.path}: {e}", file=sys.stderr)
+            self._snapshot_at = self._log_at = now # Retry at the next interval
+            return
+        self._written = rows
+        CHECKPOINT_WRITE_SECONDS.labels(kind).observe(time.perf_counter() - started)
+        CHECKPOINT_BYTES.labels(kind).inc(written)
+
+class ExperimentFleet:
+    """
+    Supervises several experiments from one process, one SystemMonitor each,
+    grouped by the Redis node holding them (see sharding.py). Polling only: per
+    node and tick, the beliefs of every experiment in convergence detection are
+    read in one pipeline (every CHECK_INTERVAL_SECONDS), and the reward streams
+    of every experiment in drift monitoring in one XREADGROUP.
+    """
+
+    def __init__(self, router, arm_ids, experiments, checkpoint_path: str = ""):
+        self.shards = [] # (raw client, monitors) per node
+        for (host, port), names in router.group(experiments).items():
+            redis_client = redis.Redis(host=host, port=port, decode_responses=True)
+            stream_client = redis.Redis(host=host, port=port)
+            monitors = [
+                SystemMonitor(redis_client, arm_ids, stream_client, orchestrator_mode="polling", experiment=experiment)
+                for experiment in names
+            ]
+            self.shards.append((stream_client, monitors))
+            print(f"INFO: {len(names)} experiment(s) on Redis {host}:{port}.")
+        self.monitors = [monitor for _, monitors in self.shards for monitor in monitors]
+        self.checkpointers = []
+        if checkpoint_path:
+            for monitor in self.monitors:
+                path = experiment_path(checkpoint_path, monitor.keys.experiment)
+                snapshot = load_snapshot(path)
+                if snapshot is not None:
+                    monitor.restore(snapshot)
+                self.checkpointers.append(Checkpointer(monitor, path, CHECKPOINT_SECONDS, CHECKPOINT_LOG_SECONDS))
+        # Each node's blocking stream read gets a share of the time one monitor would block for.
+        self.block_ms = max(1, STREAM_BLOCK_MS // len(self.shards))
+        self._checked_at = -np.inf
+
+    def tick(self):
+        check_due = time.monotonic() - self._checked_at >= CHECK_INTERVAL_SECONDS
+        if check_due:
+            self._checked_at = time.monotonic()
+        for client, monitors in self.shards:
+            if check_due:
+                self._check_convergence(client, [monitor for monitor in monitors if monitor.mode == "CONVERGENCE_DETECTION"])
+            self._check_drift(client, [monitor for monitor in monitors if monitor.mode == "DRIFT_MONITORING"])
+        for checkpointer in self.checkpointers:
+            checkpointer.tick()
+        for mode in MONITOR_MODES:
+            EXPERIMENTS_BY_MODE.labels(mode).set(sum(monitor.mode == mode for monitor in self.monitors))
+
+    def _check_convergence(self, client, monitors):
+        if not monitors: return
+        with TICK_SECONDS.labels("CONVERGENCE_DETECTION").time():
+            pipe = client.pipeline(transaction=False)
+            counts = [monitor.queue_posterior_read(pipe) for monitor in monitors]
+            replies = pipe.execute()
+            start = 0
+            for monitor, count in zip(monitors, counts):
+                _, posteriors = monitor.parse_posterior_read(replies[start:start + count])
+                start += count
+                monitor.check_convergence(monitor.beliefs_from(posteriors))
+
+    def _check_drift(self, client, monitors):
+        if not monitors: return
+        with TICK_SECONDS.labels("DRIFT_MONITORING").time():
+            by_stream = {monitor.keys.reward_stream.encode(): monitor for monitor in monitors}
+            try:
+                response = client.xreadgroup(
+                    REWARD_STREAM_GROUP, REWARD_STREAM_CONSUMER, {stream: ">" for stream in by_stream},
+                    count=STREAM_READ_COUNT, block=self.block_ms, noack=True,
+                )
+            except redis.ResponseError as e:
+                if "NOGROUP" not in str(e):
+                    raise
+                for monitor in monitors:
+                    monitor.recover_consumer_group()
+                return
+            for stream, entries in response or []:
+                by_stream[stream].process_rewards(entries)
+
+    @property
+    def monitoring_drift(self) -> bool:
+        return any(monitor.mode == "DRIFT_MONITORING" for monitor in self.monitors)
+
 def get_arm_ids_from_api(api_url: str):
     try:
-        response = requests.get(f"{api_url}/get_arm_configs")
-        response.raise_for_status()
-        return sorted(response.json().keys())
+        return fetch_arm_ids(api_url)
     except Exception as e:
         print(f"ORCHESTRATOR FATAL: Could not get arm IDs from API: {e}", file=sys.stderr)
         return None
 
 def main():
     print("--- Orchestrator Service Starting (v2.2 Final) ---")
+    start_metrics_server()
     time.sleep(15)
     arm_ids = get_arm_ids_from_api(API_URL)
     if not arm_ids: sys.exit(1)
     
-    redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
-    monitor = SystemMonitor(redis_client=redis_client, arm_ids=arm_ids)
-    print("INFO: Orchestrator initialized. Monitoring for convergence...")
+    router = ShardRouter(parse_nodes(REDIS_NODES, REDIS_HOST, REDIS_PORT))
+    if len(EXPERIMENTS) > 1:
+        run_fleet(router, arm_ids)
+        return
+
+    experiment = EXPERIMENTS[0] if EXPERIMENTS else ""
+    host, port = router.node_for(experiment)
+    redis_client = redis.Redis(host=host, port=port, decode_responses=True)
+    stream_client = redis.Redis(host=host, port=port)
+    monitor = SystemMonitor(redis_client=redis_client, arm_ids=arm_ids, stream_client=stream_client, experiment=experiment)
+    checkpointer = None
+    if CHECKPOINT_PATH:
+        path = experiment_path(CHECKPOINT_PATH, experiment)
+        snapshot = load_snapshot(path)
+        if snapshot is not None:
+            monitor.restore(snapshot)
+        checkpointer = Checkpointer(monitor, path, CHECKPOINT_SECONDS, CHECKPOINT_LOG_SECONDS)
+    print(f"INFO: Orchestrator initialized ({ORCHESTRATOR_MODE} mode). Monitoring for {'convergence' if monitor.mode == 'CONVERGENCE_DETECTION' else 'drift'}...")
 
     while True:
         try:
             monitor.run()
+            if checkpointer is not None:
+                checkpointer.tick()
         except Exception as e:
             print(f"ERROR in monitor loop: {e}", file=sys.stderr)
+            time.sleep(CHECK_INTERVAL_SECONDS)
+            continue
         
-        time.sleep(CHECK_INTERVAL_SECONDS)
+        # In drift monitoring the blocking stream read paces the loop, in push mode the pub/sub wait does.
+        if monitor.mode != "DRIFT_MONITORING" and not monitor.push:
+            time.sleep(CHECK_INTERVAL_SECONDS)
+
+def run_fleet(router, arm_ids):
+    if ORCHESTRATOR_MODE == "push":
+        print("WARN: Push mode supervises a single experiment; polling the experiments instead.")
+    fleet = ExperimentFleet(router, arm_ids, EXPERIMENTS, CHECKPOINT_PATH)
+    print(f"INFO: Orchestrator initialized for {len(EXPERIMENTS)} experiments on {len(fleet.shards)} Redis node(s).")
+
+    while True:
+        try:
+            fleet.tick()
+        except Exception as e:
+            print(f"ERROR in fleet loop: {e}", file=sys.stderr)
+            time.sleep(CHECK_INTERVAL_SECONDS)
+            continue
+
+        # Once any experiment monitors drift, the blocking stream reads pace the loop.
+        if not fleet.monitoring_drift:
+            time.sleep(CHECK_INTERVAL_SECONDS)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
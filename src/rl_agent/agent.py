@@ -1,35 +1,315 @@
 # src/rl_agent/agent.py (Final version with all modes)
 
+import time
 import redis
 import numpy as np
 import random
 
+from prometheus_client import Counter, Histogram
+
+from belief_store import (
+    BELIEF_FIELDS, BELIEF_PRIOR, PRIOR_LUA, REWARD_STREAM_KEY, UPDATE_PACKED_BELIEF_LUA, ExperimentKeys,
+    PackedBeliefs, apply_epoch, pack_beliefs,
+)
+from arm_index import CandidateIndex
+from checkpoint import load_snapshot
+from instrumentation import LATENCY_BUCKETS
+
+# REWARD_STREAM_KEY is a capped Redis Stream that receives every pulled reward, for drift
+# detection. Each entry holds the arm id and its rewards as little-endian float64 bytes.
+
+# Normal-Gamma prior every arm starts from.
+INITIAL_BELIEFS = {field: repr(value) for field, value in zip(BELIEF_FIELDS, BELIEF_PRIOR)}
+
+# --- Prometheus metrics (served on /metrics by main.py and async_runtime.py) ---
+# Decisions/sec is rate(bandit_agent_decisions_total); Redis round trips per
+# decision is rate(bandit_agent_redis_round_trips_total) / rate(bandit_agent_decisions_total).
+DECISION_SECONDS = Histogram(
+    "bandit_agent_decision_seconds", "Time to select arms, posterior read included.", ["mode"], buckets=LATENCY_BUCKETS,
+)
+DECISIONS = Counter("bandit_agent_decisions_total", "Arm selections made.", ["mode"])
+PULL_SECONDS = Histogram(
+    "bandit_agent_pull_seconds", "Latency of pulling arms from the slot machine API.", ["endpoint"],
+    buckets=LATENCY_BUCKETS,
+)
+PULL_ERRORS = Counter("bandit_agent_pull_errors_total", "Failed requests to the slot machine API.")
+REDIS_ROUND_TRIPS = Counter("bandit_agent_redis_round_trips_total", "Redis round trips, by operation.", ["operation"])
+WATCH_RETRIES = Counter("bandit_agent_watch_retries_total", "WATCH/MULTI belief updates retried after a WatchError.")
+BELIEF_UPDATES = Counter("bandit_agent_belief_updates_total", "Rewards applied to the beliefs.")
+STALE_REWARDS = Counter(
+    "bandit_agent_stale_rewards_total", "Rewards dropped because the beliefs were reset after they were pulled.",
+)
+FLUSH_STALENESS_SECONDS = Histogram(
+    "bandit_agent_flush_staleness_seconds", "Delta mode: mean age of the rewards merged into Redis by one flush.",
+    buckets=LATENCY_BUCKETS,
+)
+
+
+def sample_posterior_means(posteriors: np.ndarray, size=None, rng=None) -> np.ndarray:
+    """
+    Draws one Thompson sample of the mean for every row of a (K, 4) array of
+    (mu, nu, alpha, beta) Normal-Gamma parameters, in a single vectorized call.
+    With `size=n` it returns an (n, K) array of n independent draws per arm.
+    `rng` may be a np.random.Generator; the global NumPy RNG is used otherwise.
+    """
+    rng = np.random if rng is None else rng
+    mu, nu, alpha, beta = posteriors.T
+    shape = None if size is None else (size, len(posteriors))
+    tau = rng.gamma(shape=alpha, scale=1.0 / beta, size=shape)
+    std_dev = 1.0 / np.sqrt(nu * tau)
+    return rng.normal(loc=mu, scale=std_dev, size=shape)
+
+
+def sample_best_arms(posteriors: np.ndarray, size=None, chunk_size: int = 8192, rng=None):
+    """
+    Thompson Sampling over the rows of a (K, 4) posterior array, drawn
+    `chunk_size` rows at a time so temporaries stay cache-sized at large K.
+    Returns the row with the highest sampled mean and that sample (-inf if
+    there are no rows); with `size=n`, two (n,) arrays for n decisions.
+    """
+    n = 1 if size is None else size
+    best = np.zeros(n, dtype=np.intp)
+    best_value = np.full(n, -np.inf)
+    chunk_size = chunk_size if chunk_size > 0 else max(len(posteriors), 1)
+    for start in range(0, len(posteriors), chunk_size):
+        samples = sample_posterior_means(posteriors[start:start + chunk_size], size=n, rng=rng)
+        top = np.argmax(samples, axis=1)
+        value = samples[np.arange(n), top]
+        better = value > best_value
+        best[better] = start + top[better]
+        best_value[better] = value[better]
+    if size is None:
+        return int(best[0]), float(best_value[0])
+    return best, best_value
+
+
+def normal_gamma_update(posteriors: np.ndarray, n, mean, m2) -> np.ndarray:
+    """
+    Conjugate update of (..., 4) posterior arrays with the sufficient statistics
+    (n, mean, m2) of new rewards; the NumPy twin of UPDATE_BELIEF_LUA.
+    """
+    mu, nu, alpha, beta = np.moveaxis(posteriors, -1, 0)
+    nu_new = nu + n
+    d = mean - mu
+    return np.stack([
+        (nu * mu + n * mean) / nu_new,
+        nu_new,
+        alpha + 0.5 * n,
+        beta + 0.5 * m2 + nu * n * d * d / (2 * nu_new),
+    ], axis=-1)
+
+
+def append_rewards(pipe, arm_id: str, rewards: np.ndarray, maxlen: int, stream_key: str = REWARD_STREAM_KEY):
+    """Queues one XADD of `rewards` for `arm_id` on a pipeline, trimming the stream to about `maxlen` entries."""
+    pipe.xadd(
+        stream_key,
+        {"arm": arm_id, "rewards": np.asarray(rewards, dtype="<f8").tobytes()},
+        maxlen=maxlen,
+        approximate=True,
+    )
+
+
+def sufficient_statistics(rewards: np.ndarray) -> tuple[int, float, float]:
+    """Returns (n, mean, m2) of a reward batch, m2 being the sum of squared deviations from the mean."""
+    n = len(rewards)
+    mean = float(np.mean(rewards))
+    m2 = float(np.sum((rewards - mean) ** 2))
+    return n, mean, m2
+
+
+def merge_sufficient_statistics(a, b):
+    """
+    Combines two (n, mean, m2) triples into the statistics of the union of both
+    reward sets (Chan et al.'s parallel variance update). Works elementwise on arrays.
+    """
+    n_a, mean_a, m2_a = a
+    n_b, mean_b, m2_b = b
+    n = n_a + n_b
+    safe_n = np.where(n > 0, n, 1)
+    delta = mean_b - mean_a
+    return n, mean_a + delta * n_b / safe_n, m2_a + m2_b + delta * delta * n_a * n_b / safe_n
+
+
+# Every belief update announces the arm's new parameters on the experiment's
+# updates channel as "<arm key> <mu> <nu> <alpha> <beta>" (used by the
+# push-based orchestrator) and bumps its beliefs version counter, so readers
+# can cache derived views (see belief_store.ExperimentKeys).
+
+# Normal-Gamma conjugate update run atomically inside Redis.
+# KEYS[1] is the arm hash, KEYS[2] the beliefs version counter and KEYS[3] the belief epoch (belief_store.py).
+# ARGV holds the sufficient statistics of the new rewards: count n, their mean and the sum of squared deviations
+# from it (m2). A single reward r is (1, r, 0). All fields, the epoch included, are written in one HSET.
+# ARGV[4], if not empty, is the channel the new parameters are published on, and ARGV[5] the epoch the rewards
+# were pulled in. Returns {1, epoch} if applied, {0, epoch} if the arm has no beliefs and {-1, epoch} if the
+# rewards predate the last reset and were dropped; an arm not written since that reset restarts from the prior.
+UPDATE_BELIEF_LUA = PRIOR_LUA + """
+local epoch = tonumber(redis.call('GET', KEYS[3]) or '0')
+if tonumber(ARGV[5]) < epoch then return {-1, epoch} end
+local p = redis.call('HMGET', KEYS[1], 'mu', 'nu', 'alpha', 'beta', 'epoch')
+if not p[1] then return {0, epoch} end
+local mu, nu, alpha, beta = tonumber(p[1]), tonumber(p[2]), tonumber(p[3]), tonumber(p[4])
+if tonumber(p[5] or '0') < epoch then
+    mu, nu, alpha, beta = PRIOR[1], PRIOR[2], PRIOR[3], PRIOR[4]
+end
+local n, mean, m2 = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local nu_new = nu + n
+local d = mean - mu
+local new = {
+    string.format('%.17g', (nu * mu + n * mean) / nu_new),
+    string.format('%.17g', nu_new),
+    string.format('%.17g', alpha + 0.5 * n),
+    string.format('%.17g', beta + 0.5 * m2 + nu * n * d * d / (2 * nu_new)),
+}
+redis.call('HSET', KEYS[1], 'mu', new[1], 'nu', new[2], 'alpha', new[3], 'beta', new[4], 'epoch', epoch)
+redis.call('INCR', KEYS[2])
+if ARGV[4] and ARGV[4] ~= '' then
+    redis.call('PUBLISH', ARGV[4], KEYS[1] .. ' ' .. table.concat(new, ' '))
+end
+return {1, epoch}
+"""
+
+# Writes the initial beliefs of every arm, unless they already exist, in one atomic step: the hash layout's
+# counterpart of the packed layout's SET NX. KEYS[1] is the belief epoch and KEYS[2..] the arm hashes, the first of
+# which is checked for existing beliefs. ARGV[1] is the epoch of a checkpoint being restored, set unless an epoch is
+# already set (empty for a fresh start, whose rows take the current epoch), and ARGV[2..] holds mu, nu, alpha, beta
+# of each arm in turn. Returns {1, epoch} if the beliefs were written and {0, epoch} if they already existed.
+INIT_BELIEFS_LUA = """
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    return {0, tonumber(redis.call('GET', KEYS[1]) or '0')}
+end
+if ARGV[1] ~= '' then redis.call('SET', KEYS[1], ARGV[1], 'NX') end
+local epoch = tonumber(redis.call('GET', KEYS[1]) or '0')
+local row_epoch = ARGV[1] ~= '' and ARGV[1] or epoch
+for i = 2, #KEYS do
+    local j = 4 * i - 6
+    redis.call('HSET', KEYS[i], 'mu', ARGV[j], 'nu', ARGV[j + 1], 'alpha', ARGV[j + 2], 'beta', ARGV[j + 3],
+        'epoch', row_epoch)
+end
+return {1, epoch}
+"""
+
+
+def init_beliefs_call(keys: ExperimentKeys, arm_ids: list[str], snapshot=None) -> tuple[list, list]:
+    """KEYS and ARGV of INIT_BELIEFS_LUA: the prior for every arm, or the beliefs of a checkpoint `snapshot`."""
+    if snapshot is None:
+        return [keys.epoch, *map(keys.arm, arm_ids)], ["", *list(INITIAL_BELIEFS.values()) * len(arm_ids)]
+    rows = snapshot.posteriors_for(arm_ids).tolist()
+    return [keys.epoch, *map(keys.arm, arm_ids)], [snapshot.epoch, *(repr(value) for row in rows for value in row)]
+
+
 class ThompsonSamplingAgent:
-    def __init__(self, arm_ids: list[str], redis_client: redis.Redis):
+    def __init__(self, arm_ids: list[str], redis_client: redis.Redis, posterior_cache_ttl: float = 0.0,
+                 update_mode: str = "script", reward_stream_maxlen: int = 100_000, belief_storage: str = "hash",
+                 flush_interval: float = 1.0, arm_selection: str = "full", prune_tolerance: float = 0.01,
+                 sample_chunk_size: int = 8192, checkpoint_path: str = "", experiment: str = ""):
         self.arm_ids = arm_ids
         self.redis = redis_client
+        # Names of the experiment's keys; "" is the default experiment and its global key names.
+        self.keys = ExperimentKeys(experiment)
+        self.reward_stream_maxlen = reward_stream_maxlen
+        # "script" runs the conjugate update server-side; "watch" uses the optimistic WATCH/MULTI loop;
+        # "delta" accumulates sufficient statistics locally and merges them into Redis every `flush_interval` seconds.
+        self.update_mode = update_mode
+        self.flush_interval = flush_interval
+        self._arm_index = {arm_id: i for i, arm_id in enumerate(arm_ids)}
+        self._pending_stats = np.zeros((3, len(arm_ids))) # n, mean, m2 of the unflushed rewards, per arm
+        self._pending_rewards = {} # arm_id -> unflushed reward arrays, for the reward stream
+        self._pending_age = 0.0 # sum of the unflushed rewards' arrival times
+        self._pending_epoch = 0 # epoch the unflushed rewards were pulled in
+        # Belief epoch as of the last read; updates are tagged with it, so the
+        # scripts can drop rewards pulled before a reset the agent had not seen.
+        self.epoch = 0
+        self._last_flush = time.monotonic()
+        self._update_script = self.redis.register_script(UPDATE_BELIEF_LUA)
+        self._init_script = self.redis.register_script(INIT_BELIEFS_LUA)
+        # "hash" keeps one arm:<id> hash per arm; "packed" keeps all arms in one binary string (belief_store.py).
+        self.belief_storage = belief_storage
+        self.packed = PackedBeliefs(arm_ids) if belief_storage == "packed" else None
+        if self.packed is not None:
+            if update_mode == "watch":
+                raise ValueError("The packed belief storage does not support the 'watch' update mode.")
+            self._packed_update_script = self.redis.register_script(UPDATE_PACKED_BELIEF_LUA)
+        # Contention counters, so the update paths can be compared. In delta mode
+        # "staleness_seconds" sums how long each reward waited before being flushed;
+        # "stale_rewards" counts rewards dropped because a reset happened after their pull.
+        self.stats = {
+            "updates": 0, "watch_retries": 0, "round_trips": 0, "flushes": 0, "staleness_seconds": 0.0,
+            "stale_rewards": 0,
+        }
+        # "full" samples every arm per decision; "pruned" only the candidates of a
+        # CandidateIndex (arm_index.py), rebuilt whenever a new snapshot is read.
+        self.arm_selection = arm_selection
+        self.prune_tolerance = prune_tolerance
+        self.sample_chunk_size = sample_chunk_size
+        self._index = None
+        self._index_source = None # Snapshot the index was built from
+        # Seconds a posterior snapshot read from Redis may be reused; 0 disables the cache.
+        self.posterior_cache_ttl = posterior_cache_ttl
+        self._cached_posteriors = None
+        self._cached_at = 0.0
+        # Snapshot file (checkpoint.py) to restore beliefs from when Redis holds none; "" starts from the prior.
+        self.checkpoint_path = checkpoint_path
         self._initialize_state_in_redis()
 
     def _initialize_state_in_redis(self):
         """Checks if beliefs exist in Redis for arm '0', if not, initializes all."""
-        # Use a transaction to check and set initial values atomically if needed.
-        pipe = self.redis.pipeline()
-        pipe.exists(f"arm:{self.arm_ids[0]}")
-        exists = pipe.execute()[0]
+        if self.packed is not None:
+            self._initialize_packed_state()
+            return
+        # The check and the write run as one script, so agents starting together cannot overwrite each other's
+        # beliefs (or updates applied in between) with the prior or an older checkpoint.
+        snapshot = None if self.redis.exists(self.keys.arm(self.arm_ids[0])) else self._load_checkpoint()
+        keys, args = init_beliefs_call(self.keys, self.arm_ids, snapshot)
+        created, self.epoch = self._init_script(keys=keys, args=args)
+        if created and snapshot is None:
+            print("INFO: No belief state found in Redis. Initialized new agent state.")
+        elif not created:
+            print("INFO: Existing belief state found in Redis.")
 
-        if not exists:
-            print("INFO: No belief state found in Redis. Initializing new agent state.")
-            initial_beliefs = {'mu': '0.0', 'nu': '1.0', 'alpha': '0.2', 'beta': '0.2'}
-            for arm_id in self.arm_ids:
-                self.redis.hset(f"arm:{arm_id}", mapping=initial_beliefs)
-            print("INFO: New state initialized in Redis.")
+    def _initialize_packed_state(self):
+        """Writes the packed prior and its arm layout unless another agent already did (SET NX)."""
+        # A snapshot created now is tagged epoch 0; rows older than the current epoch read as the prior anyway.
+        snapshot = None if self.redis.exists(self.keys.packed_beliefs) else self._load_checkpoint()
+        pipe = self.redis.pipeline()
+        if snapshot is None:
+            initial = self.packed.initial_snapshot()
         else:
-            print("INFO: Existing belief state found in Redis.")
+            pipe.set(self.keys.epoch, snapshot.epoch, nx=True)
+            initial = pack_beliefs(snapshot.posteriors_for(self.arm_ids), snapshot.epoch)
+        pipe.set(self.keys.packed_arms, self.packed.layout_json(), nx=True)
+        pipe.set(self.keys.packed_beliefs, initial, nx=True)
+        pipe.get(self.keys.packed_arms)
+        pipe.get(self.keys.epoch)
+        *_, created, layout, epoch = pipe.execute()
+        self.packed.set_layout(layout)
+        self.epoch = int(epoch or 0)
+        if created and snapshot is None:
+            print("INFO: No belief state found in Redis. Initialized new packed agent state.")
+        elif not created:
+            print("INFO: Existing packed belief state found in Redis.")
+
+    def _load_checkpoint(self):
+        """The snapshot to restore beliefs from, if checkpointing is configured and one exists."""
+        started = time.perf_counter()
+        snapshot = load_snapshot(self.checkpoint_path)
+        if snapshot is not None:
+            age = time.time() - snapshot.created
+            print(f"INFO: No belief state found in Redis. Restoring {len(snapshot.arm_ids)} arms from the checkpoint "
+                  f"{self.checkpoint_path} ({age:.0f}s old, epoch {snapshot.epoch}, {snapshot.replayed} log records) "
+                  f"in {1000 * (time.perf_counter() - started):.1f} ms.")
+        return snapshot
 
     def select_arm(self, mode="LEARNING", epsilon=0.05) -> str:
         """
         Selects an arm based on the current system mode.
         """
+        started = time.perf_counter()
+        arm_id = self._select_arm(mode, epsilon)
+        DECISION_SECONDS.labels(mode).observe(time.perf_counter() - started)
+        DECISIONS.labels(mode).inc()
+        return arm_id
+
+    def _select_arm(self, mode, epsilon) -> str:
         # --- NEW: Logic to handle all system modes ---
         if mode == "FORCED_EXPLORATION":
             # In this mode, ignore all beliefs and just pick a random arm.
@@ -41,38 +321,306 @@ class ThompsonSamplingAgent:
         # -----------------------------------------------
 
         # Otherwise (in LEARNING mode or for the 95% exploitation in MONITORING),
-        # use Thompson Sampling as before.
-        sampled_means = []
-        for arm_id in self.arm_ids:
-            params_raw = self.redis.hgetall(f"arm:{arm_id}")
-            if not params_raw: continue # Skip if arm beliefs somehow don't exist
-            
-            params = {k.decode('utf-8'): float(v.decode('utf-8')) for k, v in params_raw.items()}
-
-            tau = np.random.gamma(shape=params['alpha'], scale=1.0/params['beta'])
-            std_dev = 1.0 / np.sqrt(params['nu'] * tau)
-            mu = np.random.normal(loc=params['mu'], scale=std_dev)
-            sampled_means.append(mu)
-
-        if not sampled_means:
+        # use Thompson Sampling over all arms at once.
+        best_arm_index = self._thompson_choices()
+        if best_arm_index is None:
             return random.choice(self.arm_ids) # Fallback if no beliefs were found
-
-        best_arm_index = np.argmax(sampled_means)
         return self.arm_ids[best_arm_index]
 
+    def select_arms(self, num_pulls: int, mode="LEARNING", epsilon=0.05) -> dict[str, int]:
+        """
+        Makes `num_pulls` independent decisions at once and returns how many
+        pulls each chosen arm gets. One posterior read serves the whole batch.
+        """
+        started = time.perf_counter()
+        num_arms = len(self.arm_ids)
+        if mode == "FORCED_EXPLORATION":
+            choices = np.random.randint(num_arms, size=num_pulls)
+        else:
+            choices = self._thompson_choices(size=num_pulls)
+            if choices is None:
+                choices = np.random.randint(num_arms, size=num_pulls)
+            if mode == "MONITORING":
+                explore = np.random.random(num_pulls) < epsilon
+                choices[explore] = np.random.randint(num_arms, size=int(explore.sum()))
+
+        counts = np.bincount(choices, minlength=num_arms)
+        DECISION_SECONDS.labels(mode).observe(time.perf_counter() - started)
+        DECISIONS.labels(mode).inc(num_pulls)
+        return {self.arm_ids[i]: int(counts[i]) for i in np.flatnonzero(counts)}
+
+    def _thompson_choices(self, size=None):
+        """
+        Index of the arm with the highest sampled mean (an (n,) array of
+        indices with `size=n`), or None if no arm has beliefs.
+        """
+        if self.arm_selection == "pruned":
+            choices = self._pruned_choices(size)
+            if choices is not None:
+                return choices
+        posteriors = self._read_posteriors()
+        known = np.flatnonzero(~np.isnan(posteriors).any(axis=1))
+        if len(known) == 0:
+            return None
+        if len(known) == len(posteriors):
+            return sample_best_arms(posteriors, size, self.sample_chunk_size)[0]
+        best, _ = sample_best_arms(posteriors[known], size, self.sample_chunk_size)
+        return known[best]
+
+    def _candidate_index(self, shared: np.ndarray) -> CandidateIndex:
+        """The CandidateIndex of a shared snapshot, built once per snapshot."""
+        if self._index_source is not shared:
+            self._index = CandidateIndex(shared, self.prune_tolerance)
+            self._index_source = shared
+        return self._index
+
+    def _pruned_choices(self, size=None):
+        """
+        Thompson decision(s) that only sample the candidate arms of the current
+        snapshot's CandidateIndex, plus one exact draw for all arms at the prior.
+        Arms with unflushed rewards (delta mode) are always sampled, merged.
+        If the index keeps more than half the arms (e.g. everything explored but
+        nothing converged yet), sampling every arm is exact and cheaper: None.
+        """
+        shared = self._read_shared_posteriors()
+        index = self._candidate_index(shared)
+        if 2 * len(index.candidates) > len(shared):
+            return None
+        self._drop_stale_pending()
+        dirty = np.flatnonzero(self._pending_stats[0]) if self._pending_rewards else np.empty(0, dtype=np.intp)
+        candidates = np.union1d(index.candidates, dirty) if len(dirty) else index.candidates
+        if len(candidates) == 0 and len(index.prior_arms) == 0:
+            return None
+        rows = shared[candidates]
+        if len(dirty):
+            rows[np.searchsorted(candidates, dirty)] = normal_gamma_update(shared[dirty], *self._pending_stats[:, dirty])
+
+        best, value = sample_best_arms(rows, size, self.sample_chunk_size)
+        prior_value = index.sample_prior_max(size, excluded=int(index.is_prior[dirty].sum()))
+        excluded = set(dirty.tolist())
+        if size is None:
+            return index.random_prior_arms(excluded=excluded) if prior_value >= value else int(candidates[best])
+        choices = candidates[best] if len(candidates) else np.zeros(size, dtype=np.intp)
+        from_prior = prior_value >= value
+        if from_prior.any():
+            choices[from_prior] = index.random_prior_arms(int(from_prior.sum()), excluded=excluded)
+        return choices
+
+    def _read_posteriors(self) -> np.ndarray:
+        """
+        Reads every arm's posterior in one pipelined round trip and returns a
+        (K, 4) float array ordered like BELIEF_FIELDS. Arms without beliefs are NaN.
+        Within `posterior_cache_ttl` seconds the previous snapshot is reused.
+        In delta mode the agent's unflushed rewards are merged in, so its own
+        observations count immediately, unless the beliefs were reset since.
+        """
+        posteriors = self._read_shared_posteriors()
+        self._drop_stale_pending()
+        if not self._pending_rewards:
+            return posteriors
+        dirty = np.flatnonzero(self._pending_stats[0])
+        merged = np.array(posteriors)
+        merged[dirty] = normal_gamma_update(posteriors[dirty], *self._pending_stats[:, dirty])
+        return merged
+
+    def _read_shared_posteriors(self) -> np.ndarray:
+        now = time.monotonic()
+        if self._cached_posteriors is not None and now - self._cached_at < self.posterior_cache_ttl:
+            return self._cached_posteriors
+
+        REDIS_ROUND_TRIPS.labels("read").inc()
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.get(self.keys.epoch)
+        if self.packed is not None:
+            # One GET for every arm, decoded without copying or parsing.
+            pipe.get(self.keys.packed_beliefs)
+            epoch, raw = pipe.execute()
+            self.epoch = int(epoch or 0)
+            posteriors = self.packed.decode(raw, self.epoch)
+        else:
+            for arm_id in self.arm_ids:
+                pipe.hmget(self.keys.arm(arm_id), (*BELIEF_FIELDS, "epoch"))
+            epoch, *rows = pipe.execute()
+            self.epoch = int(epoch or 0)
+
+            # NumPy parses the raw byte strings directly; missing fields (None) become NaN.
+            rows = np.array(rows, dtype=np.float64).reshape(-1, 5)
+            posteriors = apply_epoch(rows[:, :4], rows[:, 4], self.epoch)
+
+        if self.posterior_cache_ttl > 0:
+            self._cached_posteriors = posteriors
+            self._cached_at = now
+        return posteriors
+
     def update_belief(self, arm_id: str, reward: float):
-        """Updates belief parameters in Redis for the chosen arm using a transaction."""
-        arm_key = f"arm:{arm_id}"
+        """Updates belief parameters in Redis for the chosen arm."""
+        self.stats["updates"] += 1
+        BELIEF_UPDATES.inc()
+        if self.update_mode == "delta":
+            self._accumulate(arm_id, np.array([reward], dtype=np.float64))
+            self._flush_if_due()
+        elif self.update_mode == "watch":
+            if self._update_belief_watch(arm_id, reward):
+                append_rewards(self.redis, arm_id, [reward], self.reward_stream_maxlen, self.keys.reward_stream)
+                self._count_round_trips(1)
+        else:
+            # One round trip: Redis runs the update script atomically (no retries)
+            # and appends the reward to the stream in the same pipeline.
+            pipe = self.redis.pipeline(transaction=False)
+            self._queue_update(pipe, arm_id, 1, reward, 0.0, self.epoch)
+            append_rewards(pipe, arm_id, [reward], self.reward_stream_maxlen, self.keys.reward_stream)
+            self._check_epochs(pipe.execute()[:1], [1])
+            self._count_round_trips(1)
+
+    def update_beliefs(self, rewards_by_arm: dict[str, np.ndarray]):
+        """
+        Applies a whole minibatch of rewards: one conjugate update per arm from the
+        batch's sufficient statistics plus one stream entry per arm, all sent in a
+        single pipelined round trip. In delta mode the batch is accumulated instead.
+        """
+        if self.update_mode == "delta":
+            for arm_id, rewards in rewards_by_arm.items():
+                if len(rewards) == 0: continue
+                self._accumulate(arm_id, np.asarray(rewards, dtype=np.float64))
+                self.stats["updates"] += len(rewards)
+                BELIEF_UPDATES.inc(len(rewards))
+            self._flush_if_due()
+            return
+
+        rewards_by_arm = {arm_id: rewards for arm_id, rewards in rewards_by_arm.items() if len(rewards)}
+        pipe = self.redis.pipeline(transaction=False)
+        for arm_id, rewards in rewards_by_arm.items():
+            self._queue_update(pipe, arm_id, *sufficient_statistics(rewards), self.epoch)
+        for arm_id, rewards in rewards_by_arm.items():
+            append_rewards(pipe, arm_id, rewards, self.reward_stream_maxlen, self.keys.reward_stream)
+            self.stats["updates"] += len(rewards)
+            BELIEF_UPDATES.inc(len(rewards))
+        counts = [len(rewards) for rewards in rewards_by_arm.values()]
+        self._check_epochs(pipe.execute()[:len(counts)], counts)
+        self._count_round_trips(1)
+
+    def _accumulate(self, arm_id: str, rewards: np.ndarray):
+        self._drop_stale_pending()
+        if not self._pending_rewards:
+            self._pending_epoch = self.epoch
+        i = self._arm_index[arm_id]
+        self._pending_stats[:, i] = merge_sufficient_statistics(self._pending_stats[:, i], sufficient_statistics(rewards))
+        self._pending_rewards.setdefault(arm_id, []).append(rewards)
+        self._pending_age += len(rewards) * time.monotonic()
+
+    def _flush_if_due(self):
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        Delta mode: merges every arm's accumulated statistics into the shared
+        beliefs (one conjugate update per arm, exact for any batch) and appends
+        the buffered rewards to the stream, in one pipelined round trip.
+        """
+        now = time.monotonic()
+        self._last_flush = now
+        if not self._pending_rewards:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        counts = []
+        for arm_id in self._pending_rewards:
+            n, mean, m2 = self._pending_stats[:, self._arm_index[arm_id]]
+            self._queue_update(pipe, arm_id, int(n), float(mean), float(m2), self._pending_epoch)
+            counts.append(int(n))
+        for arm_id, chunks in self._pending_rewards.items():
+            append_rewards(pipe, arm_id, np.concatenate(chunks), self.reward_stream_maxlen, self.keys.reward_stream)
+        self._check_epochs(pipe.execute()[:len(counts)], counts)
+        self._count_round_trips(1)
+
+        count = self._pending_stats[0].sum()
+        staleness = float(count * now - self._pending_age)
+        self.stats["flushes"] += 1
+        self.stats["staleness_seconds"] += staleness
+        FLUSH_STALENESS_SECONDS.observe(staleness / count)
+        self._pending_stats[:] = 0.0
+        self._pending_rewards = {}
+        self._pending_age = 0.0
+
+    def _drop_stale_pending(self):
+        """Delta mode: discards unflushed rewards pulled before a reset this agent has since seen."""
+        if self._pending_rewards and self._pending_epoch < self.epoch:
+            count = int(self._pending_stats[0].sum())
+            self.stats["stale_rewards"] += count
+            STALE_REWARDS.inc(count)
+            self._pending_stats[:] = 0.0
+            self._pending_rewards = {}
+            self._pending_age = 0.0
+
+    def _check_epochs(self, results, counts):
+        """
+        Reads the {status, epoch} replies of the update scripts: counts the
+        rewards dropped as stale and moves the agent to the newest epoch seen,
+        so its next updates are accepted even if it has not read beliefs since.
+        An arm without beliefs means Redis lost its state (e.g. it restarted):
+        the beliefs are initialized again, from the checkpoint if there is one.
+        """
+        missing = False
+        for (status, epoch), count in zip(results, counts):
+            if status < 0:
+                self.stats["stale_rewards"] += count
+                STALE_REWARDS.inc(count)
+            missing = missing or status == 0
+            self.epoch = max(self.epoch, int(epoch))
+        if missing:
+            print("WARN: Beliefs are missing from Redis. Initializing them again.")
+            self._cached_posteriors = None
+            self._initialize_state_in_redis()
+
+    def _count_round_trips(self, n: int):
+        self.stats["round_trips"] += n
+        REDIS_ROUND_TRIPS.labels("update").inc(n)
+
+    def _queue_update(self, pipe, arm_id: str, n, mean, m2, epoch: int):
+        """
+        Queues the conjugate update script for one arm on `pipe`, for the
+        configured storage layout. `epoch` is the one the rewards were pulled in.
+        """
+        if self.packed is not None:
+            self._packed_update_script(
+                keys=[self.keys.packed_beliefs, self.keys.version, self.keys.epoch],
+                args=self.packed.update_args(arm_id, n, mean, m2, self.keys.updates_channel, epoch),
+                client=pipe,
+            )
+        else:
+            self._update_script(
+                keys=[self.keys.arm(arm_id), self.keys.version, self.keys.epoch],
+                args=[n, mean, m2, self.keys.updates_channel, epoch], client=pipe,
+            )
+
+    def _update_belief_watch(self, arm_id: str, reward: float) -> bool:
+        """
+        Optimistic WATCH/MULTI update, kept to compare contention against the script path.
+        Returns False if the arm had no beliefs, in which case they are initialized
+        again and the reward is neither applied nor logged.
+        """
+        arm_key = self.keys.arm(arm_id)
         
         with self.redis.pipeline() as pipe:
             while True:
                 try:
-                    pipe.watch(arm_key)
+                    pipe.watch(arm_key, self.keys.epoch)
                     
                     params_raw = pipe.hgetall(arm_key)
-                    if not params_raw: break # Exit if the key was deleted mid-op
+                    epoch = int(pipe.get(self.keys.epoch) or 0)
+                    self._count_round_trips(3) # WATCH + HGETALL + GET
+                    if not params_raw:
+                        pipe.unwatch()
+                        self._check_epochs([(0, epoch)], [1])
+                        return False
+                    if self.epoch < epoch:
+                        # Pulled before a reset: drop the reward, as the update script does.
+                        self._check_epochs([(-1, epoch)], [1])
+                        return True
                         
                     params = {k.decode('utf-8'): float(v.decode('utf-8')) for k, v in params_raw.items()}
+                    if params.get('epoch', 0) < epoch:
+                        params = dict(zip(BELIEF_FIELDS, BELIEF_PRIOR)) # First write since the reset
                     mu_prev, nu_prev, alpha_prev, beta_prev = params['mu'], params['nu'], params['alpha'], params['beta']
                     
                     pipe.multi()
@@ -86,8 +634,14 @@ class ThompsonSamplingAgent:
                     pipe.hset(arm_key, "nu", nu_new)
                     pipe.hset(arm_key, "alpha", alpha_new)
                     pipe.hset(arm_key, "beta", beta_new)
+                    pipe.hset(arm_key, "epoch", epoch)
+                    pipe.incr(self.keys.version)
+                    pipe.publish(self.keys.updates_channel, f"{arm_key} {mu_new!r} {nu_new!r} {alpha_new!r} {beta_new!r}")
                     
+                    self._count_round_trips(1)
                     pipe.execute()
-                    break
+                    return True
                 except redis.WatchError:
-                    continue # Retry if another agent changed the key
\ No newline at end of file
+                    self.stats["watch_retries"] += 1
+                    WATCH_RETRIES.inc()
+                    continue # Retry if another agent changed the key
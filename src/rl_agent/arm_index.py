@@ -0,0 +1,94 @@
+# src/rl_agent/arm_index.py
+#
+# Candidate pruning for very large arm counts (ARM_SELECTION=pruned).
+#
+# A Thompson decision only needs the arm with the highest sampled mean, and
+# with many arms most of them cannot plausibly produce it. A CandidateIndex is
+# built once per posterior snapshot and splits the arms into:
+#   - contenders: explored arms whose upper quantile of the posterior mean
+#     reaches the highest lower quantile of any arm (or group of arms);
+#   - arms still at the prior: they are exchangeable, so the best of their m
+#     samples is drawn exactly with one inverse-CDF draw of the maximum of m
+#     Student-t variables, and a uniformly random one of them takes it;
+#   - everything else, which decisions never sample.
+# Quantiles are taken at tail mass tolerance / (K + 1), so the probability
+# that pruning changes a decision stays below `tolerance`.
+
+import numpy as np
+from scipy.special import stdtrit
+
+from belief_store import BELIEF_PRIOR
+
+
+def mean_marginals(posteriors: np.ndarray):
+    """
+    (df, loc, scale) of the Student-t marginal of each arm's mean under (K, 4)
+    Normal-Gamma posteriors: the distribution one Thompson sample is drawn from.
+    """
+    mu, nu, alpha, beta = np.asarray(posteriors).T
+    return 2 * alpha, mu, np.sqrt(beta / (alpha * nu))
+
+
+def student_t_upper_quantiles(df: np.ndarray, tail: float) -> np.ndarray:
+    """
+    Quantiles leaving `tail` probability above them, computed once per distinct
+    df: df = 2 * alpha grows by one per reward, so K arms share few values.
+    """
+    values, inverse = np.unique(df, return_inverse=True)
+    return -stdtrit(values, tail)[inverse]
+
+
+class CandidateIndex:
+    """The arms a Thompson decision must sample, for one posterior snapshot."""
+
+    def __init__(self, posteriors: np.ndarray, tolerance: float = 0.01, prior=BELIEF_PRIOR):
+        prior = np.asarray(prior, dtype=np.float64)
+        known = ~np.isnan(posteriors).any(axis=1)
+        self.is_prior = known & (posteriors == prior).all(axis=1)
+        self.prior_arms = np.flatnonzero(self.is_prior)
+        explored = np.flatnonzero(known & ~self.is_prior)
+        self._prior_df, self._prior_loc, self._prior_scale = (float(x) for x in mean_marginals(prior))
+
+        tail = tolerance / (len(posteriors) + 1)
+        df, loc, scale = mean_marginals(posteriors[explored])
+        spread = scale * student_t_upper_quantiles(df, tail)
+        # Some arm's sample is at least this high, except with probability `tail`.
+        threshold = max(
+            float(np.max(loc - spread)) if len(explored) else -np.inf,
+            self._prior_max_quantile(tail, len(self.prior_arms)),
+        )
+        upper = loc + spread
+        # Contenders, best upper bound first.
+        contenders = np.flatnonzero(upper >= threshold)
+        self.candidates = explored[contenders[np.argsort(-upper[contenders])]]
+
+    def _prior_max_quantile(self, p: float, m: int) -> float:
+        """Value the best of `m` samples of prior arms stays below with probability `p`."""
+        if m == 0:
+            return -np.inf
+        # F(x)^m = p, with 1 - F(x) = -expm1(log(p) / m) kept exact for large m.
+        return self._prior_loc - self._prior_scale * float(stdtrit(self._prior_df, -np.expm1(np.log(p) / m)))
+
+    def sample_prior_max(self, size=None, excluded: int = 0, rng=None):
+        """
+        Draws the highest Thompson sample among the prior arms, minus `excluded`
+        of them, exactly and in O(1); -inf if there are none. `size=n` draws n.
+        """
+        rng = np.random if rng is None else rng
+        m = len(self.prior_arms) - excluded
+        if m <= 0:
+            return -np.inf if size is None else np.full(size, -np.inf)
+        u = rng.random(size)
+        return self._prior_loc - self._prior_scale * stdtrit(self._prior_df, -np.expm1(np.log(u) / m))
+
+    def random_prior_arms(self, size=None, excluded=(), rng=None):
+        """
+        Uniformly random prior arm(s) not in `excluded` (a small set of arm
+        indices): one index, or an (n,) array for size=n.
+        """
+        rng = np.random if rng is None else rng
+        arms = np.atleast_1d(rng.choice(self.prior_arms, size=size))
+        for i in range(len(arms)):
+            while arms[i] in excluded:
+                arms[i] = rng.choice(self.prior_arms)
+        return int(arms[0]) if size is None else arms
@@ -0,0 +1,18 @@
+# src/rl_agent/arms_client.py
+#
+# Arm discovery: every arm id of the slot machine API, paged through GET /arms
+# so no single response grows with the number of arms.
+
+import requests
+
+
+def fetch_arm_ids(api_url: str, page_size: int = 10_000) -> list[str]:
+    """Pages through GET /arms, which returns arm metadata as compact arrays, and collects every arm id."""
+    arm_ids = []
+    while True:
+        response = requests.get(f"{api_url}/arms", params={'offset': len(arm_ids), 'limit': page_size}, timeout=5)
+        response.raise_for_status()
+        page = response.json()
+        arm_ids.extend(page['arm_ids'])
+        if not page['arm_ids'] or len(arm_ids) >= page['total']:
+            return arm_ids
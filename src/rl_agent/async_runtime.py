@@ -0,0 +1,350 @@
+# src/rl_agent/async_runtime.py
+#
+# Asyncio runtime: many logical Thompson Sampling agents multiplexed in one
+# process over a keep-alive HTTP connection pool and a pooled Redis client.
+# Enabled with AGENT_RUNTIME=async; see main.py.
+
+import asyncio
+import random
+import signal
+import sys
+import time
+from collections import deque
+
+import aiohttp
+import numpy as np
+import redis
+import redis.asyncio as aioredis
+
+from agent import (
+    BELIEF_FIELDS, INIT_BELIEFS_LUA, UPDATE_BELIEF_LUA, init_beliefs_call,
+    append_rewards, sample_posterior_means,
+    DECISION_SECONDS, DECISIONS, PULL_SECONDS, PULL_ERRORS, REDIS_ROUND_TRIPS, BELIEF_UPDATES, STALE_REWARDS,
+)
+from belief_store import UPDATE_PACKED_BELIEF_LUA, ExperimentKeys, PackedBeliefs, apply_epoch, pack_beliefs
+from checkpoint import experiment_path, load_snapshot
+from instrumentation import RateLimitedLog, start_metrics_server
+from config import (
+    API_BASE_URL, POSTERIOR_CACHE_TTL_SECONDS, REWARD_STREAM_MAXLEN, BELIEF_STORAGE, BELIEF_UPDATE_MODE,
+    ASYNC_AGENT_COUNT, ASYNC_PULL_RATES, HTTP_POOL_SIZE, REDIS_POOL_SIZE, STATS_REPORT_SECONDS, CHECKPOINT_PATH,
+    EXPERIMENT_ID, ARM_SELECTION, AGENT_BATCH_SIZE,
+)
+from main import experiment_redis_node, get_arm_ids_from_api
+
+# How often the shared system mode is re-read from Redis, in seconds.
+MODE_REFRESH_SECONDS = 0.5
+# Pause of a logical agent after a failed pull or Redis call, in seconds.
+ERROR_BACKOFF_SECONDS = 5
+
+
+class AsyncThompsonSamplingAgent:
+    """Asyncio counterpart of ThompsonSamplingAgent, using the same sampling and update math."""
+
+    def __init__(self, arm_ids: list[str], redis_client: aioredis.Redis, posterior_cache_ttl: float = 0.0,
+                 reward_stream_maxlen: int = 100_000, belief_storage: str = "hash", checkpoint_path: str = "",
+                 experiment: str = ""):
+        self.arm_ids = arm_ids
+        self.redis = redis_client
+        self.keys = ExperimentKeys(experiment)
+        self.reward_stream_maxlen = reward_stream_maxlen
+        self._update_script = self.redis.register_script(UPDATE_BELIEF_LUA)
+        self._init_script = self.redis.register_script(INIT_BELIEFS_LUA)
+        self.packed = PackedBeliefs(arm_ids) if belief_storage == "packed" else None
+        if self.packed is not None:
+            self._packed_update_script = self.redis.register_script(UPDATE_PACKED_BELIEF_LUA)
+        self.posterior_cache_ttl = posterior_cache_ttl
+        self._cached_posteriors = None
+        self._cached_at = 0.0
+        self.epoch = 0 # Belief epoch as of the last read; updates are tagged with it
+        self.checkpoint_path = checkpoint_path # Snapshot to restore beliefs from when Redis holds none (checkpoint.py)
+
+    async def initialize_state_in_redis(self):
+        """Initializes every arm, from the checkpoint if there is one or else to the prior, unless beliefs already exist."""
+        self.epoch = int(await self.redis.get(self.keys.epoch) or 0)
+        key = self.keys.packed_beliefs if self.packed is not None else self.keys.arm(self.arm_ids[0])
+        snapshot = None if await self.redis.exists(key) else load_snapshot(self.checkpoint_path)
+        if snapshot is not None:
+            print(f"INFO: No belief state found in Redis. Restoring it from the checkpoint {self.checkpoint_path} "
+                  f"(epoch {snapshot.epoch}, {snapshot.replayed} log records).")
+        if self.packed is None:
+            # Checks for existing beliefs and writes them in one script, as the packed layout does with SET NX.
+            keys, args = init_beliefs_call(self.keys, self.arm_ids, snapshot)
+            created, self.epoch = await self._init_script(keys=keys, args=args)
+            print(f"INFO: {'Initialized new' if created else 'Found existing'} belief state in Redis.")
+            return
+        pipe = self.redis.pipeline()
+        if snapshot is None:
+            initial = self.packed.initial_snapshot()
+        else:
+            pipe.set(self.keys.epoch, snapshot.epoch, nx=True)
+            initial = pack_beliefs(snapshot.posteriors_for(self.arm_ids), snapshot.epoch)
+        pipe.set(self.keys.packed_arms, self.packed.layout_json(), nx=True)
+        pipe.set(self.keys.packed_beliefs, initial, nx=True)
+        pipe.get(self.keys.packed_arms)
+        pipe.get(self.keys.epoch)
+        *_, created, layout, epoch = await pipe.execute()
+        self.packed.set_layout(layout)
+        self.epoch = int(epoch or 0)
+        print(f"INFO: {'Initialized new' if created else 'Found existing'} packed belief state in Redis.")
+
+    async def select_arm(self, mode="LEARNING", epsilon=0.05) -> str:
+        started = time.perf_counter()
+        arm_id = await self._select_arm(mode, epsilon)
+        DECISION_SECONDS.labels(mode).observe(time.perf_counter() - started)
+        DECISIONS.labels(mode).inc()
+        return arm_id
+
+    async def _select_arm(self, mode, epsilon) -> str:
+        if mode == "FORCED_EXPLORATION":
+            return random.choice(self.arm_ids)
+        if mode == "MONITORING" and random.random() < epsilon:
+            return random.choice(self.arm_ids)
+
+        posteriors = await self._read_posteriors()
+        known = ~np.isnan(posteriors).any(axis=1)
+        if not known.any():
+            return random.choice(self.arm_ids)
+
+        sampled_means = np.full(len(self.arm_ids), -np.inf)
+        sampled_means[known] = sample_posterior_means(posteriors[known])
+        return self.arm_ids[np.argmax(sampled_means)]
+
+    async def _read_posteriors(self) -> np.ndarray:
+        now = time.monotonic()
+        if self._cached_posteriors is not None and now - self._cached_at < self.posterior_cache_ttl:
+            return self._cached_posteriors
+
+        REDIS_ROUND_TRIPS.labels("read").inc()
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.get(self.keys.epoch)
+        if self.packed is not None:
+            pipe.get(self.keys.packed_beliefs)
+            epoch, raw = await pipe.execute()
+            self.epoch = int(epoch or 0)
+            posteriors = self.packed.decode(raw, self.epoch)
+        else:
+            for arm_id in self.arm_ids:
+                pipe.hmget(self.keys.arm(arm_id), (*BELIEF_FIELDS, "epoch"))
+            epoch, *rows = await pipe.execute()
+            self.epoch = int(epoch or 0)
+            rows = np.array(rows, dtype=np.float64).reshape(-1, 5)
+            posteriors = apply_epoch(rows[:, :4], rows[:, 4], self.epoch)
+
+        if self.posterior_cache_ttl > 0:
+            self._cached_posteriors = posteriors
+            self._cached_at = now
+        return posteriors
+
+    async def update_belief(self, arm_id: str, reward: float):
+        pipe = self.redis.pipeline(transaction=False)
+        if self.packed is not None:
+            await self._packed_update_script(
+                keys=[self.keys.packed_beliefs, self.keys.version, self.keys.epoch],
+                args=self.packed.update_args(arm_id, 1, reward, 0.0, self.keys.updates_channel, self.epoch),
+                client=pipe,
+            )
+        else:
+            await self._update_script(
+                keys=[self.keys.arm(arm_id), self.keys.version, self.keys.epoch],
+                args=[1, reward, 0.0, self.keys.updates_channel, self.epoch], client=pipe,
+            )
+        append_rewards(pipe, arm_id, [reward], self.reward_stream_maxlen, self.keys.reward_stream)
+        (status, epoch), _ = await pipe.execute()
+        if status < 0:
+            STALE_REWARDS.inc() # Pulled before a reset: dropped by the script
+        self.epoch = max(self.epoch, int(epoch))
+        if status == 0:
+            # No beliefs for the arm: Redis lost its state (e.g. it restarted).
+            print("WARN: Beliefs are missing from Redis. Initializing them again.")
+            self._cached_posteriors = None
+            await self.initialize_state_in_redis()
+        REDIS_ROUND_TRIPS.labels("update").inc()
+        BELIEF_UPDATES.inc()
+
+
+class RuntimeStats:
+    """Pull counters and a bounded window of pull latencies, reset at every report."""
+
+    def __init__(self, max_latency_samples: int = 100_000):
+        self.pulls = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=max_latency_samples)
+        self.http_connections_created = 0
+        self.http_connections_reused = 0
+        self._window_start = time.monotonic()
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """aiohttp hooks that count new versus reused keep-alive connections."""
+        async def on_create(session, ctx, params):
+            self.http_connections_created += 1
+
+        async def on_reuse(session, ctx, params):
+            self.http_connections_reused += 1
+
+        trace = aiohttp.TraceConfig()
+        trace.on_connection_create_end.append(on_create)
+        trace.on_connection_reuseconn.append(on_reuse)
+        return trace
+
+    def report(self, redis_pool: aioredis.ConnectionPool) -> str:
+        elapsed = time.monotonic() - self._window_start
+        if self.latencies:
+            p50, p99 = np.percentile(np.fromiter(self.latencies, dtype=np.float64), [50, 99]) * 1000
+        else:
+            p50 = p99 = float("nan")
+        connections = self.http_connections_created + self.http_connections_reused
+        reuse = self.http_connections_reused / connections if connections else 0.0
+        line = (
+            f"STATS: pulls/s={self.pulls / elapsed:.1f} p50={p50:.2f}ms p99={p99:.2f}ms errors={self.errors} "
+            f"http_new={self.http_connections_created} http_reuse={reuse:.1%} "
+            f"redis_connections={redis_pool._created_connections}"
+        )
+        self.pulls = self.errors = 0
+        self.http_connections_created = self.http_connections_reused = 0
+        self.latencies.clear()
+        self._window_start = time.monotonic()
+        return line
+
+
+class ModeWatcher:
+    """Polls system:mode once for every logical agent in the process instead of once per pull."""
+
+    def __init__(self, redis_client: aioredis.Redis, mode_key: str):
+        self.redis = redis_client
+        self.mode_key = mode_key
+        self.mode = "LEARNING"
+
+    async def run(self, stop: asyncio.Event):
+        while not stop.is_set():
+            try:
+                mode = await self.redis.get(self.mode_key)
+                self.mode = mode.decode() if mode else "LEARNING"
+            except redis.RedisError as e:
+                print(f"WARN: Could not read system mode: {e}")
+            await asyncio.sleep(MODE_REFRESH_SECONDS)
+
+
+# Shared by every logical agent, so a failing API or Redis logs at most once per interval.
+pull_error_log = RateLimitedLog("pull_error")
+redis_error_log = RateLimitedLog("redis_error")
+
+
+async def run_logical_agent(agent, pull_rate, session, mode_watcher, stats, stop):
+    """One logical agent: select, pull and update at `pull_rate` pulls per second."""
+    interval = 1.0 / pull_rate
+    # Stagger start times so agents do not fire in lockstep.
+    next_pull = time.monotonic() + random.random() * interval
+    while not stop.is_set():
+        await asyncio.sleep(max(0.0, next_pull - time.monotonic()))
+        next_pull += interval
+
+        try:
+            selected_arm = await agent.select_arm(mode=mode_watcher.mode)
+            started = time.perf_counter()
+            async with session.get(f"{API_BASE_URL}/choose_arm", params={'arm_id': selected_arm}) as response:
+                response.raise_for_status()
+                reward = (await response.json())['reward']
+            latency = time.perf_counter() - started
+            PULL_SECONDS.labels("choose_arm").observe(latency)
+            stats.latencies.append(latency)
+            stats.pulls += 1
+
+            await agent.update_belief(selected_arm, reward)
+        except aiohttp.ClientError as e:
+            stats.errors += 1
+            PULL_ERRORS.inc()
+            pull_error_log(level="ERROR", error=str(e))
+        except redis.RedisError as e:
+            stats.errors += 1
+            redis_error_log(level="ERROR", error=str(e))
+        else:
+            continue
+        await asyncio.sleep(ERROR_BACKOFF_SECONDS)
+        next_pull = time.monotonic()
+
+
+async def report_stats(stats, redis_pool, stop):
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=STATS_REPORT_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        print(stats.report(redis_pool))
+
+
+def unsupported_settings() -> list[str]:
+    """Settings the sync agent honors but AsyncThompsonSamplingAgent does not implement."""
+    problems = []
+    if BELIEF_UPDATE_MODE != "script":
+        problems.append(f"BELIEF_UPDATE_MODE={BELIEF_UPDATE_MODE} (only 'script' is supported)")
+    if ARM_SELECTION != "full":
+        problems.append(f"ARM_SELECTION={ARM_SELECTION} (only 'full' is supported)")
+    if AGENT_BATCH_SIZE > 1:
+        problems.append(f"AGENT_BATCH_SIZE={AGENT_BATCH_SIZE} (one pull per decision only)")
+    return problems
+
+
+async def run():
+    """Runs ASYNC_AGENT_COUNT logical agents in this process until SIGINT/SIGTERM."""
+    problems = unsupported_settings()
+    if problems:
+        print(f"ERROR: AGENT_RUNTIME=async does not support {', '.join(problems)}. "
+              "Use AGENT_RUNTIME=sync or pool for these settings.")
+        sys.exit(1)
+    print(f"--- Async RL Agent Runtime Starting ({ASYNC_AGENT_COUNT} logical agents) ---")
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    start_metrics_server()
+    stats = RuntimeStats()
+    connector = aiohttp.TCPConnector(limit=HTTP_POOL_SIZE, keepalive_timeout=60)
+    host, port = experiment_redis_node()
+    redis_pool = aioredis.ConnectionPool(host=host, port=port, db=0, max_connections=REDIS_POOL_SIZE)
+    redis_client = aioredis.Redis(connection_pool=redis_pool)
+
+    async with aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=10),
+        trace_configs=[stats.trace_config()],
+    ) as session:
+        # Paged through GET /arms like the sync agent, off the event loop since it blocks.
+        arm_ids = await asyncio.to_thread(get_arm_ids_from_api, API_BASE_URL)
+        if not arm_ids:
+            print("FATAL: No arms found from API. Exiting.")
+            return
+
+        agents = [
+            AsyncThompsonSamplingAgent(
+                arm_ids, redis_client,
+                posterior_cache_ttl=POSTERIOR_CACHE_TTL_SECONDS,
+                reward_stream_maxlen=REWARD_STREAM_MAXLEN,
+                belief_storage=BELIEF_STORAGE,
+                checkpoint_path=experiment_path(CHECKPOINT_PATH, EXPERIMENT_ID),
+                experiment=EXPERIMENT_ID,
+            )
+            for _ in range(ASYNC_AGENT_COUNT)
+        ]
+        await agents[0].initialize_state_in_redis()
+        for agent in agents[1:]:
+            agent.packed = agents[0].packed # Same arms, so the same packed layout
+
+        mode_watcher = ModeWatcher(redis_client, agents[0].keys.mode)
+        tasks = [asyncio.create_task(mode_watcher.run(stop)), asyncio.create_task(report_stats(stats, redis_pool, stop))]
+        for i, agent in enumerate(agents):
+            pull_rate = ASYNC_PULL_RATES[i % len(ASYNC_PULL_RATES)]
+            tasks.append(asyncio.create_task(
+                run_logical_agent(agent, pull_rate, session, mode_watcher, stats, stop)
+            ))
+
+        await stop.wait()
+        print("INFO: Shutting down async runtime...")
+        for task in tasks:
+            task.cancel()
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, Exception):
+                print(f"ERROR: Async runtime task failed: {result!r}")
+
+    await redis_client.aclose()
+    print(stats.report(redis_pool))
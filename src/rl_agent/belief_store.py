@@ -0,0 +1,201 @@
+# src/rl_agent/belief_store.py
+#
+# Packed belief layout (BELIEF_STORAGE=packed). Instead of one hash of text
+# fields per arm, every arm's (mu, nu, alpha, beta, epoch) is stored as
+# little-endian float64 in one Redis string, 40 bytes per arm. The arm order
+# of that array is recorded once, as a JSON list, under PACKED_ARMS_KEY.
+#
+# Readers fetch all arms with a single GET and decode them with np.frombuffer;
+# writers update one arm's row in place with UPDATE_PACKED_BELIEF_LUA.
+#
+# Also holds what both layouts share: the prior, the belief epoch and the key
+# names (ExperimentKeys). A drift reset is one INCR of BELIEFS_EPOCH_KEY
+# (`reset_beliefs`), whatever the number of arms. Every row records the epoch
+# it was last written in; a row from an older epoch reads as the prior, and
+# the update scripts restart it from the prior on its next write. Updates
+# carry the epoch their rewards were pulled in, and the scripts reject those
+# older than the current one, so rewards from before a drift cannot leak into
+# the fresh beliefs.
+
+import json
+
+import numpy as np
+
+PACKED_BELIEFS_KEY = "beliefs:packed"
+PACKED_ARMS_KEY = "beliefs:packed:arms"
+BELIEFS_EPOCH_KEY = "beliefs:epoch"
+# Written by the agents (agent.py) and read by the orchestrator and the visualizer.
+BELIEFS_VERSION_KEY = "beliefs:version"
+BELIEF_UPDATES_CHANNEL = "beliefs:updates"
+REWARD_STREAM_KEY = "rewards:stream"
+SYSTEM_MODE_KEY = "system:mode"
+
+
+class ExperimentKeys:
+    """
+    Redis key and channel names of one experiment. The default experiment ("")
+    uses the names above as they are; any other prefixes them with
+    "exp:{<experiment>}:". The braces make the experiment id a Redis Cluster
+    hash tag, so all of an experiment's keys hash to the same slot and the
+    multi-key update scripts keep working when keys are sharded by slot.
+    """
+
+    def __init__(self, experiment: str = ""):
+        self.experiment = experiment
+        self.prefix = f"exp:{{{experiment}}}:" if experiment else ""
+        self.packed_beliefs = self.prefix + PACKED_BELIEFS_KEY
+        self.packed_arms = self.prefix + PACKED_ARMS_KEY
+        self.epoch = self.prefix + BELIEFS_EPOCH_KEY
+        self.version = self.prefix + BELIEFS_VERSION_KEY
+        self.updates_channel = self.prefix + BELIEF_UPDATES_CHANNEL
+        self.reward_stream = self.prefix + REWARD_STREAM_KEY
+        self.mode = self.prefix + SYSTEM_MODE_KEY
+
+    def arm(self, arm_id: str) -> str:
+        """The arm:<id> hash of the "hash" belief layout."""
+        return f"{self.prefix}arm:{arm_id}"
+
+# Order of the Normal-Gamma parameters in every posterior row/array, and the prior every arm starts from.
+BELIEF_FIELDS = ("mu", "nu", "alpha", "beta")
+BELIEF_PRIOR = (0.0, 1.0, 0.2, 0.2)
+
+BELIEF_DTYPE = np.dtype("<f8")
+ROW_BYTES = 5 * BELIEF_DTYPE.itemsize # mu, nu, alpha, beta, epoch
+
+# Defines PRIOR for the update scripts, which start stale rows over from it.
+PRIOR_LUA = "local PRIOR = {%r, %r, %r, %r}\n" % BELIEF_PRIOR
+
+# Normal-Gamma conjugate update of one packed row, run atomically inside Redis;
+# the byte-offset twin of agent.UPDATE_BELIEF_LUA.
+# KEYS[1] is the packed beliefs string, KEYS[2] the beliefs version counter and
+# KEYS[3] the epoch. ARGV[1] is the arm's row in the array, ARGV[2..4] the
+# sufficient statistics (n, mean, m2) of the new rewards and ARGV[7] the epoch
+# they were pulled in. If ARGV[5] is not empty the new parameters are
+# published on that channel as "<ARGV[6]> mu nu alpha beta", the same message
+# the hash layout sends.
+# Returns {1, epoch} if applied, {0, epoch} if the row does not exist and
+# {-1, epoch} if the update is from an older epoch and was dropped.
+UPDATE_PACKED_BELIEF_LUA = PRIOR_LUA + """
+local epoch = tonumber(redis.call('GET', KEYS[3]) or '0')
+if tonumber(ARGV[7]) < epoch then return {-1, epoch} end
+local offset = tonumber(ARGV[1]) * 40
+local raw = redis.call('GETRANGE', KEYS[1], offset, offset + 39)
+if #raw < 40 then return {0, epoch} end
+local mu, nu, alpha, beta, row_epoch = struct.unpack('<ddddd', raw)
+if row_epoch < epoch then
+    mu, nu, alpha, beta = PRIOR[1], PRIOR[2], PRIOR[3], PRIOR[4]
+end
+local n, mean, m2 = tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local nu_new = nu + n
+local d = mean - mu
+local mu_new = (nu * mu + n * mean) / nu_new
+local alpha_new = alpha + 0.5 * n
+local beta_new = beta + 0.5 * m2 + nu * n * d * d / (2 * nu_new)
+redis.call('SETRANGE', KEYS[1], offset, struct.pack('<ddddd', mu_new, nu_new, alpha_new, beta_new, epoch))
+redis.call('INCR', KEYS[2])
+if ARGV[5] and ARGV[5] ~= '' then
+    redis.call('PUBLISH', ARGV[5], string.format('%s %.17g %.17g %.17g %.17g', ARGV[6], mu_new, nu_new, alpha_new, beta_new))
+end
+return {1, epoch}
+"""
+
+
+def reset_beliefs(redis_client, version_key: str, epoch_key: str = BELIEFS_EPOCH_KEY) -> int:
+    """
+    Resets every arm to BELIEF_PRIOR, in either layout and in O(1) whatever
+    the number of arms: one MULTI bumping `epoch_key` and `version_key` (so
+    readers caching derived views refresh). Returns the new epoch.
+    """
+    pipe = redis_client.pipeline()
+    pipe.incr(epoch_key)
+    pipe.incr(version_key)
+    return pipe.execute()[0]
+
+
+def apply_epoch(posteriors: np.ndarray, row_epochs: np.ndarray, epoch: int) -> np.ndarray:
+    """
+    (K, 4) posteriors as of `epoch`: rows last written in an older epoch are
+    replaced by BELIEF_PRIOR (rows without an epoch count as epoch 0). Rows
+    without beliefs stay NaN. Returns `posteriors` itself when nothing is stale.
+    """
+    stale = (np.nan_to_num(row_epochs) < epoch) & ~np.isnan(posteriors[:, 0])
+    if not stale.any():
+        return posteriors
+    posteriors = np.array(posteriors)
+    posteriors[stale] = BELIEF_PRIOR
+    return posteriors
+
+
+def hash_belief(fields: dict, epoch: int) -> dict:
+    """{mu, nu, alpha, beta} of one decoded arm:<id> hash (HGETALL), as the prior if written before `epoch`."""
+    if float(fields.get("epoch", 0)) < epoch:
+        return dict(zip(BELIEF_FIELDS, BELIEF_PRIOR))
+    return {field: float(fields[field]) for field in BELIEF_FIELDS}
+
+
+def pack_beliefs(posteriors: np.ndarray, epoch: int = 0) -> bytes:
+    """Serializes a (K, 4) posterior array, tagged with `epoch`, into the packed string layout."""
+    rows = np.empty((len(posteriors), 5), dtype=BELIEF_DTYPE)
+    rows[:, :4] = posteriors
+    rows[:, 4] = epoch
+    return rows.tobytes()
+
+
+def unpack_beliefs(raw: bytes) -> np.ndarray:
+    """Decodes a packed string into a read-only (K, 5) view of its bytes, without copying."""
+    return np.frombuffer(raw, dtype=BELIEF_DTYPE).reshape(-1, 5)
+
+
+class PackedBeliefs:
+    """
+    Maps the packed array onto a caller's own arm order. The layout (which row
+    holds which arm) is read from PACKED_ARMS_KEY with `set_layout`; when it
+    matches `arm_ids` exactly, `decode` returns the zero-copy view directly.
+    """
+
+    def __init__(self, arm_ids: list[str]):
+        self.arm_ids = list(arm_ids)
+        self.rows = None # arm id -> row of the packed array, once the layout is known
+        self._take = None # rows to gather for self.arm_ids, None if the orders match
+
+    @property
+    def has_layout(self) -> bool:
+        return self.rows is not None
+
+    def set_layout(self, raw_arms):
+        """Loads the arm order stored under PACKED_ARMS_KEY (bytes or str JSON list)."""
+        stored = json.loads(raw_arms)
+        self.rows = {str(arm_id): i for i, arm_id in enumerate(stored)}
+        if stored == self.arm_ids:
+            self._take = None
+        else:
+            # Arms missing from the stored layout map to -1 and decode as NaN.
+            self._take = np.array([self.rows.get(arm_id, -1) for arm_id in self.arm_ids])
+
+    def layout_json(self) -> str:
+        return json.dumps(self.arm_ids)
+
+    def initial_snapshot(self, prior=BELIEF_PRIOR, epoch: int = 0) -> bytes:
+        """Packed string holding `prior` (mu, nu, alpha, beta) in `epoch` for every arm of `arm_ids`."""
+        return pack_beliefs(np.tile(np.asarray(prior, dtype=np.float64), (len(self.arm_ids), 1)), epoch)
+
+    def decode(self, raw, epoch: int = 0) -> np.ndarray:
+        """
+        (K, 4) posteriors ordered like `arm_ids` as of `epoch`; rows of arms
+        that are not stored are NaN. Returns a read-only view when no
+        reordering is needed and no row predates `epoch`.
+        """
+        if raw is None or self.rows is None:
+            return np.full((len(self.arm_ids), 4), np.nan)
+        packed = unpack_beliefs(raw)
+        if self._take is None and len(packed) == len(self.arm_ids):
+            return apply_epoch(packed[:, :4], packed[:, 4], epoch)
+        take = np.arange(len(self.arm_ids)) if self._take is None else self._take
+        valid = (take >= 0) & (take < len(packed))
+        rows = np.full((len(self.arm_ids), 5), np.nan)
+        rows[valid] = packed[take[valid]]
+        return apply_epoch(rows[:, :4], rows[:, 4], epoch)
+
+    def update_args(self, arm_id: str, n, mean, m2, channel: str = "", epoch: int = 0) -> list:
+        """ARGV for UPDATE_PACKED_BELIEF_LUA; `set_layout` must have been called."""
+        return [self.rows[arm_id], n, mean, m2, channel, f"arm:{arm_id}", epoch]
@@ -0,0 +1,191 @@
+# src/rl_agent/checkpoint.py
+#
+# Checkpoints of the learned state, so a restart (of Redis, an agent or the
+# orchestrator) resumes from the last snapshot instead of the prior.
+#
+# A snapshot is one binary file: a fixed header, a table of named sections,
+# then every section as a raw NumPy array, aligned to 64 bytes:
+#   header             MAGIC, format version, section count, creation time, belief epoch
+#   table              per section: name, dtype, offset and shape
+#   "meta"             JSON: arm ids, orchestrator mode, converged arm, detector name
+#   "beliefs"          (K, 5) mu, nu, alpha, beta, epoch: the packed layout of belief_store.py
+#   "detector.<name>"  the drift monitor's state arrays (drift_detector.py)
+# Loading maps the file read-only (mmap) and wraps every section in a NumPy
+# view, without reading or parsing it up front.
+#
+# A snapshot is written to a temporary file and renamed over the previous one,
+# so a reader sees either the old or the new one, never a torn file. Between
+# two snapshots, BeliefLog can append the belief rows that changed to
+# "<path>.log" as fixed-size records; load_snapshot replays the ones newer
+# than the snapshot, and every new snapshot truncates the log.
+#
+# The orchestrator writes the checkpoints; agents restore beliefs from them
+# when Redis holds none.
+
+import json
+import mmap
+import os
+import struct
+import time
+
+import numpy as np
+
+from belief_store import BELIEF_PRIOR, apply_epoch
+
+MAGIC = b"BANDSNAP"
+FORMAT_VERSION = 1
+# magic, version, section count, creation time (unix), belief epoch
+HEADER = struct.Struct("<8sIIdq")
+# name, dtype (NumPy dtype.str), offset, first dimension, second dimension (-1 for 1-D sections)
+SECTION = struct.Struct("<32s8sQqq")
+ALIGNMENT = 64
+
+# One BeliefLog record: when the row was read, its index in "beliefs" and the row itself.
+LOG_RECORD = np.dtype([("t", "<f8"), ("row", "<i8"), ("belief", "<f8", (5,))])
+
+
+def log_path(path: str) -> str:
+    return f"{path}.log"
+
+
+def experiment_path(path: str, experiment: str) -> str:
+    """The checkpoint path of `experiment`: `path` itself for the default experiment ("")."""
+    return f"{path}.{experiment}" if path and experiment else path
+
+
+def write_snapshot(path: str, arrays: dict, meta: dict, epoch: int, created: float = None) -> int:
+    """
+    Atomically replaces the snapshot at `path` with `arrays` (name -> 1-D or
+    2-D array) and the JSON-serializable `meta`. Returns the file size in bytes.
+    """
+    created = time.time() if created is None else created
+    sections = {"meta": np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8)}
+    sections.update((name, np.ascontiguousarray(array)) for name, array in arrays.items())
+
+    table, offset = [], HEADER.size + SECTION.size * len(sections)
+    for name, array in sections.items():
+        if array.ndim not in (1, 2):
+            raise ValueError(f"Section '{name}' must be 1-D or 2-D, not {array.ndim}-D.")
+        offset += -offset % ALIGNMENT
+        dim1 = array.shape[1] if array.ndim == 2 else -1
+        table.append(SECTION.pack(name.encode(), array.dtype.str.encode(), offset, array.shape[0], dim1))
+        offset += array.nbytes
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(sections), created, epoch))
+        f.write(b"".join(table))
+        for array in sections.values():
+            f.write(b"\0" * (-f.tell() % ALIGNMENT))
+            f.write(array.data)
+        size = f.tell()
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return size
+
+
+class Snapshot:
+    """
+    A snapshot file mapped read-only: `created`, `epoch`, `meta` and `arrays`
+    (section name -> NumPy view of the mapping). The mapping stays open as long
+    as any of the arrays is referenced.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, self.created, self.epoch = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} snapshot.")
+        self.arrays = {}
+        for i in range(count):
+            name, dtype, offset, dim0, dim1 = SECTION.unpack_from(self._map, HEADER.size + i * SECTION.size)
+            shape = (dim0,) if dim1 < 0 else (dim0, dim1)
+            array = np.frombuffer(self._map, dtype=dtype.rstrip(b"\0").decode(), count=int(np.prod(shape)), offset=offset)
+            self.arrays[name.rstrip(b"\0").decode()] = array.reshape(shape)
+        self.meta = json.loads(self.arrays.pop("meta").tobytes())
+        self.replayed = 0 # Log records applied on top of the snapshot
+
+    @property
+    def arm_ids(self) -> list[str]:
+        return self.meta["arm_ids"]
+
+    def sections(self, prefix: str) -> dict:
+        """The arrays whose name starts with `prefix`, keyed by the rest of their name."""
+        return {name[len(prefix):]: array for name, array in self.arrays.items() if name.startswith(prefix)}
+
+    def replay_log(self, path: str):
+        """Applies the records of the BeliefLog at `path` written after the snapshot, the last one per row winning."""
+        if "beliefs" not in self.arrays:
+            return
+        beliefs = self.arrays["beliefs"]
+        records = read_log(path)
+        records = records[(records["t"] > self.created) & (records["row"] >= 0) & (records["row"] < len(beliefs))]
+        if len(records) == 0:
+            return
+        # Index of each row's last record.
+        rows, last = np.unique(records["row"][::-1], return_index=True)
+        beliefs = np.array(beliefs)
+        beliefs[rows] = records["belief"][len(records) - 1 - last]
+        self.arrays["beliefs"] = beliefs
+        self.replayed = len(records)
+
+    def posteriors_for(self, arm_ids: list[str]) -> np.ndarray:
+        """
+        (K, 4) posteriors of `arm_ids` as of the snapshot's epoch; arms the
+        snapshot does not hold, or holds no beliefs for, get BELIEF_PRIOR.
+        """
+        rows = self.arrays["beliefs"]
+        if list(arm_ids) != self.arm_ids:
+            index = {arm_id: i for i, arm_id in enumerate(self.arm_ids)}
+            take = np.array([index.get(arm_id, -1) for arm_id in arm_ids], dtype=np.intp)
+            rows = np.where((take >= 0)[:, None], rows[take], np.nan) if len(rows) else np.full((len(take), 5), np.nan)
+        posteriors = np.array(apply_epoch(rows[:, :4], rows[:, 4], self.epoch))
+        posteriors[np.isnan(posteriors).any(axis=1)] = BELIEF_PRIOR
+        return posteriors
+
+
+def load_snapshot(path: str):
+    """The snapshot at `path` with its log replayed, or None if there is none or it cannot be read."""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        snapshot = Snapshot(path)
+        snapshot.replay_log(log_path(path))
+    except (OSError, ValueError, KeyError, struct.error) as e:
+        print(f"WARN: Could not load the checkpoint {path}: {e}")
+        return None
+    return snapshot
+
+
+class BeliefLog:
+    """Append-only log of belief rows written between two snapshots (see LOG_RECORD)."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def append(self, t: float, rows: np.ndarray, beliefs: np.ndarray) -> int:
+        """Appends one record per row of `rows`, with the matching (N, 5) `beliefs`; returns the bytes written."""
+        records = np.empty(len(rows), dtype=LOG_RECORD)
+        records["t"] = t
+        records["row"] = rows
+        records["belief"] = beliefs
+        with open(self.path, "ab") as f:
+            f.write(records.data)
+            f.flush()
+            os.fsync(f.fileno())
+        return records.nbytes
+
+    def truncate(self):
+        open(self.path, "wb").close()
+
+
+def read_log(path: str) -> np.ndarray:
+    """Every complete record of a BeliefLog file (a record torn by a crash is ignored); empty if there is none."""
+    if not os.path.exists(path):
+        return np.empty(0, dtype=LOG_RECORD)
+    with open(path, "rb") as f:
+        raw = f.read()
+    return np.frombuffer(raw, dtype=LOG_RECORD, count=len(raw) // LOG_RECORD.itemsize)
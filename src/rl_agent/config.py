@@ -6,4 +6,77 @@ import os
 # We provide the Docker Compose hostnames as default values for local testing.
 API_BASE_URL = os.getenv("API_BASE_URL", "http://slot-machine-api:8000")
 REDIS_HOST = os.getenv("REDIS_HOST", "redis")
-REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
\ No newline at end of file
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+
+# Experiment this agent learns; its Redis keys are namespaced by it (see
+# belief_store.ExperimentKeys). "" is the default, un-namespaced experiment.
+EXPERIMENT_ID = os.getenv("EXPERIMENT_ID", "")
+# Comma-separated "host:port" Redis nodes experiments are sharded over by
+# consistent hashing (sharding.py); "" uses REDIS_HOST:REDIS_PORT alone.
+REDIS_NODES = os.getenv("REDIS_NODES", "")
+
+# Seconds a posterior snapshot read from Redis is reused by select_arm.
+# 0 (the default) reads fresh beliefs for every decision.
+POSTERIOR_CACHE_TTL_SECONDS = float(os.getenv("POSTERIOR_CACHE_TTL_SECONDS", 0.0))
+
+# How update_belief writes to Redis: "script" (atomic server-side Lua update,
+# one round trip), "watch" (optimistic WATCH/MULTI retry loop) or "delta"
+# (sufficient statistics accumulated locally and merged with the script every
+# BELIEF_FLUSH_SECONDS; other replicas see the rewards up to that much later).
+BELIEF_UPDATE_MODE = os.getenv("BELIEF_UPDATE_MODE", "script")
+BELIEF_FLUSH_SECONDS = float(os.getenv("BELIEF_FLUSH_SECONDS", 1.0))
+
+# Redis layout of the beliefs: "hash" (one arm:<id> hash of text fields per arm)
+# or "packed" (all arms as float64 in one string, see belief_store.py).
+# Every service must use the same value; "packed" does not support the "watch" update mode.
+BELIEF_STORAGE = os.getenv("BELIEF_STORAGE", "hash")
+
+# Large action spaces. ARM_SELECTION "full" draws a Thompson sample for every
+# arm per decision; "pruned" only samples the arms that can still plausibly win
+# plus one exact draw for all arms at the prior (arm_index.py), changing a
+# decision with probability below PRUNE_TOLERANCE. Pruning pays off with the
+# "packed" storage and a POSTERIOR_CACHE_TTL_SECONDS above 0, since its index is
+# rebuilt for every snapshot read; while it would keep most arms it falls back to
+# "full". Sampling works SAMPLE_CHUNK_SIZE arms at a time.
+ARM_SELECTION = os.getenv("ARM_SELECTION", "full")
+PRUNE_TOLERANCE = float(os.getenv("PRUNE_TOLERANCE", 0.01))
+SAMPLE_CHUNK_SIZE = int(os.getenv("SAMPLE_CHUNK_SIZE", 8192))
+# Arms fetched per GET /arms request on startup.
+ARMS_PAGE_SIZE = int(os.getenv("ARMS_PAGE_SIZE", 10_000))
+
+
+# Pulls per loop iteration. Above 1 the agent samples a whole minibatch of
+# decisions, pulls them through POST /choose_arms and updates beliefs once per arm.
+AGENT_BATCH_SIZE = int(os.getenv("AGENT_BATCH_SIZE", 1))
+
+# Pause between loop iterations, in seconds.
+PULL_INTERVAL_SECONDS = float(os.getenv("PULL_INTERVAL_SECONDS", 1.0))
+
+
+# "sync" runs one agent loop per process (main.py); "async" multiplexes
+# ASYNC_AGENT_COUNT logical agents in one process (async_runtime.py); "pool"
+# runs POOL_AGENT_COUNT agents over a pool of worker processes (supervisor.py).
+# "async" only implements the "script" BELIEF_UPDATE_MODE, the "full"
+# ARM_SELECTION and an AGENT_BATCH_SIZE of 1, and refuses to start otherwise.
+AGENT_RUNTIME = os.getenv("AGENT_RUNTIME", "sync")
+ASYNC_AGENT_COUNT = int(os.getenv("ASYNC_AGENT_COUNT", 10))
+# Pulls per second of each logical agent; a comma-separated list is assigned round-robin.
+ASYNC_PULL_RATES = [float(rate) for rate in os.getenv("ASYNC_PULL_RATES", "1.0").split(",")]
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 20))
+REDIS_POOL_SIZE = int(os.getenv("REDIS_POOL_SIZE", 20))
+STATS_REPORT_SECONDS = float(os.getenv("STATS_REPORT_SECONDS", 10))
+
+# Approximate cap on the entries kept in the rewards:stream reward log (XADD MAXLEN ~).
+REWARD_STREAM_MAXLEN = int(os.getenv("REWARD_STREAM_MAXLEN", 100_000))
+
+# Process-pool runtime: total logical agents, and worker processes to spread them
+# over (0 sizes the pool to the cores this container may use).
+POOL_AGENT_COUNT = int(os.getenv("POOL_AGENT_COUNT", 10))
+POOL_PROCESSES = int(os.getenv("POOL_PROCESSES", 0))
+
+# Snapshot file written by the orchestrator (see checkpoint.py). When Redis holds
+# no beliefs (first start, or Redis restarted) they are restored from it instead
+# of the prior; the path must be on a volume shared with the orchestrator.
+# Experiments other than the default one use "<CHECKPOINT_PATH>.<EXPERIMENT_ID>".
+# "" (the default) disables restoring.
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", "")
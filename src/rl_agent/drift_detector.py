@@ -0,0 +1,419 @@
+# src/rl_agent/drift_detector.py
+#
+# Streaming change-point detectors for reward streams.
+#
+# Every detector tracks many independent streams (one per arm) at once and
+# keeps a fixed amount of state per stream, so memory does not grow with the
+# number of observations. Two entry points are shared by all detectors:
+#
+#   update(stream, values)  - a batch of rewards for one stream (NumPy array)
+#   step(streams, values)   - one reward each for several distinct streams
+#
+# Both return the direction of a detected change: +1 (the mean went up),
+# -1 (it went down) or 0 (no change). A stream is reset after it alarms.
+#
+# `state()` returns a detector's per-stream state as a dict of NumPy arrays and
+# `load_state(state)` puts it back, so it can be checkpointed (checkpoint.py).
+
+import math
+
+import numpy as np
+
+
+class _ArrayState:
+    """state() / load_state() for detectors whose state is the arrays named in STATE."""
+
+    STATE = ()
+
+    def state(self) -> dict:
+        return {name: getattr(self, name) for name in self.STATE}
+
+    def load_state(self, state: dict):
+        for name in self.STATE:
+            array = getattr(self, name)
+            array[:] = state[name]
+
+
+class PageHinkley(_ArrayState):
+    """
+    Two-sided Page-Hinkley test. Each stream keeps its running mean and the
+    cumulative deviations from it; a change is flagged when a cumulative sum
+    moves more than `threshold` away from its running extremum.
+    `delta` is the magnitude of change tolerated without alarming.
+    """
+
+    STATE = ("n", "mean", "sum_up", "min_up", "sum_down", "max_down")
+
+    def __init__(self, num_streams: int, delta: float = 0.1, threshold: float = 50.0, min_samples: int = 30):
+        self.num_streams = num_streams
+        self.delta = delta
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.reset()
+
+    def reset(self, streams=None):
+        if streams is None:
+            self.n = np.zeros(self.num_streams, dtype=np.int64)
+            self.mean = np.zeros(self.num_streams)
+            self.sum_up = np.zeros(self.num_streams)   # detects increases
+            self.min_up = np.zeros(self.num_streams)
+            self.sum_down = np.zeros(self.num_streams) # detects decreases
+            self.max_down = np.zeros(self.num_streams)
+            return
+        for state in (self.n, self.mean, self.sum_up, self.min_up, self.sum_down, self.max_down):
+            state[streams] = 0
+
+    def update(self, stream: int, values: np.ndarray) -> int:
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return 0
+        n = self.n[stream] + np.arange(1, len(values) + 1)
+        means = (self.n[stream] * self.mean[stream] + np.cumsum(values)) / n
+        deviations = values - means
+
+        sum_up = self.sum_up[stream] + np.cumsum(deviations - self.delta)
+        min_up = np.minimum.accumulate(np.minimum(sum_up, self.min_up[stream]))
+        sum_down = self.sum_down[stream] + np.cumsum(deviations + self.delta)
+        max_down = np.maximum.accumulate(np.maximum(sum_down, self.max_down[stream]))
+
+        ready = n >= self.min_samples
+        up = ready & (sum_up - min_up > self.threshold)
+        down = ready & (max_down - sum_down > self.threshold)
+        if up.any() or down.any():
+            # Report whichever side alarmed first within the batch.
+            first_up = np.argmax(up) if up.any() else len(values)
+            first_down = np.argmax(down) if down.any() else len(values)
+            self.reset([stream])
+            return 1 if first_up <= first_down else -1
+
+        self.n[stream] = n[-1]
+        self.mean[stream] = means[-1]
+        self.sum_up[stream], self.min_up[stream] = sum_up[-1], min_up[-1]
+        self.sum_down[stream], self.max_down[stream] = sum_down[-1], max_down[-1]
+        return 0
+
+    def step(self, streams: np.ndarray, values: np.ndarray) -> np.ndarray:
+        streams = np.asarray(streams)
+        n = self.n[streams] + 1
+        mean = self.mean[streams] + (values - self.mean[streams]) / n
+        deviation = values - mean
+
+        sum_up = self.sum_up[streams] + deviation - self.delta
+        min_up = np.minimum(self.min_up[streams], sum_up)
+        sum_down = self.sum_down[streams] + deviation + self.delta
+        max_down = np.maximum(self.max_down[streams], sum_down)
+
+        self.n[streams], self.mean[streams] = n, mean
+        self.sum_up[streams], self.min_up[streams] = sum_up, min_up
+        self.sum_down[streams], self.max_down[streams] = sum_down, max_down
+
+        ready = n >= self.min_samples
+        directions = np.where(ready & (sum_up - min_up > self.threshold), 1, 0)
+        directions = np.where(ready & (max_down - sum_down > self.threshold), -1, directions)
+        alarmed = streams[directions != 0]
+        if len(alarmed):
+            self.reset(alarmed)
+        return directions
+
+
+class CUSUM(_ArrayState):
+    """
+    Two-sided standardized CUSUM. The in-control mean and standard deviation
+    are estimated from the first `warmup` rewards of each stream; afterwards
+    g+ / g- accumulate standardized deviations beyond `drift` and alarm above
+    `threshold` (both in units of the in-control standard deviation).
+    """
+
+    STATE = ("n", "mean", "m2", "g_up", "g_down")
+
+    def __init__(self, num_streams: int, drift: float = 0.5, threshold: float = 10.0, warmup: int = 100):
+        self.num_streams = num_streams
+        self.drift = drift
+        self.threshold = threshold
+        self.warmup = warmup
+        self.reset()
+
+    def reset(self, streams=None):
+        if streams is None:
+            self.n = np.zeros(self.num_streams, dtype=np.int64)
+            self.mean = np.zeros(self.num_streams)
+            self.m2 = np.zeros(self.num_streams)
+            self.g_up = np.zeros(self.num_streams)
+            self.g_down = np.zeros(self.num_streams)
+            return
+        for state in (self.n, self.mean, self.m2, self.g_up, self.g_down):
+            state[streams] = 0
+
+    def _std(self, streams):
+        return np.maximum(np.sqrt(self.m2[streams] / np.maximum(self.n[streams] - 1, 1)), 1e-9)
+
+    def update(self, stream: int, values: np.ndarray) -> int:
+        values = np.asarray(values, dtype=np.float64)
+        remaining = max(self.warmup - int(self.n[stream]), 0)
+        if remaining:
+            # Fold the warmup part of the batch into the baseline estimate (Chan et al. merge).
+            head, values = values[:remaining], values[remaining:]
+            if len(head):
+                n_a, n_b = self.n[stream], len(head)
+                mean_b = head.mean()
+                delta = mean_b - self.mean[stream]
+                self.m2[stream] += np.sum((head - mean_b) ** 2) + delta ** 2 * n_a * n_b / (n_a + n_b)
+                self.mean[stream] += delta * n_b / (n_a + n_b)
+                self.n[stream] = n_a + n_b
+        if len(values) == 0:
+            return 0
+
+        z = (values - self.mean[stream]) / self._std(stream)
+        # Lindley recursion g_t = max(0, g_{t-1} + x_t) in closed form over the batch.
+        s_up = np.cumsum(z - self.drift)
+        g_up = s_up - np.minimum.accumulate(np.minimum(s_up, -self.g_up[stream]))
+        s_down = np.cumsum(-z - self.drift)
+        g_down = s_down - np.minimum.accumulate(np.minimum(s_down, -self.g_down[stream]))
+
+        up = g_up > self.threshold
+        down = g_down > self.threshold
+        if up.any() or down.any():
+            first_up = np.argmax(up) if up.any() else len(values)
+            first_down = np.argmax(down) if down.any() else len(values)
+            self.reset([stream])
+            return 1 if first_up <= first_down else -1
+
+        self.g_up[stream], self.g_down[stream] = g_up[-1], g_down[-1]
+        return 0
+
+    def step(self, streams: np.ndarray, values: np.ndarray) -> np.ndarray:
+        streams = np.asarray(streams)
+        warming = self.n[streams] < self.warmup
+        if warming.any():
+            ws = streams[warming]
+            n = self.n[ws] + 1
+            delta = values[warming] - self.mean[ws]
+            self.mean[ws] += delta / n
+            self.m2[ws] += delta * (values[warming] - self.mean[ws])
+            self.n[ws] = n
+
+        z = (values - self.mean[streams]) / self._std(streams)
+        g_up = np.where(warming, 0.0, np.maximum(0.0, self.g_up[streams] + z - self.drift))
+        g_down = np.where(warming, 0.0, np.maximum(0.0, self.g_down[streams] - z - self.drift))
+        self.g_up[streams], self.g_down[streams] = g_up, g_down
+
+        directions = np.where(g_up > self.threshold, 1, 0)
+        directions = np.where(g_down > self.threshold, -1, directions)
+        alarmed = streams[directions != 0]
+        if len(alarmed):
+            self.reset(alarmed)
+        return directions
+
+
+class _AdwinWindow:
+    """
+    ADWIN2 window for a single stream, stored as an exponential histogram:
+    row i holds at most `max_buckets` buckets that each summarize 2**i rewards
+    as (mean, m2). Memory is O(max_buckets * log(max_window)).
+    """
+
+    def __init__(self, max_buckets: int, max_window: int):
+        self.max_buckets = max_buckets
+        self.max_window = max_window
+        self.rows = [] # rows[i] = list of [mean, m2], oldest bucket first
+        self.width = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value: float):
+        self._append_total(1, value, 0.0)
+        self._insert(0, [value, 0.0])
+        while self.width > self.max_window:
+            self.drop_oldest()
+
+    def _insert(self, row: int, bucket):
+        if row == len(self.rows):
+            self.rows.append([])
+        self.rows[row].append(bucket)
+        if len(self.rows[row]) > self.max_buckets:
+            (mean_a, m2_a), (mean_b, m2_b) = self.rows[row][0], self.rows[row][1]
+            del self.rows[row][:2]
+            size = 2 ** row
+            self._insert(row + 1, [(mean_a + mean_b) / 2, m2_a + m2_b + (mean_b - mean_a) ** 2 * size / 2])
+
+    def _append_total(self, n: int, mean: float, m2: float):
+        total = self.width + n
+        delta = mean - self.mean
+        self.m2 += m2 + delta ** 2 * self.width * n / total
+        self.mean += delta * n / total
+        self.width = total
+
+    def drop_oldest(self):
+        row = len(self.rows) - 1
+        mean_b, m2_b = self.rows[row].pop(0)
+        if not self.rows[row]:
+            self.rows.pop()
+        n_b = 2 ** row
+        rest = self.width - n_b
+        if rest == 0:
+            self.width, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        mean_rest = (self.width * self.mean - n_b * mean_b) / rest
+        self.m2 = max(self.m2 - m2_b - (mean_b - mean_rest) ** 2 * n_b * rest / self.width, 0.0)
+        self.mean, self.width = mean_rest, rest
+
+    def detect_change(self, delta: float, min_side: int) -> int:
+        """Drops the oldest buckets while a split of the window shows distinct means; returns the change direction."""
+        direction = 0
+        while self.width > 2 * min_side:
+            variance = self.m2 / self.width
+            log_term = math.log(2.0 * math.log(self.width) / delta)
+            n0, sum0 = 0, 0.0
+            cut = False
+            for row in range(len(self.rows) - 1, -1, -1):
+                size = 2 ** row
+                for mean_b, _ in self.rows[row]:
+                    n0 += size
+                    sum0 += mean_b * size
+                    n1 = self.width - n0
+                    if n1 < min_side:
+                        break
+                    if n0 < min_side:
+                        continue
+                    mean0, mean1 = sum0 / n0, (self.width * self.mean - sum0) / n1
+                    m = 1.0 / (1.0 / n0 + 1.0 / n1)
+                    eps = math.sqrt(2.0 * variance * log_term / m) + 2.0 * log_term / (3.0 * m)
+                    if abs(mean1 - mean0) > eps:
+                        direction = 1 if mean1 > mean0 else -1
+                        cut = True
+                        break
+                if cut:
+                    break
+            if not cut:
+                break
+            self.drop_oldest()
+        return direction
+
+
+class ADWIN:
+    """
+    ADaptive WINdowing (Bifet & Gavalda). Keeps a variable-length window of
+    recent rewards per stream and shrinks it whenever two sub-windows have
+    statistically different means at confidence `delta`. The window length is
+    capped at `max_window` so memory stays bounded. Cut checks run every
+    `clock` rewards to amortize their cost.
+    """
+
+    def __init__(self, num_streams: int, delta: float = 0.002, max_buckets: int = 5,
+                 max_window: int = 10_000, min_side: int = 16, clock: int = 32):
+        self.num_streams = num_streams
+        self.delta = delta
+        self.max_buckets = max_buckets
+        self.max_window = max_window
+        self.min_side = min_side
+        self.clock = clock
+        self.reset()
+
+    def reset(self, streams=None):
+        if streams is None:
+            self.windows = [_AdwinWindow(self.max_buckets, self.max_window) for _ in range(self.num_streams)]
+            self.since_check = np.zeros(self.num_streams, dtype=np.int64)
+            return
+        for stream in streams:
+            self.windows[stream] = _AdwinWindow(self.max_buckets, self.max_window)
+            self.since_check[stream] = 0
+
+    def _add(self, stream: int, value: float) -> int:
+        window = self.windows[stream]
+        window.add(value)
+        self.since_check[stream] += 1
+        if self.since_check[stream] < self.clock:
+            return 0
+        self.since_check[stream] = 0
+        direction = window.detect_change(self.delta, self.min_side)
+        if direction:
+            self.reset([stream])
+        return direction
+
+    def update(self, stream: int, values: np.ndarray) -> int:
+        for value in np.asarray(values, dtype=np.float64).tolist():
+            direction = self._add(stream, value)
+            if direction:
+                return direction
+        return 0
+
+    def step(self, streams: np.ndarray, values: np.ndarray) -> np.ndarray:
+        return np.array(
+            [self._add(stream, value) for stream, value in zip(np.asarray(streams).tolist(), np.asarray(values).tolist())],
+            dtype=np.int64,
+        )
+
+    def state(self) -> dict:
+        """Every window's totals, plus all their buckets flattened in (stream, row, oldest first) order."""
+        buckets = [
+            (stream, row, mean, m2)
+            for stream, window in enumerate(self.windows)
+            for row, bucket_row in enumerate(window.rows)
+            for mean, m2 in bucket_row
+        ]
+        buckets = np.array(buckets, dtype=np.float64).reshape(-1, 4)
+        return {
+            "since_check": self.since_check,
+            "width": np.array([window.width for window in self.windows], dtype=np.int64),
+            "mean": np.array([window.mean for window in self.windows]),
+            "m2": np.array([window.m2 for window in self.windows]),
+            "bucket_stream": buckets[:, 0].astype(np.int64),
+            "bucket_row": buckets[:, 1].astype(np.int64),
+            "bucket_mean": buckets[:, 2],
+            "bucket_m2": buckets[:, 3],
+        }
+
+    def load_state(self, state: dict):
+        self.reset()
+        self.since_check[:] = state["since_check"]
+        for stream, window in enumerate(self.windows):
+            window.width = int(state["width"][stream])
+            window.mean, window.m2 = float(state["mean"][stream]), float(state["m2"][stream])
+        columns = (state["bucket_stream"], state["bucket_row"], state["bucket_mean"], state["bucket_m2"])
+        for stream, row, mean, m2 in zip(*(np.asarray(column).tolist() for column in columns)):
+            rows = self.windows[stream].rows
+            while len(rows) <= row:
+                rows.append([])
+            rows[row].append([mean, m2])
+
+
+DETECTORS = {
+    "page_hinkley": PageHinkley,
+    "cusum": CUSUM,
+    "adwin": ADWIN,
+}
+
+
+class DriftMonitor:
+    """
+    Runs one detector over every arm's reward stream, addressed by arm id.
+    `detector` is a key of DETECTORS; extra keyword arguments go to its constructor.
+    """
+
+    def __init__(self, arm_ids: list[str], detector: str = "page_hinkley", **params):
+        if detector not in DETECTORS:
+            raise ValueError(f"Unknown drift detector '{detector}'. Choose from {sorted(DETECTORS)}.")
+        self.arm_ids = list(arm_ids)
+        self.arm_index = {arm_id: i for i, arm_id in enumerate(self.arm_ids)}
+        self.detector_name = detector
+        self.detector = DETECTORS[detector](len(self.arm_ids), **params)
+        self.observations = np.zeros(len(self.arm_ids), dtype=np.int64)
+
+    def update(self, arm_id: str, rewards: np.ndarray) -> int:
+        """Feeds a batch of rewards for one arm; returns +1/-1 on a detected change, else 0."""
+        stream = self.arm_index[arm_id]
+        self.observations[stream] += len(rewards)
+        return self.detector.update(stream, rewards)
+
+    def reset(self):
+        self.detector.reset()
+        self.observations[:] = 0
+
+    def state(self) -> dict:
+        """The detector's state arrays plus the observation counts, for a checkpoint."""
+        return {"observations": self.observations, **self.detector.state()}
+
+    def load_state(self, state: dict):
+        """Restores a `state()` taken from a monitor with the same arms and detector."""
+        self.observations[:] = state["observations"]
+        self.detector.load_state(state)
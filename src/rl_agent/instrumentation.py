@@ -0,0 +1,63 @@
+# src/rl_agent/instrumentation.py
+#
+# Instrumentation used by every service: Prometheus metric helpers and
+# rate-limited, structured (one JSON object per line) logging for hot paths.
+#
+# Each service defines its own metrics with prometheus_client and exposes them
+# on /metrics: the agent and orchestrator through `start_metrics_server`, the
+# API and visualizer on their existing HTTP servers.
+
+import json
+import os
+import sys
+import threading
+import time
+
+from prometheus_client import start_http_server
+
+# Port of the standalone /metrics server used by the agent and the orchestrator.
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9100))
+
+# Histogram buckets, in seconds, for sub-millisecond hot paths (the defaults start at 5 ms).
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Default minimum interval between two lines of one RateLimitedLog, in seconds.
+LOG_INTERVAL_SECONDS = float(os.getenv("LOG_INTERVAL_SECONDS", 10))
+
+
+def start_metrics_server(port: int = METRICS_PORT):
+    """Serves the default Prometheus registry on http://0.0.0.0:<port>/metrics from a daemon thread."""
+    start_http_server(port)
+    print(f"INFO: Serving Prometheus metrics on :{port}/metrics")
+
+
+def log_event(event: str, level: str = "INFO", **fields):
+    """Writes one structured log line: {"ts", "level", "event", **fields}."""
+    record = {"ts": round(time.time(), 3), "level": level, "event": event, **fields}
+    stream = sys.stderr if level == "ERROR" else sys.stdout
+    print(json.dumps(record, separators=(",", ":"), default=str), file=stream)
+
+
+class RateLimitedLog:
+    """
+    Emits at most one line per `interval` seconds for a hot-path event and
+    drops the rest, so log volume no longer grows with the pull rate. Every
+    emitted line carries `suppressed`, the number of calls dropped since the
+    previous one. Thread-safe.
+    """
+
+    def __init__(self, event: str, interval: float = LOG_INTERVAL_SECONDS):
+        self.event = event
+        self.interval = interval
+        self._suppressed = 0
+        self._last = float("-inf")
+        self._lock = threading.Lock()
+
+    def __call__(self, level: str = "INFO", **fields):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last < self.interval:
+                self._suppressed += 1
+                return
+            suppressed, self._suppressed, self._last = self._suppressed, 0, now
+        log_event(self.event, level=level, suppressed=suppressed, **fields)
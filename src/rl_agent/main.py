@@ -1,13 +1,28 @@
 # src/rl_agent/main.py (Final version with reward reporting)
 
+import asyncio
 import time
 import requests
 import sys
 import redis
 import random
-
-from agent import ThompsonSamplingAgent
-from config import API_BASE_URL, REDIS_HOST, REDIS_PORT
+import numpy as np
+
+from agent import ThompsonSamplingAgent, PULL_SECONDS, PULL_ERRORS
+from arms_client import fetch_arm_ids
+from belief_store import SYSTEM_MODE_KEY
+from checkpoint import experiment_path
+from sharding import ShardRouter, parse_nodes
+from instrumentation import RateLimitedLog, start_metrics_server
+from config import (
+    API_BASE_URL, REDIS_HOST, REDIS_PORT, POSTERIOR_CACHE_TTL_SECONDS, BELIEF_UPDATE_MODE,
+    AGENT_BATCH_SIZE, PULL_INTERVAL_SECONDS, AGENT_RUNTIME, REWARD_STREAM_MAXLEN,
+    BELIEF_STORAGE, BELIEF_FLUSH_SECONDS, ARM_SELECTION, PRUNE_TOLERANCE, SAMPLE_CHUNK_SIZE, ARMS_PAGE_SIZE, CHECKPOINT_PATH,
+    EXPERIMENT_ID, REDIS_NODES,
+)
+
+# Arm ids printed on startup; the rest are elided for large arm counts.
+MAX_LOGGED_ARMS = 20
 
 def get_arm_ids_from_api(api_url: str) -> list[str]:
     """
@@ -19,13 +34,10 @@ def get_arm_ids_from_api(api_url: str) -> list[str]:
 
     for attempt in range(max_retries):
         try:
-            url = f"{api_url}/get_arm_configs"
             print(f"INFO: Contacting API... (Attempt {attempt + 1}/{max_retries})")
-            response = requests.get(url, timeout=5)
-            response.raise_for_status()
-            arm_configs = response.json()
+            arm_ids = fetch_arm_ids(api_url, ARMS_PAGE_SIZE)
             print("INFO: Successfully connected to API.")
-            return list(arm_configs.keys())
+            return arm_ids
         except requests.exceptions.RequestException as e:
             print(f"WARN: Could not connect to API: {e}")
             if attempt < max_retries - 1:
@@ -36,54 +48,128 @@ def get_arm_ids_from_api(api_url: str) -> list[str]:
                 sys.exit(1)
     return []
 
+def pull_arms(api_url: str, arm_counts: dict[str, int], http=requests) -> dict[str, np.ndarray]:
+    """
+    Pulls a whole minibatch through the batched /choose_arms endpoint and
+    returns the rewards grouped by arm. Rewards travel as raw float64 bytes.
+    `http` is the requests module or a pooled requests.Session.
+    """
+    pulls = [[int(arm_id), count] for arm_id, count in arm_counts.items()]
+    response = http.post(f"{api_url}/choose_arms", params={'format': 'raw'}, json={'pulls': pulls}, timeout=10)
+    response.raise_for_status()
+    rewards = np.frombuffer(response.content, dtype="<f8")
+
+    rewards_by_arm = {}
+    offset = 0
+    for arm_id, count in arm_counts.items():
+        rewards_by_arm[arm_id] = rewards[offset:offset + count]
+        offset += count
+    return rewards_by_arm
+
+# Per-pull logging is rate limited: at these pull rates the log volume itself costs CPU.
+pull_log = RateLimitedLog("pull")
+pull_error_log = RateLimitedLog("pull_error")
+
+def experiment_redis_node() -> tuple[str, int]:
+    """(host, port) of the Redis node holding EXPERIMENT_ID's keys, among REDIS_NODES."""
+    return ShardRouter(parse_nodes(REDIS_NODES, REDIS_HOST, REDIS_PORT)).node_for(EXPERIMENT_ID)
+
+def read_system_mode(redis_client, mode_key: str = SYSTEM_MODE_KEY) -> str:
+    system_mode = redis_client.get(mode_key)
+    return system_mode.decode() if system_mode else "LEARNING" # Default to learning
+
+def run_iteration(agent, system_mode: str, pull_count: int, http=requests) -> bool:
+    """
+    One select / pull / update cycle of `agent`. Returns False if the API could
+    not be reached, in which case the caller backs off before the next cycle.
+    """
+    if AGENT_BATCH_SIZE > 1:
+        # Minibatch: one decision pass, one HTTP request and one Redis round trip for all pulls.
+        arm_counts = agent.select_arms(AGENT_BATCH_SIZE, mode=system_mode)
+        try:
+            with PULL_SECONDS.labels("choose_arms").time():
+                rewards_by_arm = pull_arms(API_BASE_URL, arm_counts, http)
+            agent.update_beliefs(rewards_by_arm)
+
+            pull_log(loop=pull_count, mode=system_mode, pulls=AGENT_BATCH_SIZE, arms=arm_counts)
+
+        except requests.exceptions.RequestException as e:
+            PULL_ERRORS.inc()
+            pull_error_log(level="ERROR", error=str(e))
+            return False
+        return True
+
+    # Agent selects an arm using the appropriate strategy
+    selected_arm = agent.select_arm(mode=system_mode)
+
+    try:
+        with PULL_SECONDS.labels("choose_arm").time():
+            response = http.get(f"{API_BASE_URL}/choose_arm", params={'arm_id': selected_arm})
+            response.raise_for_status()
+        result = response.json()
+        reward = result['reward']
+
+        agent.update_belief(arm_id=selected_arm, reward=reward)
+
+        pull_log(loop=pull_count, mode=system_mode, arm=selected_arm, reward=round(reward, 2))
+
+    except requests.exceptions.RequestException as e:
+        PULL_ERRORS.inc()
+        pull_error_log(level="ERROR", error=str(e))
+        return False
+    return True
+
 def main():
     """Main interaction loop for the RL agent."""
+    if AGENT_RUNTIME == "async":
+        import async_runtime
+        asyncio.run(async_runtime.run())
+        return
+    if AGENT_RUNTIME == "pool":
+        import supervisor
+        supervisor.run()
+        return
+
     print("--- RL Agent Starting ---")
+    start_metrics_server()
 
     arm_ids = get_arm_ids_from_api(API_BASE_URL)
     if not arm_ids:
         print("FATAL: No arms found from API. Exiting.")
         return
 
-    print(f"INFO: Discovered {len(arm_ids)} arms: {', '.join(arm_ids)}")
-
-    redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0)
-
-    agent = ThompsonSamplingAgent(arm_ids=arm_ids, redis_client=redis_client)
+    shown = ', '.join(arm_ids[:MAX_LOGGED_ARMS]) + (', ...' if len(arm_ids) > MAX_LOGGED_ARMS else '')
+    print(f"INFO: Discovered {len(arm_ids)} arms: {shown}")
+
+    host, port = experiment_redis_node()
+    redis_client = redis.Redis(host=host, port=port, db=0)
+    if EXPERIMENT_ID:
+        print(f"INFO: Learning experiment '{EXPERIMENT_ID}' on Redis {host}:{port}.")
+
+    agent = ThompsonSamplingAgent(
+        arm_ids=arm_ids,
+        redis_client=redis_client,
+        posterior_cache_ttl=POSTERIOR_CACHE_TTL_SECONDS,
+        update_mode=BELIEF_UPDATE_MODE,
+        reward_stream_maxlen=REWARD_STREAM_MAXLEN,
+        belief_storage=BELIEF_STORAGE,
+        flush_interval=BELIEF_FLUSH_SECONDS,
+        arm_selection=ARM_SELECTION,
+        prune_tolerance=PRUNE_TOLERANCE,
+        sample_chunk_size=SAMPLE_CHUNK_SIZE,
+        checkpoint_path=experiment_path(CHECKPOINT_PATH, EXPERIMENT_ID),
+        experiment=EXPERIMENT_ID,
+    )
     print("INFO: Agent initialized successfully with Redis backend.")
 
     pull_count = 0
     while True:
         pull_count += 1
-
-        # --- MODIFIED SECTION ---
         # Check the system mode from Redis
-        system_mode = redis_client.get("system:mode")
-        if system_mode:
-            system_mode = system_mode.decode()
-        else:
-            system_mode = "LEARNING" # Default to learning
-
-        # Agent selects an arm using the appropriate strategy
-        selected_arm = agent.select_arm(mode=system_mode)
-        # --- END MODIFIED SECTION ---
-
-        try:
-            response = requests.get(f"{API_BASE_URL}/choose_arm", params={'arm_id': selected_arm})
-            response.raise_for_status()
-            result = response.json()
-            reward = result['reward']
-
-            agent.update_belief(arm_id=selected_arm, reward=reward)
-            redis_client.set(f"arm:{selected_arm}:last_reward", reward, ex=20)
-
-            print(f"Loop {pull_count}: Mode={system_mode}. Chose arm {selected_arm}, got reward {reward:.2f}.")
-
-        except requests.exceptions.RequestException as e:
-            print(f"ERROR: Could not pull arm from API: {e}")
+        system_mode = read_system_mode(redis_client, agent.keys.mode)
+        if not run_iteration(agent, system_mode, pull_count):
             time.sleep(5)
-
-        time.sleep(1)
+        time.sleep(PULL_INTERVAL_SECONDS)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
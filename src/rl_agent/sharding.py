@@ -0,0 +1,69 @@
+# src/rl_agent/sharding.py
+#
+# Client-side sharding of experiments over several Redis nodes.
+#
+# Every key of an experiment carries its id as a hash tag (see
+# belief_store.ExperimentKeys), so an experiment is the unit of placement: all
+# of its keys live on one node, and its update scripts and pipelines never
+# span nodes. Experiments are placed by consistent hashing: each node owns
+# `vnodes` points on a 64-bit ring, and an experiment goes to the node owning
+# the first point at or after the hash of its id. Adding or removing a node
+# only moves the experiments of the ring segments it gains or loses, about
+# 1/N of them, and every process computes the same placement on its own.
+#
+# Nodes are given as "host:port" strings (REDIS_NODES, comma-separated).
+
+import bisect
+import hashlib
+
+# Ring points per node; more points spread experiments more evenly.
+DEFAULT_VNODES = 160
+
+
+def parse_nodes(spec: str, default_host: str, default_port: int) -> list[tuple[str, int]]:
+    """
+    (host, port) of every node of a comma-separated "host:port" list (a bare
+    host gets `default_port`); the default node if it is empty. Raises
+    ValueError on a node without a host or with an invalid port.
+    """
+    nodes = []
+    for node in spec.split(","):
+        node = node.strip()
+        if not node:
+            continue
+        host, separator, port = node.rpartition(":")
+        if not separator:
+            host, port = node, str(default_port)
+        if not host or not port.isdigit() or not 0 < int(port) < 65536:
+            raise ValueError(f"Invalid Redis node '{node}', expected host:port.")
+        nodes.append((host, int(port)))
+    return nodes or [(default_host, default_port)]
+
+
+def ring_hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class ShardRouter:
+    """Maps experiment ids to nodes ((host, port) tuples) on a consistent-hashing ring."""
+
+    def __init__(self, nodes: list[tuple[str, int]], vnodes: int = DEFAULT_VNODES):
+        if not nodes:
+            raise ValueError("ShardRouter needs at least one node.")
+        self.nodes = list(dict.fromkeys(nodes))
+        points = sorted(
+            (ring_hash(f"{node[0]}:{node[1]}#{i}"), node) for node in self.nodes for i in range(vnodes)
+        )
+        self._points = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def node_for(self, experiment: str) -> tuple[str, int]:
+        i = bisect.bisect_left(self._points, ring_hash(experiment))
+        return self._owners[i % len(self._owners)]
+
+    def group(self, experiments) -> dict:
+        """node -> the experiments of `experiments` it holds, in their original order."""
+        groups = {}
+        for experiment in experiments:
+            groups.setdefault(self.node_for(experiment), []).append(experiment)
+        return groups
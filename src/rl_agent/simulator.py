@@ -0,0 +1,170 @@
+# src/rl_agent/simulator.py
+#
+# In-process, pure-NumPy bandit simulator. It runs many independent bandit
+# instances side by side as array operations, with no Redis and no HTTP, using
+# the agent's Normal-Gamma math (agent.py) and the API's reward model
+# (slot_machine_api/config.py). The orchestrator's convergence/drift policy is
+# replayed per instance, so strategies and thresholds can be compared quickly.
+
+import importlib.util
+import os
+import time
+
+import numpy as np
+
+from agent import INITIAL_BELIEFS, BELIEF_FIELDS, normal_gamma_update, sample_posterior_means
+from drift_detector import DETECTORS
+
+# Agent modes, one per instance (mirrors system:mode).
+LEARNING, MONITORING, FORCED_EXPLORATION = 0, 1, 2
+
+API_CONFIG_PATH = os.path.join(os.path.dirname(__file__), "..", "slot_machine_api", "config.py")
+
+
+def load_arm_configs(path: str = API_CONFIG_PATH) -> dict:
+    """Loads ARM_CONFIGS from the slot machine API's config module."""
+    # Loaded by path: the agent has its own module named `config`.
+    spec = importlib.util.spec_from_file_location("slot_machine_api_config", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.ARM_CONFIGS
+
+
+class BanditSimulator:
+    """
+    Simulates `num_instances` independent copies of the system for `num_steps`
+    pulls each. At every step each instance makes one Thompson Sampling
+    decision, draws a reward from the true arm distribution and applies the
+    conjugate update, all vectorized across instances.
+
+    Orchestrator policy (per instance, times in steps):
+      - every `check_every` steps, sum |delta mu| over arms; after
+        `convergence_checks` consecutive sums below `convergence_threshold`
+        the instance converges and switches to MONITORING (epsilon-greedy).
+      - while monitoring, every reward feeds `drift_detector` (page_hinkley or
+        cusum); the best arm dropping or another arm rising resets the
+        beliefs and forces `forced_exploration_steps` of uniform exploration.
+
+    `drift_schedule` is a list of (step, arm_id, new_mean) events applied to
+    every instance, like POST /update_arm/{arm_id}.
+    """
+
+    def __init__(self, arm_configs: dict = None, num_instances: int = 1000, num_steps: int = 2000,
+                 drift_schedule=(), check_every: int = 10, convergence_threshold: float = 0.01,
+                 convergence_checks: int = 5, epsilon: float = 0.05, forced_exploration_steps: int = 30,
+                 drift_detector: str = "page_hinkley", detector_params: dict = None, seed=None):
+        arm_configs = load_arm_configs() if arm_configs is None else arm_configs
+        if drift_detector not in ("page_hinkley", "cusum"):
+            raise ValueError("The simulator needs a vectorized detector: 'page_hinkley' or 'cusum'.")
+        self.arm_ids = sorted(arm_configs)
+        self.arm_index = {arm_id: i for i, arm_id in enumerate(self.arm_ids)}
+        self.base_means = np.array([arm_configs[a]["mean"] for a in self.arm_ids], dtype=np.float64)
+        self.std_devs = np.array([arm_configs[a]["std_dev"] for a in self.arm_ids], dtype=np.float64)
+        self.num_instances = num_instances
+        self.num_steps = num_steps
+        self.drift_schedule = sorted(drift_schedule)
+        self.check_every = check_every
+        self.convergence_threshold = convergence_threshold
+        self.convergence_checks = convergence_checks
+        self.epsilon = epsilon
+        self.forced_exploration_steps = forced_exploration_steps
+        self.drift_detector = drift_detector
+        self.detector_params = detector_params or {}
+        self.rng = np.random.default_rng(seed)
+
+    def run(self) -> dict:
+        """
+        Runs the simulation and returns:
+          cumulative_regret   (T,) mean cumulative regret over instances
+          regret_quantiles    (3, T) 10th/50th/90th percentile of cumulative regret
+          convergences        (T,) number of instances converging at each step
+          drift_detections    (T,) number of instances detecting drift at each step
+          steps_per_sec       instance-steps simulated per second
+        """
+        rng = self.rng
+        B, K, T = self.num_instances, len(self.arm_ids), self.num_steps
+        instances = np.arange(B)
+        prior = np.array([float(INITIAL_BELIEFS[f]) for f in BELIEF_FIELDS])
+        posteriors = np.tile(prior, (B, K, 1))
+        true_means = np.tile(self.base_means, (B, 1))
+        schedule = list(self.drift_schedule)
+
+        agent_mode = np.full(B, LEARNING)
+        forced_until = np.zeros(B, dtype=np.int64)
+        converged = np.zeros(B, dtype=bool)
+        best_arm = np.zeros(B, dtype=np.int64)
+        stable_checks = np.zeros(B, dtype=np.int64)
+        previous_mu = posteriors[..., 0].copy()
+        detector = DETECTORS[self.drift_detector](B * K, **self.detector_params)
+
+        regret = np.zeros((B, T))
+        convergences = np.zeros(T, dtype=np.int64)
+        drift_detections = np.zeros(T, dtype=np.int64)
+
+        started = time.perf_counter()
+        for t in range(T):
+            while schedule and schedule[0][0] <= t:
+                _, arm_id, new_mean = schedule.pop(0)
+                true_means[:, self.arm_index[arm_id]] = new_mean
+
+            # FORCED_EXPLORATION expires like the Redis key TTL does.
+            expired = (agent_mode == FORCED_EXPLORATION) & (t >= forced_until)
+            agent_mode[expired] = LEARNING
+
+            # --- Agents: one decision per instance ---
+            sampled = sample_posterior_means(posteriors.reshape(-1, 4), rng=rng).reshape(B, K)
+            choices = np.argmax(sampled, axis=1)
+            explore = (agent_mode == FORCED_EXPLORATION) | (
+                (agent_mode == MONITORING) & (rng.random(B) < self.epsilon)
+            )
+            choices[explore] = rng.integers(K, size=int(explore.sum()))
+
+            rewards = rng.normal(true_means[instances, choices], self.std_devs[choices])
+            posteriors[instances, choices] = normal_gamma_update(posteriors[instances, choices], 1, rewards, 0.0)
+            regret[:, t] = true_means.max(axis=1) - true_means[instances, choices]
+
+            # --- Orchestrator: drift monitoring sees every reward ---
+            if converged.any():
+                watching = instances[converged]
+                arms = choices[watching]
+                directions = detector.step(watching * K + arms, rewards[watching])
+                drifted = ((arms == best_arm[watching]) & (directions < 0)) | (
+                    (arms != best_arm[watching]) & (directions > 0)
+                )
+                if drifted.any():
+                    reset = watching[drifted]
+                    posteriors[reset] = prior
+                    agent_mode[reset] = FORCED_EXPLORATION
+                    forced_until[reset] = t + self.forced_exploration_steps
+                    converged[reset] = False
+                    stable_checks[reset] = 0
+                    previous_mu[reset] = prior[0]
+                    drift_detections[t] = len(reset)
+
+            # --- Orchestrator: periodic convergence checks ---
+            if (t + 1) % self.check_every == 0:
+                checking = ~converged
+                mu = posteriors[..., 0]
+                total_change = np.abs(mu - previous_mu).sum(axis=1)
+                stable = checking & (total_change < self.convergence_threshold)
+                stable_checks = np.where(stable, stable_checks + 1, 0)
+                previous_mu = mu.copy()
+
+                newly = checking & (stable_checks >= self.convergence_checks)
+                if newly.any():
+                    converged[newly] = True
+                    best_arm[newly] = np.argmax(mu[newly], axis=1)
+                    agent_mode[newly] = MONITORING
+                    streams = (instances[newly][:, None] * K + np.arange(K)).ravel()
+                    detector.reset(streams)
+                    convergences[t] = int(newly.sum())
+
+        elapsed = time.perf_counter() - started
+        cumulative = np.cumsum(regret, axis=1)
+        return {
+            "cumulative_regret": cumulative.mean(axis=0),
+            "regret_quantiles": np.percentile(cumulative, [10, 50, 90], axis=0),
+            "convergences": convergences,
+            "drift_detections": drift_detections,
+            "steps_per_sec": B * T / elapsed,
+        }
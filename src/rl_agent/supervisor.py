@@ -0,0 +1,270 @@
+# src/rl_agent/supervisor.py
+#
+# Process-pool runtime: one container runs POOL_AGENT_COUNT synchronous
+# ThompsonSamplingAgents spread over POOL_PROCESSES worker processes (by
+# default one per core available to the container). Enabled with
+# AGENT_RUNTIME=pool; see main.py.
+#
+# Inside a worker every agent runs the usual main.py cycle in its own thread,
+# and all of them share one Redis connection pool, one keep-alive HTTP session
+# and one system:mode poller. The supervisor forwards SIGINT/SIGTERM as a
+# graceful stop (delta-mode agents flush before exiting), restarts workers that
+# die, and prints per-worker stats every STATS_REPORT_SECONDS.
+
+import multiprocessing
+import os
+import queue
+import random
+import resource
+import signal
+import threading
+import time
+
+import redis
+import requests
+from requests.adapters import HTTPAdapter
+
+from agent import ThompsonSamplingAgent
+from config import (
+    API_BASE_URL, POSTERIOR_CACHE_TTL_SECONDS, BELIEF_UPDATE_MODE, REWARD_STREAM_MAXLEN,
+    BELIEF_STORAGE, BELIEF_FLUSH_SECONDS, PULL_INTERVAL_SECONDS, STATS_REPORT_SECONDS,
+    POOL_AGENT_COUNT, POOL_PROCESSES, ARM_SELECTION, PRUNE_TOLERANCE, SAMPLE_CHUNK_SIZE, CHECKPOINT_PATH,
+    EXPERIMENT_ID,
+)
+from checkpoint import experiment_path
+from instrumentation import METRICS_PORT, start_metrics_server
+from main import experiment_redis_node, get_arm_ids_from_api, read_system_mode, run_iteration
+
+# How often a worker re-reads system:mode for all of its agents, in seconds.
+MODE_REFRESH_SECONDS = 0.5
+# How long workers get to finish their current cycle and flush on shutdown.
+SHUTDOWN_TIMEOUT_SECONDS = 15
+# Back-off after a failed pull, as in the single-agent loop.
+ERROR_BACKOFF_SECONDS = 5
+
+
+def available_cores() -> int:
+    """Cores this process may run on (respects CPU affinity, e.g. a cpuset-limited container)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def split_agents(num_agents: int, num_workers: int) -> list[int]:
+    """Agents per worker, as even as possible."""
+    base, extra = divmod(num_agents, num_workers)
+    return [base + (i < extra) for i in range(num_workers)]
+
+
+class ModePoller(threading.Thread):
+    """Reads system:mode once per MODE_REFRESH_SECONDS for every agent of the process."""
+
+    def __init__(self, redis_client: redis.Redis, stop, mode_key: str):
+        super().__init__(daemon=True)
+        self.redis = redis_client
+        self.stop = stop
+        self.mode_key = mode_key
+        self.mode = read_system_mode(redis_client, mode_key)
+
+    def run(self):
+        while not self.stop.wait(MODE_REFRESH_SECONDS):
+            try:
+                self.mode = read_system_mode(self.redis, self.mode_key)
+            except redis.RedisError as e:
+                print(f"WARN: Could not read system mode: {e}")
+
+
+def run_agent(agent, http, mode_poller, errors, stop):
+    """One logical agent: the main.py cycle until `stop` is set, then a final flush."""
+    # Stagger start times so agents do not fire in lockstep.
+    stop.wait(random.random() * PULL_INTERVAL_SECONDS)
+    pull_count = 0
+    while not stop.is_set():
+        pull_count += 1
+        try:
+            ok = run_iteration(agent, mode_poller.mode, pull_count, http)
+        except redis.RedisError as e:
+            print(f"ERROR: Redis error in agent loop: {e}")
+            ok = False
+        if not ok:
+            errors.append(1)
+            stop.wait(ERROR_BACKOFF_SECONDS)
+        stop.wait(PULL_INTERVAL_SECONDS)
+    if agent.update_mode == "delta":
+        agent.flush()
+
+
+def worker_snapshot(index, agents, errors, started) -> dict:
+    """Cumulative counters of one worker process, sent to the supervisor."""
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return {
+        "worker": index,
+        "pid": os.getpid(),
+        "agents": len(agents),
+        "pulls": sum(agent.stats["updates"] for agent in agents),
+        "errors": len(errors),
+        "round_trips": sum(agent.stats["round_trips"] for agent in agents),
+        "watch_retries": sum(agent.stats["watch_retries"] for agent in agents),
+        "cpu_seconds": usage.ru_utime + usage.ru_stime,
+        "max_rss_mb": usage.ru_maxrss / 1024.0, # ru_maxrss is in KiB on Linux
+        "uptime": time.monotonic() - started,
+    }
+
+
+def worker_main(index: int, num_agents: int, stop, stats_queue):
+    """Entry point of one worker process."""
+    # Ctrl-C reaches the whole process group; only the supervisor reacts to signals.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    started = time.monotonic()
+    start_metrics_server(METRICS_PORT + 1 + index)
+
+    arm_ids = get_arm_ids_from_api(API_BASE_URL)
+    host, port = experiment_redis_node()
+    redis_pool = redis.ConnectionPool(host=host, port=port, db=0, max_connections=num_agents + 1)
+    redis_client = redis.Redis(connection_pool=redis_pool)
+    http = requests.Session()
+    http.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=num_agents))
+
+    agents = [
+        ThompsonSamplingAgent(
+            arm_ids=arm_ids,
+            redis_client=redis_client,
+            posterior_cache_ttl=POSTERIOR_CACHE_TTL_SECONDS,
+            update_mode=BELIEF_UPDATE_MODE,
+            reward_stream_maxlen=REWARD_STREAM_MAXLEN,
+            belief_storage=BELIEF_STORAGE,
+            flush_interval=BELIEF_FLUSH_SECONDS,
+            arm_selection=ARM_SELECTION,
+            prune_tolerance=PRUNE_TOLERANCE,
+            sample_chunk_size=SAMPLE_CHUNK_SIZE,
+            checkpoint_path=experiment_path(CHECKPOINT_PATH, EXPERIMENT_ID),
+            experiment=EXPERIMENT_ID,
+        )
+        for _ in range(num_agents)
+    ]
+    mode_poller = ModePoller(redis_client, stop, agents[0].keys.mode)
+    mode_poller.start()
+    errors = [] # list.append is atomic, so agent threads can share it
+    threads = [
+        threading.Thread(target=run_agent, args=(agent, http, mode_poller, errors, stop), daemon=True)
+        for agent in agents
+    ]
+    for t in threads:
+        t.start()
+    print(f"INFO: Worker {index} (pid {os.getpid()}) running {num_agents} agents.")
+
+    while not stop.wait(STATS_REPORT_SECONDS):
+        stats_queue.put(worker_snapshot(index, agents, errors, started))
+
+    for t in threads:
+        t.join(timeout=SHUTDOWN_TIMEOUT_SECONDS)
+    stats_queue.put({**worker_snapshot(index, agents, errors, started), "final": True})
+    http.close()
+    redis_pool.disconnect()
+
+
+class Supervisor:
+    """Starts, watches and stops the worker processes and aggregates their stats."""
+
+    def __init__(self, num_agents: int = POOL_AGENT_COUNT, num_workers: int = POOL_PROCESSES):
+        num_workers = num_workers or available_cores()
+        self.agents_per_worker = split_agents(num_agents, max(1, min(num_workers, num_agents)))
+        self.stop = multiprocessing.Event()
+        self.stats_queue = multiprocessing.Queue()
+        self.workers = {}
+        self.latest = {} # worker index -> last snapshot
+        self.previous = {} # worker index -> snapshot at the previous report
+        self._signalled = False
+
+    def start_worker(self, index: int):
+        process = multiprocessing.Process(
+            target=worker_main, name=f"agent-worker-{index}",
+            args=(index, self.agents_per_worker[index], self.stop, self.stats_queue),
+        )
+        process.start()
+        self.workers[index] = process
+
+    def drain_stats(self, timeout: float):
+        try:
+            snapshot = self.stats_queue.get(timeout=timeout)
+            while True:
+                self.latest[snapshot["worker"]] = snapshot
+                snapshot = self.stats_queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def report(self, final: bool = False) -> str:
+        """One line per worker plus a total: pulls/s, CPU use, peak RSS, memory per agent and pulls/s per core."""
+        lines = []
+        total = {"agents": 0, "pulls": 0.0, "cpu": 0.0, "rss": 0.0, "pulls_per_sec": 0.0}
+        for index in sorted(self.latest):
+            now = self.latest[index]
+            before = self.previous.get(index, {"pulls": 0, "cpu_seconds": 0.0, "uptime": 0.0})
+            if final or before.get("pid") != now["pid"]: # Whole-run rates, or a restarted worker
+                before = {"pulls": 0, "cpu_seconds": 0.0, "uptime": 0.0}
+            elapsed = max(now["uptime"] - before["uptime"], 1e-9)
+            pulls = now["pulls"] - before["pulls"]
+            cpu = now["cpu_seconds"] - before["cpu_seconds"]
+            lines.append(
+                f"STATS worker={index} pid={now['pid']} agents={now['agents']} pulls/s={pulls / elapsed:.1f} "
+                f"cpu={cpu / elapsed:.1%} rss={now['max_rss_mb']:.1f}MB errors={now['errors']} "
+                f"round_trips/pull={now['round_trips'] / max(now['pulls'], 1):.2f} watch_retries={now['watch_retries']}"
+            )
+            total["agents"] += now["agents"]
+            total["pulls"] += pulls
+            total["cpu"] += cpu
+            total["rss"] += now["max_rss_mb"]
+            total["pulls_per_sec"] += pulls / elapsed
+        if total["agents"]:
+            lines.append(
+                f"STATS total agents={total['agents']} pulls/s={total['pulls_per_sec']:.1f} "
+                f"rss/agent={total['rss'] / total['agents']:.2f}MB "
+                f"pulls/cpu-second={total['pulls'] / max(total['cpu'], 1e-9):.0f}"
+            )
+        self.previous = dict(self.latest)
+        return "\n".join(lines)
+
+    def _on_signal(self, signum, frame):
+        # Only a flag: setting the multiprocessing Event here could deadlock on its
+        # lock if the signal lands while the main loop holds it.
+        self._signalled = True
+
+    def run(self):
+        for index in range(len(self.agents_per_worker)):
+            self.start_worker(index)
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, self._on_signal)
+
+        next_report = time.monotonic() + STATS_REPORT_SECONDS
+        while not self._signalled:
+            self.drain_stats(timeout=1.0)
+            for index, process in list(self.workers.items()):
+                if not process.is_alive() and not self._signalled:
+                    print(f"WARN: Worker {index} exited with code {process.exitcode}; restarting it.")
+                    self.start_worker(index)
+            if time.monotonic() >= next_report:
+                next_report += STATS_REPORT_SECONDS
+                if self.latest:
+                    print(self.report())
+
+        print("INFO: Stopping agent workers...")
+        self.stop.set()
+        deadline = time.monotonic() + SHUTDOWN_TIMEOUT_SECONDS + STATS_REPORT_SECONDS
+        for index, process in self.workers.items():
+            process.join(timeout=max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                print(f"WARN: Worker {index} did not stop in time; terminating it.")
+                process.terminate()
+        self.drain_stats(timeout=0.1)
+        print(self.report(final=True))
+
+
+def run():
+    """Runs the supervisor until SIGINT/SIGTERM."""
+    supervisor = Supervisor()
+    print(
+        f"--- RL Agent Supervisor Starting ({POOL_AGENT_COUNT} agents over "
+        f"{len(supervisor.agents_per_worker)} worker processes) ---"
+    )
+    supervisor.run()
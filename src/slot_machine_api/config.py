@@ -1,5 +1,9 @@
 # src/slot_machine_api/config.py
 
+import os
+
+import numpy as np
+
 # This dictionary is designed to be "easy" for the system to solve,
 # allowing for quick and clear observation of the MLOps lifecycle.
 
@@ -13,4 +17,26 @@ ARM_CONFIGS = {
     "3": {"mean": -1.0, "std_dev": 1.0}, # A clearly bad arm.
     
     "4": {"mean": -3.0, "std_dev": 0.5}  # The undisputed WORST arm.
-}
\ No newline at end of file
+}
+
+# Large action spaces: NUM_ARMS > 0 replaces the arms above with that many
+# synthetic arms "0".."NUM_ARMS-1", with means drawn from N(0, 1) (seeded by
+# ARMS_SEED, so every replica serves the same arms) and a std_dev of 1.
+NUM_ARMS = int(os.getenv("NUM_ARMS", 0))
+ARMS_SEED = int(os.getenv("ARMS_SEED", 0))
+if NUM_ARMS > 0:
+    _means = np.random.default_rng(ARMS_SEED).normal(0.0, 1.0, NUM_ARMS)
+    ARM_CONFIGS = {str(i): {"mean": float(mean), "std_dev": 1.0} for i, mean in enumerate(_means)}
+
+# Reward generation (rewards.py). REWARD_SEED makes every arm's reward sequence
+# replayable bit-for-bit; unset, fresh entropy is drawn and logged at startup.
+# Seeded replicas or uvicorn workers need distinct REWARD_STREAM_IDs, or they
+# serve identical rewards. Each arm pre-generates up to REWARD_BUFFER_SIZE draws;
+# larger buffers refill less often, but each refill adds to that request's latency.
+REWARD_SEED = int(os.environ["REWARD_SEED"]) if os.getenv("REWARD_SEED") else None
+REWARD_STREAM_ID = int(os.getenv("REWARD_STREAM_ID", 0))
+REWARD_BUFFER_SIZE = int(os.getenv("REWARD_BUFFER_SIZE", 4096))
+
+# Path of a drift scenario JSON file (see scenario_engine.py) applied from
+# startup; empty for none. POST /scenario loads one at runtime.
+DRIFT_SCENARIO = os.getenv("DRIFT_SCENARIO", "")
@@ -1,15 +1,63 @@
 # src/slot_machine_api/main.py (Updated to allow drift)
+import copy
+import json
+import time
+import msgpack
 import numpy as np
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Response
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+from pydantic import BaseModel, Field
+
+# Shared with the agent; copied next to this file in the API image.
+from instrumentation import LATENCY_BUCKETS
 
 # Import the initial arm configurations from our config file
-from config import ARM_CONFIGS
+from config import ARM_CONFIGS, DRIFT_SCENARIO, REWARD_BUFFER_SIZE, REWARD_SEED, REWARD_STREAM_ID
+from rewards import RewardStreams
+from scenario_engine import ScenarioEngine
 
 # --- State ---
 # We copy the imported config into a new variable that can be modified at runtime.
-# This is the crucial change that allows us to simulate drift.
-current_arm_configs = ARM_CONFIGS.copy()
+# This is the crucial change that allows us to simulate drift. A deep copy, so
+# updating an arm does not mutate the per-arm dicts of ARM_CONFIGS.
+current_arm_configs = copy.deepcopy(ARM_CONFIGS)
+# The same configured values as arrays, for vectorized per-pull lookups.
+arm_ids = list(current_arm_configs)
+arm_index = {arm_id: i for i, arm_id in enumerate(arm_ids)}
+base_means = np.array([config["mean"] for config in current_arm_configs.values()], dtype=np.float64)
+base_std_devs = np.array([config["std_dev"] for config in current_arm_configs.values()], dtype=np.float64)
+
+# Most arms / clock points in one GET /scenario/timeline response.
+MAX_TIMELINE_ARMS = 100
+MAX_TIMELINE_POINTS = 10_000
+
+# Upper bound on the total number of pulls served by one /choose_arms request.
+MAX_PULLS_PER_REQUEST = 100_000
+
+# Largest page of arm metadata served by one GET /arms request.
+MAX_ARMS_PER_PAGE = 100_000
+
+# Above this many arms, pulls are counted under arm="all" instead of one series per arm.
+MAX_LABELLED_ARMS = 1_000
+
+# Per-arm reward streams; replaced by POST /reseed.
+reward_streams = RewardStreams(current_arm_configs, REWARD_SEED, REWARD_STREAM_ID, REWARD_BUFFER_SIZE)
+print(f"INFO: Reward streams seeded with {reward_streams.seed} (stream id {REWARD_STREAM_ID}).")
+
+# Active drift scenario (scenario_engine.py), or None: arms keep their configured values.
+scenario = None
+
+# Ground truth of every arm, (clock key, means, std_devs, best mean): recomputed when
+# an arm is updated and, under a scenario, at most once per clock resolution.
+_truth = None
+
+# --- Prometheus metrics (GET /metrics) ---
+ARM_PULLS = Counter("bandit_api_arm_pulls_total", "Pulls served, per arm.", ["arm"])
+# Expected regret of every pull: the best current mean minus the pulled arm's mean.
+CUMULATIVE_REGRET = Counter("bandit_api_regret_total", "Cumulative expected regret of all pulls served.")
+REQUEST_SECONDS = Histogram(
+    "bandit_api_request_seconds", "Time spent serving pulls.", ["endpoint"], buckets=LATENCY_BUCKETS,
+)
 
 app = FastAPI(
     title="K-Armed Bandit Simulation: Slot Machine API",
@@ -21,6 +69,69 @@ app = FastAPI(
 class ArmUpdate(BaseModel):
     mean: float
 
+# Request body for batched pulls: a list of (arm_id, count) pairs.
+class ArmPullBatch(BaseModel):
+    pulls: list[tuple[int, int]] = Field(..., min_length=1)
+
+def load_scenario(spec: dict | None):
+    """Starts `spec` (a scenario_engine.py JSON object) from clock 0, or stops drifting for None."""
+    global scenario, _truth
+    scenario = ScenarioEngine(spec, arm_ids, base_means, base_std_devs) if spec is not None else None
+    _truth = None
+
+
+def current_truth():
+    """(means, std_devs, best mean) of every arm right now, in arm_ids order."""
+    global _truth
+    key = None if scenario is None else int(scenario.now() // scenario.resolution)
+    truth = _truth
+    if truth is None or truth[0] != key:
+        means, std_devs = base_means, base_std_devs
+        if scenario is not None:
+            arms, t = np.arange(len(arm_ids)), scenario.now()
+            means = means + scenario.offsets("mean", arms, t)
+            std_devs = np.maximum(std_devs + scenario.offsets("std_dev", arms, t), 0.0)
+        truth = _truth = (key, means, std_devs, float(means.max()))
+    return truth[1:]
+
+
+def pull_params(pulled: list[str], counts: list[int]):
+    """
+    True (means, std_devs) of every pull, flattened in request order. Under a
+    scenario each pull advances its clock and gets the values at its own tick.
+    """
+    arms = np.repeat([arm_index[arm_id] for arm_id in pulled], counts)
+    means, std_devs = base_means[arms], base_std_devs[arms]
+    if scenario is not None:
+        t = scenario.advance(len(arms))
+        means = means + scenario.offsets("mean", arms, t)
+        std_devs = np.maximum(std_devs + scenario.offsets("std_dev", arms, t), 0.0)
+    return means, std_devs
+
+
+def record_pulls(pulled: list[str], counts: list[int], total_mean: float):
+    """
+    Counts pulls per arm and adds their expected regret against the current
+    best arm; `total_mean` is the sum of the pulled arms' true means.
+    """
+    per_arm_labels = len(current_arm_configs) <= MAX_LABELLED_ARMS
+    for arm_id, count in zip(pulled, counts):
+        ARM_PULLS.labels(arm_id if per_arm_labels else "all").inc(count)
+    CUMULATIVE_REGRET.inc(max(sum(counts) * current_truth()[2] - total_mean, 0.0))
+
+
+if DRIFT_SCENARIO:
+    with open(DRIFT_SCENARIO) as f:
+        load_scenario(json.load(f))
+    print(f"INFO: Drift scenario loaded from {DRIFT_SCENARIO}: {len(scenario.events)} events on a {scenario.clock} clock.")
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint."""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/")
 def read_root():
     """A simple root endpoint to confirm the API is running."""
@@ -30,21 +141,190 @@ def read_root():
 @app.get("/get_arm_configs")
 def get_arm_configs():
     """Returns the CURRENT true mean and standard deviation for all available arms."""
-    return current_arm_configs
+    if scenario is None:
+        return current_arm_configs
+    means, std_devs, _ = current_truth()
+    return {arm_id: {"mean": float(m), "std_dev": float(s)} for arm_id, m, s in zip(arm_ids, means, std_devs)}
+
+
+@app.get("/arms")
+def list_arms(offset: int = 0, limit: int = 10_000, top: int = 0):
+    """
+    Arm metadata as compact parallel arrays, for arm counts where the
+    /get_arm_configs object gets large:
+    {"total": K, "offset": offset, "arm_ids": [...], "means": [...], "std_devs": [...]}.
+
+    Pages follow a stable arm order: repeat with offset += limit until offset >= total.
+    With `top=N` the N arms with the highest current means are returned instead, best first.
+    """
+    if offset < 0 or not 0 < limit <= MAX_ARMS_PER_PAGE or not 0 <= top <= MAX_ARMS_PER_PAGE:
+        raise HTTPException(status_code=400, detail=f"Need offset >= 0 and 0 < limit, top <= {MAX_ARMS_PER_PAGE}.")
+    means, std_devs, _ = current_truth()
+    if top:
+        best = np.argpartition(-means, min(top, len(means)) - 1)[:top]
+        page = best[np.argsort(-means[best])]
+        offset = 0
+    else:
+        page = np.arange(offset, min(offset + limit, len(arm_ids)))
+    return {
+        "total": len(arm_ids),
+        "offset": offset,
+        "arm_ids": [arm_ids[i] for i in page],
+        "means": means[page].tolist(),
+        "std_devs": std_devs[page].tolist(),
+    }
 
 
 @app.get("/choose_arm")
 def choose_arm(arm_id: int):
     """Simulates choosing an arm and getting a reward from the CURRENT distribution."""
+    started = time.perf_counter()
     arm_id_str = str(arm_id)
     if arm_id_str not in current_arm_configs:
         raise HTTPException(status_code=404, detail=f"Arm ID '{arm_id}' not found.")
 
-    config = current_arm_configs[arm_id_str]
-    reward = np.random.normal(loc=config["mean"], scale=config["std_dev"])
+    if scenario is None:
+        config = current_arm_configs[arm_id_str]
+        mean, std_dev = config["mean"], config["std_dev"]
+    else:
+        means, std_devs = pull_params([arm_id_str], [1])
+        mean, std_dev = float(means[0]), float(std_devs[0])
+    reward = mean + std_dev * reward_streams.next(arm_id_str)
+    record_pulls([arm_id_str], [1], mean)
+    REQUEST_SECONDS.labels("choose_arm").observe(time.perf_counter() - started)
     return {"arm_id": arm_id, "reward": reward}
 
 
+@app.post("/choose_arms")
+def choose_arms(batch: ArmPullBatch, format: str = "json"):
+    """
+    Pulls several arms several times in one request. Rewards are sliced from
+    each arm's pre-generated stream, scaled to each pull's true mean and std_dev
+    (see pull_params), and returned flattened in request order
+    (all rewards of the first pair, then the second, ...).
+
+    `format` selects the body encoding:
+      - "json":    {"arm_ids": [...], "counts": [...], "rewards": [...]}
+      - "msgpack": the same object, with "rewards" as little-endian float64 bytes
+      - "raw":     just the little-endian float64 rewards (application/octet-stream)
+    """
+    if format not in ("json", "msgpack", "raw"):
+        raise HTTPException(status_code=400, detail=f"Unknown format '{format}'.")
+    started = time.perf_counter()
+
+    requested = [arm_id for arm_id, _ in batch.pulls]
+    counts = [count for _, count in batch.pulls]
+    if any(count < 0 for count in counts):
+        raise HTTPException(status_code=400, detail="Pull counts must be non-negative.")
+    if sum(counts) > MAX_PULLS_PER_REQUEST:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_PULLS_PER_REQUEST} pulls per request.")
+    for arm_id in requested:
+        if str(arm_id) not in current_arm_configs:
+            raise HTTPException(status_code=404, detail=f"Arm ID '{arm_id}' not found.")
+
+    pulled = [str(arm_id) for arm_id in requested]
+    rewards = np.empty(sum(counts), dtype="<f8")
+    offset = 0
+    for arm_id, count in zip(pulled, counts):
+        rewards[offset:offset + count] = reward_streams.take(arm_id, count)
+        offset += count
+    means, std_devs = pull_params(pulled, counts)
+    rewards *= std_devs
+    rewards += means
+    record_pulls(pulled, counts, float(means.sum()))
+    REQUEST_SECONDS.labels("choose_arms").observe(time.perf_counter() - started)
+
+    if format == "raw":
+        return Response(content=rewards.tobytes(), media_type="application/octet-stream")
+    if format == "msgpack":
+        body = msgpack.packb({"arm_ids": requested, "counts": counts, "rewards": rewards.tobytes()})
+        return Response(content=body, media_type="application/msgpack")
+    return {"arm_ids": requested, "counts": counts, "rewards": rewards.tolist()}
+
+
+@app.post("/reseed")
+def reseed(seed: int | None = None):
+    """
+    Restarts every arm's reward stream from `seed` (fresh entropy if omitted),
+    so an experiment can be replayed without restarting the API.
+    """
+    global reward_streams
+    reward_streams = RewardStreams(current_arm_configs, seed, REWARD_STREAM_ID, REWARD_BUFFER_SIZE)
+    print(f"INFO: Reward streams reseeded with {reward_streams.seed} (stream id {REWARD_STREAM_ID}).")
+    return {"seed": str(reward_streams.seed), "stream_id": REWARD_STREAM_ID}
+
+
+@app.get("/scenario")
+def get_scenario():
+    """The active drift scenario, its clock's current value and its discrete change points."""
+    if scenario is None:
+        return {"active": False}
+    return {
+        "active": True,
+        "clock": scenario.clock,
+        "now": scenario.now(),
+        "scenario": scenario.spec,
+        "change_points": scenario.change_points(),
+    }
+
+
+@app.post("/scenario")
+def set_scenario(spec: dict):
+    """Loads a drift scenario (see scenario_engine.py), replacing any active one; its clock starts at 0."""
+    try:
+        load_scenario(spec)
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid scenario: {e!r}")
+    print(f"INFO: Drift scenario loaded: {len(scenario.events)} events on a {scenario.clock} clock.")
+    return get_scenario()
+
+
+@app.delete("/scenario")
+def clear_scenario():
+    """Stops the active drift scenario; arms return to their configured values."""
+    load_scenario(None)
+    print("INFO: Drift scenario cleared.")
+    return {"active": False}
+
+
+@app.get("/scenario/timeline")
+def scenario_timeline(start: float = 0.0, end: float | None = None, points: int = 200, arms: str = ""):
+    """
+    Ground truth over the scenario clock: every listed arm's mean and std_dev at
+    `points` evenly spaced clock values from `start` to `end` (default: past the
+    current value and the last change point). `arms` is a comma-separated list
+    of arm IDs, required when there are more than MAX_TIMELINE_ARMS arms.
+    """
+    selected = arms.split(",") if arms else arm_ids
+    if len(selected) > MAX_TIMELINE_ARMS or not 1 < points <= MAX_TIMELINE_POINTS:
+        raise HTTPException(status_code=400, detail=f"Need at most {MAX_TIMELINE_ARMS} arms and 1 < points <= {MAX_TIMELINE_POINTS}.")
+    for arm_id in selected:
+        if arm_id not in arm_index:
+            raise HTTPException(status_code=404, detail=f"Arm ID '{arm_id}' not found.")
+
+    now = scenario.now() if scenario is not None else 0.0
+    change_points = scenario.change_points() if scenario is not None else []
+    if end is None:
+        end = 1.1 * max([now, 1.0] + [point["t"] for point in change_points])
+    t = np.linspace(start, end, points)
+    idx = np.array([arm_index[arm_id] for arm_id in selected], dtype=np.intp)
+    means = np.repeat(base_means[idx][:, None], points, axis=1)
+    std_devs = np.repeat(base_std_devs[idx][:, None], points, axis=1)
+    if scenario is not None:
+        means += scenario.offsets("mean", idx[:, None], t)
+        std_devs = np.maximum(std_devs + scenario.offsets("std_dev", idx[:, None], t), 0.0)
+    return {
+        "active": scenario is not None,
+        "clock": scenario.clock if scenario is not None else None,
+        "now": now,
+        "t": t.tolist(),
+        "arm_ids": selected,
+        "means": means.tolist(),
+        "std_devs": std_devs.tolist(),
+        "change_points": change_points,
+    }
+
+
 # --- THIS IS THE NEW ENDPOINT ---
 @app.post("/update_arm/{arm_id}")
 def update_arm_mean(arm_id: int, arm_update: ArmUpdate):
@@ -55,8 +335,11 @@ def update_arm_mean(arm_id: int, arm_update: ArmUpdate):
     if arm_id_str not in current_arm_configs:
         raise HTTPException(status_code=404, detail=f"Arm ID '{arm_id}' not found.")
 
+    global _truth
     old_mean = current_arm_configs[arm_id_str]['mean']
     current_arm_configs[arm_id_str]['mean'] = arm_update.mean
+    base_means[arm_index[arm_id_str]] = arm_update.mean
+    _truth = None
 
     print(f"*** CONCEPT DRIFT TRIGGERED MANUALLY FOR ARM {arm_id_str} ***")
     print(f"Arm {arm_id_str} mean changed from {old_mean} to {arm_update.mean}")
@@ -0,0 +1,89 @@
+# src/slot_machine_api/rewards.py
+#
+# Reward generation for the slot machine API.
+#
+# Every arm gets its own np.random.Generator, seeded from its own SeedSequence
+# child (entropy = the run's seed, spawn_key = (stream_id, arm index)), so arms
+# never share or correlate their draws. An arm's generator fills a buffer of
+# standard normals that pulls just index into; the reward is mean + std_dev * z,
+# so drifting an arm's mean does not invalidate its buffer.
+#
+# The k-th pull of an arm always gets the k-th draw of that arm's stream, no
+# matter how pulls are batched or interleaved with other arms: with the same
+# seed, the same per-arm pull sequence replays bit-for-bit. Without a seed,
+# fresh OS entropy is drawn (and logged, to replay the run later), so separate
+# uvicorn workers get independent streams. Seeded workers must get distinct
+# stream ids, or they would serve identical rewards.
+
+import threading
+
+import numpy as np
+
+# First buffer of an arm; doubled on every refill up to the configured size,
+# so arms pulled a few times (large K) stay cheap and hot arms refill rarely.
+INITIAL_BUFFER_SIZE = 64
+
+
+class _ArmStream:
+    __slots__ = ("generator", "buffer", "position", "next_size")
+
+    def __init__(self, generator: np.random.Generator):
+        self.generator = generator
+        self.buffer = np.empty(0)
+        self.position = 0
+        self.next_size = INITIAL_BUFFER_SIZE
+
+
+class RewardStreams:
+    """Per-arm buffered standard normal streams, safe to share between request threads."""
+
+    def __init__(self, arm_ids, seed: int | None = None, stream_id: int = 0, buffer_size: int = 4096):
+        # The entropy actually used; pass it back as `seed` to replay this run.
+        self.seed = np.random.SeedSequence(seed).entropy
+        self.stream_id = stream_id
+        self.buffer_size = max(buffer_size, 1)
+        self._arm_index = {arm_id: i for i, arm_id in enumerate(arm_ids)}
+        self._streams = {} # Created on an arm's first pull
+        self._lock = threading.Lock()
+
+    def _stream(self, arm_id: str) -> _ArmStream:
+        stream = self._streams.get(arm_id)
+        if stream is None:
+            seed_seq = np.random.SeedSequence(self.seed, spawn_key=(self.stream_id, self._arm_index[arm_id]))
+            stream = self._streams[arm_id] = _ArmStream(np.random.Generator(np.random.PCG64(seed_seq)))
+        return stream
+
+    def _refill(self, stream: _ArmStream):
+        stream.buffer = stream.generator.standard_normal(stream.next_size)
+        stream.position = 0
+        stream.next_size = min(2 * stream.next_size, self.buffer_size)
+
+    def next(self, arm_id: str) -> float:
+        """The next standard normal of `arm_id`'s stream."""
+        with self._lock:
+            stream = self._streams.get(arm_id) or self._stream(arm_id)
+            position = stream.position
+            if position == len(stream.buffer):
+                self._refill(stream)
+                position = 0
+            stream.position = position + 1
+            return float(stream.buffer[position])
+
+    def take(self, arm_id: str, count: int) -> np.ndarray:
+        """The next `count` standard normals of `arm_id`'s stream, as an array."""
+        out = np.empty(count)
+        with self._lock:
+            stream = self._stream(arm_id)
+            filled = 0
+            while filled < count:
+                if stream.position == len(stream.buffer):
+                    if count - filled >= self.buffer_size:
+                        # Larger than a whole buffer: draw the rest straight from the stream.
+                        out[filled:] = stream.generator.standard_normal(count - filled)
+                        break
+                    self._refill(stream)
+                n = min(count - filled, len(stream.buffer) - stream.position)
+                out[filled:filled + n] = stream.buffer[stream.position:stream.position + n]
+                stream.position += n
+                filled += n
+        return out
@@ -0,0 +1,255 @@
+# src/slot_machine_api/scenario_engine.py
+#
+# Scheduled drift for the slot machine API (DRIFT_SCENARIO, POST /scenario).
+#
+# A scenario is a JSON object:
+#   {
+#     "clock": "pulls",            # or "seconds": pulls served / wall time since it was loaded
+#     "resolution": 100,           # optional: how often the whole-arm truth (regret, /arms) is re-evaluated
+#     "events": [
+#       {"kind": "abrupt", "arms": ["1"], "at": 20000, "to": -2.0},
+#       {"kind": "linear", "arms": ["0"], "start": 40000, "end": 60000, "shift": 4.0},
+#       {"kind": "periodic", "arms": "all", "period": 50000, "amplitude": 0.5},
+#       {"kind": "random_walk", "arms": ["2", "3"], "param": "std_dev", "every": 1000, "step": 0.05, "seed": 7}
+#     ]
+#   }
+#
+# Every event adds an offset to one parameter ("mean" by default, or "std_dev")
+# of its arms, as a function of the clock t:
+#   abrupt       shift                                         once t >= at
+#   linear       shift * (t - start) / (end - start)           clipped to [0, shift]
+#   periodic     amplitude * sin(2 pi (t - start) / period + phase)   once t >= start
+#   random_walk  sum of one N(0, step) increment per `every`   once t >= start
+# (period > 0, every > 0, step >= 0 and resolution > 0, or the scenario is rejected).
+# Offsets of all events add up on top of the arm's configured value, so events
+# compose in any order; std_devs are clipped at 0. For abrupt and linear events
+# "to" may replace "shift": the value the arm reaches, from its configured one.
+#
+# Evaluation is vectorized over (arm, t) pairs, one NumPy pass per event, so a
+# batch of pulls gets every pull's exact parameters at its own clock value.
+
+import threading
+import time
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+PARAMS = ("mean", "std_dev")
+DEFAULT_RESOLUTION = {"pulls": 100.0, "seconds": 0.1}
+WALK_BLOCK = 1024 # Random walk increments drawn (and cached) at a time
+
+
+class _Event(ABC):
+    """
+    An offset applied to one parameter of a set of arms. `cols` index those
+    arms, plus one trailing padding column, len(arms), whose offset is always
+    0: arms outside the event map to it, so no pull ever needs masking.
+    """
+
+    def __init__(self, spec: dict, arms: np.ndarray):
+        self.kind = spec["kind"]
+        self.param = spec.get("param", "mean")
+        self.arms = arms
+        self.start = float(spec.get("start", 0.0))
+        self.scale = np.append(np.ones(len(arms)), 0.0)
+
+    def _shift(self, spec: dict, base: np.ndarray) -> np.ndarray:
+        """Per-column shift: `shift`, or `to` minus each arm's configured value."""
+        if "to" in spec:
+            return np.append(float(spec["to"]) - base[self.arms], 0.0)
+        return float(spec["shift"]) * self.scale
+
+    @abstractmethod
+    def offsets(self, t: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """Offset of the pulls at clock values `t` on event columns `cols` (broadcast together)."""
+
+    def change_points(self) -> list[float]:
+        """Clock values where the event starts changing its arms; none for continuous drift."""
+        return []
+
+
+class Abrupt(_Event):
+    def __init__(self, spec, arms, base):
+        super().__init__(spec, arms)
+        self.at = float(spec["at"])
+        self.shift = self._shift(spec, base)
+
+    def offsets(self, t, cols):
+        return np.where(t >= self.at, self.shift[cols], 0.0)
+
+    def change_points(self):
+        return [self.at]
+
+
+class Linear(_Event):
+    def __init__(self, spec, arms, base):
+        super().__init__(spec, arms)
+        self.end = float(spec["end"])
+        if self.end <= self.start:
+            raise ValueError("A linear event needs end > start.")
+        self.shift = self._shift(spec, base)
+
+    def offsets(self, t, cols):
+        return self.shift[cols] * np.clip((t - self.start) / (self.end - self.start), 0.0, 1.0)
+
+    def change_points(self):
+        return [self.start]
+
+
+class Periodic(_Event):
+    def __init__(self, spec, arms, base):
+        super().__init__(spec, arms)
+        self.period = float(spec["period"])
+        if not self.period > 0:
+            raise ValueError("A periodic event needs period > 0.")
+        self.amplitude = float(spec["amplitude"])
+        self.phase = float(spec.get("phase", 0.0))
+
+    def offsets(self, t, cols):
+        wave = self.amplitude * np.sin(2 * np.pi * (t - self.start) / self.period + self.phase)
+        return np.where(t >= self.start, wave, 0.0) * self.scale[cols]
+
+
+class RandomWalk(_Event):
+    """
+    Seeded, so a scenario replays the same walk: increment i comes from block
+    i // WALK_BLOCK, drawn from a generator seeded with (seed, block), so the
+    offset at a clock value does not depend on how pulls were batched. Only the
+    two newest blocks are kept, so memory stays fixed however long the run.
+    """
+
+    def __init__(self, spec, arms, base):
+        super().__init__(spec, arms)
+        self.every = float(spec["every"])
+        self.step = float(spec["step"])
+        if not self.every > 0 or not self.step >= 0:
+            raise ValueError("A random_walk event needs every > 0 and step >= 0.")
+        self.seed = int(spec.get("seed", 0))
+        # block -> (offset before its first increment, (WALK_BLOCK, columns) cumulative increments within it)
+        self._blocks = {0: (np.zeros(len(arms) + 1), self._cumulative(0))}
+        self._lock = threading.Lock()
+
+    def _cumulative(self, block: int) -> np.ndarray:
+        increments = np.zeros((WALK_BLOCK, len(self.arms) + 1))
+        increments[:, :-1] = np.random.default_rng([self.seed, block]).normal(0.0, self.step, (WALK_BLOCK, len(self.arms)))
+        return np.cumsum(increments, axis=0)
+
+    def _block(self, block: int):
+        if block in self._blocks:
+            return self._blocks[block]
+        latest = max(self._blocks)
+        if block > latest:
+            start, cumulative = self._blocks[latest]
+            start, b = start + cumulative[-1], latest + 1
+        else:
+            # Only a pull lagging the clock by over a block gets here: walk again from the beginning.
+            start, b = np.zeros(len(self.arms) + 1), 0
+        for b in range(b, block):
+            start = start + self._cumulative(b)[-1]
+        entry = self._blocks[block] = (start, self._cumulative(block))
+        for old in sorted(self._blocks)[:-2]:
+            del self._blocks[old]
+        return entry
+
+    def offsets(self, t, cols):
+        steps = np.where(t >= self.start, np.floor((t - self.start) / self.every), 0).astype(np.int64)
+        steps, cols = np.broadcast_arrays(steps, cols)
+        increment = steps - 1 # Index of the last increment applied; -1 before the first
+        block = increment // WALK_BLOCK
+        result = np.zeros(steps.shape)
+        with self._lock:
+            for b in np.unique(block[increment >= 0]):
+                start, cumulative = self._block(int(b))
+                rows = (increment >= 0) & (block == b)
+                result[rows] = start[cols[rows]] + cumulative[increment[rows] % WALK_BLOCK, cols[rows]]
+        return result
+
+
+EVENTS = {
+    "abrupt": Abrupt,
+    "linear": Linear,
+    "periodic": Periodic,
+    "random_walk": RandomWalk,
+}
+
+
+class ScenarioEngine:
+    """
+    Ground truth of every arm over a scenario's clock. `base_means` and
+    `base_std_devs` are the configured values the event offsets are added to.
+    """
+
+    def __init__(self, scenario: dict, arm_ids: list[str], base_means: np.ndarray, base_std_devs: np.ndarray):
+        self.spec = scenario
+        self.clock = scenario.get("clock", "pulls")
+        if self.clock not in DEFAULT_RESOLUTION:
+            raise ValueError(f"Unknown clock '{self.clock}', expected 'pulls' or 'seconds'.")
+        self.resolution = float(scenario.get("resolution", DEFAULT_RESOLUTION[self.clock]))
+        if not self.resolution > 0:
+            raise ValueError("A scenario needs resolution > 0.")
+        self.arm_ids = list(arm_ids)
+        self.num_arms = len(arm_ids)
+        arm_index = {arm_id: i for i, arm_id in enumerate(arm_ids)}
+        base = {"mean": np.asarray(base_means, dtype=np.float64), "std_dev": np.asarray(base_std_devs, dtype=np.float64)}
+
+        self.events = []
+        specs = scenario.get("events", [])
+        if not isinstance(specs, list) or not all(isinstance(spec, dict) for spec in specs):
+            raise ValueError("A scenario's events must be a list of objects.")
+        for spec in specs:
+            if spec.get("kind") not in EVENTS:
+                raise ValueError(f"Unknown event kind '{spec.get('kind')}', expected one of {list(EVENTS)}.")
+            if spec.get("param", "mean") not in PARAMS:
+                raise ValueError(f"Unknown param '{spec['param']}', expected one of {list(PARAMS)}.")
+            if spec.get("arms", "all") == "all":
+                arms = np.arange(self.num_arms)
+            elif not isinstance(spec["arms"], list):
+                raise ValueError(f"The arms of a {spec['kind']} event must be \"all\" or a list of arm IDs.")
+            else:
+                unknown = [arm_id for arm_id in spec["arms"] if str(arm_id) not in arm_index]
+                if unknown:
+                    raise ValueError(f"Unknown arm IDs in a {spec['kind']} event: {unknown}.")
+                arms = np.array([arm_index[str(arm_id)] for arm_id in spec["arms"]], dtype=np.intp)
+            event = EVENTS[spec["kind"]](spec, arms, base[spec.get("param", "mean")])
+            # Column of each arm within the event; the padding column for arms it does not touch.
+            event.position = np.full(self.num_arms, len(arms), dtype=np.intp)
+            event.position[arms] = np.arange(len(arms))
+            self.events.append(event)
+        self._events_by_param = {param: [event for event in self.events if event.param == param] for param in PARAMS}
+
+        self.pulls = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def now(self) -> float:
+        """The current clock value: pulls served or seconds since the scenario was loaded."""
+        return float(self.pulls) if self.clock == "pulls" else time.monotonic() - self.started
+
+    def advance(self, count: int) -> np.ndarray:
+        """Counts `count` pulls and returns the clock value of each, in order."""
+        with self._lock:
+            first = self.pulls
+            self.pulls += count
+        if self.clock == "pulls":
+            return np.arange(first, first + count, dtype=np.float64)
+        return np.full(count, time.monotonic() - self.started)
+
+    def offsets(self, param: str, arms: np.ndarray, t: np.ndarray) -> np.ndarray:
+        """
+        Summed offset of `param` for each (arm index, clock value) pair, with
+        NumPy broadcasting between `arms` and `t` (a scalar 0.0 if no event
+        changes `param`).
+        """
+        arms, t = np.asarray(arms, dtype=np.intp), np.asarray(t, dtype=np.float64)
+        total = 0.0
+        for event in self._events_by_param[param]:
+            total = total + event.offsets(t, event.position[arms])
+        return total
+
+    def change_points(self) -> list[dict]:
+        """Discrete changes of the ground truth, in clock order: {"t", "kind", "param", "arms"}."""
+        points = [
+            {"t": t, "kind": event.kind, "param": event.param, "arms": [self.arm_ids[i] for i in event.arms]}
+            for event in self.events for t in event.change_points()
+        ]
+        return sorted(points, key=lambda point: point["t"])
@@ -1,12 +1,22 @@
-# src/visualizer/app.py (Refactored for Real-Time Updates)
+# src/visualizer/app.py (Cached payload pushed over Server-Sent Events)
 
 import requests
 import json
+import threading
+import time
 import numpy as np
-from flask import Flask, render_template, jsonify
+from scipy import stats
+from flask import Flask, render_template, request, Response
+from prometheus_client import CONTENT_TYPE_LATEST, Histogram, generate_latest
 import redis
 import os
 
+# Shared with the agent; copied next to this file in the visualizer image.
+from belief_store import BELIEF_FIELDS, ExperimentKeys, PackedBeliefs, hash_belief
+from instrumentation import LATENCY_BUCKETS
+from sharding import ShardRouter, parse_nodes
+from history import HISTORY_FIELDS, BeliefHistory
+
 
 app = Flask(__name__)
 
@@ -16,82 +26,371 @@ API_URL = os.getenv("API_BASE_URL", "http://slot-machine-api:8000")
 REDIS_HOST = os.getenv("REDIS_HOST", "redis")
 # --------------------------------------------------------
 REDIS_PORT = 6379
-NUM_SAMPLES_FOR_PLOT = 1000
+EXPERIMENT_ID = os.getenv("EXPERIMENT_ID", "") # Experiment shown; "" is the default one
+REDIS_NODES = os.getenv("REDIS_NODES", "") # Comma-separated "host:port" nodes experiments are sharded over
 PLOT_Y_AXIS_RANGE = [-5, 8] # Slightly increased range for the new 'easy' config
+REFRESH_INTERVAL_SECONDS = float(os.getenv("REFRESH_INTERVAL_SECONDS", 1.0))
+DENSITY_POINTS = 60 # Points per density curve
+VIOLIN_HALF_WIDTH = 0.4 # Widest point of a density shape, in x-axis (arm) units
+QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+SSE_KEEPALIVE_SECONDS = 15
+BELIEF_STORAGE = os.getenv("BELIEF_STORAGE", "hash") # "hash" or "packed", as written by the agents
+# Arms shown on the dashboard: those with the highest true means, so large arm counts stay readable.
+MAX_PLOTTED_ARMS = int(os.getenv("MAX_PLOTTED_ARMS", 20))
+TIMELINE_POINTS = 200 # Clock points of the drift scenario's ground-truth timeline
+# Belief history (history.py): every HISTORY_SAMPLE_SECONDS the posteriors of the
+# HISTORY_MAX_ARMS best arms (by true mean at startup) are recorded; about 140 kB per arm.
+HISTORY_SAMPLE_SECONDS = float(os.getenv("HISTORY_SAMPLE_SECONDS", 1.0))
+HISTORY_MAX_ARMS = int(os.getenv("HISTORY_MAX_ARMS", 100))
+HISTORY_MAX_POINTS = 2000 # Largest number of time points in one GET /history response
 
-# Connect to Redis
-redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0, decode_responses=True)
+# --- Prometheus metrics (GET /metrics) ---
+RENDER_SECONDS = Histogram(
+    "bandit_visualizer_render_seconds", "Time to build the plot payload served by /data and /stream.",
+    buckets=LATENCY_BUCKETS,
+)
+DATA_REQUEST_SECONDS = Histogram(
+    "bandit_visualizer_data_request_seconds", "Time to answer GET /data.", buckets=LATENCY_BUCKETS,
+)
 
-def get_ground_truth_plot_data():
-    """Fetches true arm data from API and returns Plotly data traces."""
-    data_traces = []
-    try:
-        response = requests.get(f"{API_URL}/get_arm_configs")
-        response.raise_for_status()
-        configs = response.json()
-        
-        for arm_id, params in sorted(configs.items()):
-            samples = np.random.normal(params['mean'], params['std_dev'], NUM_SAMPLES_FOR_PLOT)
-            data_traces.append({'y': list(samples), 'type': 'violin', 'name': f'Arm {arm_id}'})
-        return data_traces
-    except Exception as e:
-        print(f"Error getting ground truth data: {e}")
-        return data_traces
-
-def get_agent_beliefs_plot_data():
-    """Loads agent beliefs from Redis and returns Plotly data traces."""
-    data_traces = []
+# Connect to the Redis node holding the experiment
+KEYS = ExperimentKeys(EXPERIMENT_ID)
+REDIS_NODE = ShardRouter(parse_nodes(REDIS_NODES, REDIS_HOST, REDIS_PORT)).node_for(EXPERIMENT_ID)
+redis_client = redis.Redis(host=REDIS_NODE[0], port=REDIS_NODE[1], db=0, decode_responses=True)
+# The packed belief snapshot is binary, so it is read without response decoding.
+raw_redis_client = redis.Redis(host=REDIS_NODE[0], port=REDIS_NODE[1], db=0)
+
+def density_traces(names, distributions, positions=None):
+    """
+    Builds Plotly traces for one plot from frozen scipy distributions: one
+    violin-shaped density outline per arm (computed analytically, no sampling)
+    plus a single box trace carrying every arm's precomputed quantiles.
+    `positions` are the arms' x-axis indices, by default 0, 1, 2, ...
+    """
+    traces = []
+    positions = list(range(len(names))) if positions is None else list(positions)
+    quantiles = np.array([dist.ppf(QUANTILES) for dist in distributions]).reshape(-1, len(QUANTILES))
+    for x, name, dist, q in zip(positions, names, distributions, quantiles):
+        low = max(dist.ppf(0.001), PLOT_Y_AXIS_RANGE[0])
+        high = min(dist.ppf(0.999), PLOT_Y_AXIS_RANGE[1])
+        grid = np.linspace(low, high, DENSITY_POINTS) if low < high else np.array([q[2]])
+        pdf = dist.pdf(grid)
+        width = VIOLIN_HALF_WIDTH * pdf / pdf.max() if pdf.max() > 0 else np.zeros_like(pdf)
+        traces.append({
+            'type': 'scatter', 'mode': 'lines', 'fill': 'toself', 'name': name, 'hoverinfo': 'name',
+            'x': np.round(np.concatenate([x + width, x - width[::-1]]), 3).tolist(),
+            'y': np.round(np.concatenate([grid, grid[::-1]]), 3).tolist(),
+        })
+    traces.append({
+        'type': 'box', 'name': 'Quantiles (5/25/50/75/95%)', 'showlegend': False,
+        'x': positions, 'lowerfence': np.round(quantiles[:, 0], 3).tolist(),
+        'q1': np.round(quantiles[:, 1], 3).tolist(), 'median': np.round(quantiles[:, 2], 3).tolist(),
+        'q3': np.round(quantiles[:, 3], 3).tolist(), 'upperfence': np.round(quantiles[:, 4], 3).tolist(),
+        'width': 0.1, 'fillcolor': 'rgba(0,0,0,0.15)', 'line': {'color': '#343a40', 'width': 1},
+    })
+    return traces
+
+def get_ground_truth_plot_data(configs):
+    """Density summaries of the true reward distributions returned by the API."""
+    arm_ids = sorted(configs)
+    distributions = [stats.norm(loc=configs[a]['mean'], scale=configs[a]['std_dev']) for a in arm_ids]
+    return density_traces([f'Arm {a}' for a in arm_ids], distributions)
+
+def read_beliefs(arm_ids):
+    """
+    Yields (arm_id, {mu, nu, alpha, beta}) for every arm that has beliefs, in
+    either storage layout, as of the current epoch (see belief_store.py).
+    """
+    if BELIEF_STORAGE == "packed":
+        pipe = raw_redis_client.pipeline(transaction=False)
+        pipe.get(KEYS.packed_arms)
+        pipe.get(KEYS.packed_beliefs)
+        pipe.get(KEYS.epoch)
+        layout, raw, epoch = pipe.execute()
+        if layout is None: return
+        packed = PackedBeliefs(arm_ids)
+        packed.set_layout(layout)
+        for arm_id, row in zip(arm_ids, packed.decode(raw, int(epoch or 0))):
+            if not np.isnan(row).any():
+                yield arm_id, dict(zip(BELIEF_FIELDS, map(float, row)))
+        return
+
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.get(KEYS.epoch)
+    for arm_id in arm_ids:
+        pipe.hgetall(KEYS.arm(arm_id))
+    epoch, *raw_beliefs = pipe.execute()
+    for arm_id, params_raw in zip(arm_ids, raw_beliefs):
+        if params_raw:
+            yield arm_id, hash_belief(params_raw, int(epoch or 0))
+
+def read_posteriors(arm_ids):
+    """(K, 4) array of read_beliefs ordered like `arm_ids`, NaN rows for arms without beliefs."""
+    posteriors = np.full((len(arm_ids), len(BELIEF_FIELDS)), np.nan)
+    row = {arm_id: i for i, arm_id in enumerate(arm_ids)}
+    for arm_id, params in read_beliefs(arm_ids):
+        posteriors[row[arm_id]] = [params[field] for field in BELIEF_FIELDS]
+    return posteriors
+
+def get_agent_beliefs_plot_data(arm_ids):
+    """
+    Density summaries of the agents' beliefs about each arm's mean. Under a
+    Normal-Gamma posterior that marginal is a Student-t with 2*alpha degrees of
+    freedom, location mu and scale sqrt(beta / (alpha * nu)). Arms without
+    beliefs are left out but keep their place on the x axis of `arm_ids`.
+    """
+    position = {arm_id: i for i, arm_id in enumerate(arm_ids)}
+    names, distributions, positions = [], [], []
+    for arm_id, params in read_beliefs(arm_ids):
+        scale = np.sqrt(params['beta'] / (params['alpha'] * params['nu']))
+        distributions.append(stats.t(df=2 * params['alpha'], loc=params['mu'], scale=scale))
+        names.append(f'Arm {arm_id}')
+        positions.append(position[arm_id])
+    return density_traces(names, distributions, positions)
+
+def xaxis(arm_ids):
+    return {'title': 'Slot Machine Arm', 'tickvals': list(range(len(arm_ids))),
+            'ticktext': [f'Arm {a}' for a in arm_ids], 'range': [-0.6, len(arm_ids) - 0.4]}
+
+def get_scenario_plot(timeline):
+    """
+    The drift scenario's ground truth over its clock (GET /scenario/timeline):
+    one mean line per plotted arm, dotted lines at the change points and a
+    solid one at the current clock value. None without an active scenario.
+    """
+    if not timeline or not timeline['active']:
+        return None
+    data = [
+        {'type': 'scatter', 'mode': 'lines', 'name': f'Arm {arm_id}', 'x': timeline['t'], 'y': np.round(means, 3).tolist()}
+        for arm_id, means in zip(timeline['arm_ids'], timeline['means'])
+    ]
+    def vline(x, dash):
+        return {'type': 'line', 'xref': 'x', 'yref': 'paper', 'x0': x, 'x1': x, 'y0': 0, 'y1': 1,
+                'line': {'color': '#343a40', 'width': 1, 'dash': dash}}
+    shapes = [vline(point['t'], 'dot') for point in timeline['change_points']] + [vline(timeline['now'], 'solid')]
+    layout = {
+        'title': '<b>Ground Truth Over Time</b> (drift scenario, solid line = now)',
+        'xaxis': {'title': 'Pulls served' if timeline['clock'] == 'pulls' else 'Seconds'},
+        'yaxis': {'title': 'True mean', 'zeroline': True, 'range': PLOT_Y_AXIS_RANGE},
+        'shapes': shapes,
+    }
+    return {'data': data, 'layout': layout}
+
+def build_plot_payload(configs, timeline=None):
+    """Returns all plot data as a single JSON string."""
+    arm_ids = sorted(configs)
+    ground_truth_data = get_ground_truth_plot_data(configs)
+    agent_beliefs_data = get_agent_beliefs_plot_data(arm_ids)
+
+    # We still define the layout here to keep the frontend simple
+    ground_truth_layout = {
+        'title': '<b>Ground Truth Reward Distributions</b>',
+        'yaxis': {'title': 'Reward Value', 'zeroline': True, 'range': PLOT_Y_AXIS_RANGE},
+        'xaxis': xaxis(arm_ids),
+    }
+
+    agent_beliefs_layout = {
+        'title': '<b>Agent\'s Learned Beliefs</b> (Posterior of the mean)',
+        'yaxis': {'title': 'Expected Reward', 'zeroline': True, 'range': PLOT_Y_AXIS_RANGE},
+        'xaxis': xaxis(arm_ids),
+    }
+
+    return json.dumps({
+        'ground_truth': {'data': ground_truth_data, 'layout': ground_truth_layout},
+        'agent_beliefs': {'data': agent_beliefs_data, 'layout': agent_beliefs_layout},
+        'scenario': get_scenario_plot(timeline),
+    }, separators=(',', ':'))
+
+def fetch_plotted_arm_configs():
+    """{arm_id: {mean, std_dev}} of the MAX_PLOTTED_ARMS best arms, from the API's compact GET /arms."""
+    response = requests.get(f"{API_URL}/arms", params={'top': MAX_PLOTTED_ARMS}, timeout=5)
+    response.raise_for_status()
+    page = response.json()
+    return {
+        arm_id: {'mean': mean, 'std_dev': std_dev}
+        for arm_id, mean, std_dev in zip(page['arm_ids'], page['means'], page['std_devs'])
+    }
+
+def fetch_scenario_timeline(arm_ids):
+    """Ground-truth timeline of `arm_ids` from the API's drift scenario engine, or None if unavailable."""
     try:
-        response = requests.get(f"{API_URL}/get_arm_configs")
+        response = requests.get(
+            f"{API_URL}/scenario/timeline", params={'arms': ','.join(arm_ids), 'points': TIMELINE_POINTS}, timeout=5,
+        )
         response.raise_for_status()
-        arm_ids = sorted(response.json().keys())
-
-        for arm_id in arm_ids:
-            params_raw = redis_client.hgetall(f"arm:{arm_id}")
-            if not params_raw: continue
-                
-            params = {k: float(v) for k, v in params_raw.items()}
-            
-            tau = np.random.gamma(shape=params['alpha'], scale=1.0/params['beta'], size=NUM_SAMPLES_FOR_PLOT)
-            std_devs = 1.0 / np.sqrt(params['nu'] * tau)
-            mus = np.random.normal(loc=params['mu'], scale=std_devs)
-            data_traces.append({'y': list(mus), 'type': 'violin', 'name': f'Arm {arm_id}'})
-        return data_traces
-    except Exception as e:
-        print(f"Error getting agent beliefs data from Redis: {e}")
-        return data_traces
+    except requests.RequestException as e:
+        print(f"Could not fetch the scenario timeline: {e}")
+        return None
+    return response.json()
+
+class PlotCache:
+    """
+    Holds the latest plot payload. A single background thread rebuilds it at most
+    once per REFRESH_INTERVAL_SECONDS, and only when the beliefs version or the
+    ground-truth configs changed, so the cost does not depend on how many
+    dashboards are open. Readers block on `wait_for_update` for SSE pushes.
+    """
+
+    def __init__(self):
+        self.payload = None
+        self.sequence = 0 # Incremented every time the payload changes
+        self._version = None
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def start(self):
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def refresh(self):
+        configs = fetch_plotted_arm_configs()
+        timeline = fetch_scenario_timeline(sorted(configs))
+        version = (redis_client.get(KEYS.version), json.dumps(configs, sort_keys=True), timeline and timeline['now'])
+        if version == self._version:
+            return
+        with RENDER_SECONDS.time():
+            payload = build_plot_payload(configs, timeline)
+        with self._condition:
+            self.payload = payload
+            self._version = version
+            self.sequence += 1
+            self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing plot data: {e}")
+            time.sleep(REFRESH_INTERVAL_SECONDS)
+
+    def wait_for_update(self, last_sequence, timeout):
+        """Returns (payload, sequence) once the sequence differs from `last_sequence`, or after `timeout`."""
+        with self._condition:
+            self._condition.wait_for(lambda: self.sequence != last_sequence, timeout=timeout)
+            return self.payload, self.sequence
+
+plot_cache = PlotCache()
+
+class HistoryRecorder:
+    """Background thread sampling the tracked arms' posteriors into a BeliefHistory."""
+
+    def __init__(self):
+        self.history = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while self.history is None:
+            try:
+                response = requests.get(f"{API_URL}/arms", params={'top': HISTORY_MAX_ARMS}, timeout=5)
+                response.raise_for_status()
+                self.history = BeliefHistory(sorted(response.json()['arm_ids']))
+                print(f"INFO: Recording belief history of {len(self.history.arm_ids)} arms ({self.history.nbytes / 1e6:.1f} MB).")
+            except Exception as e:
+                print(f"Error starting belief history: {e}")
+                time.sleep(5)
+        while True:
+            # Sleep to the next multiple of the interval, so samples fall into distinct slots.
+            time.sleep(HISTORY_SAMPLE_SECONDS - time.time() % HISTORY_SAMPLE_SECONDS)
+            try:
+                self.history.record(time.time(), read_posteriors(self.history.arm_ids))
+            except Exception as e:
+                print(f"Error recording belief history: {e}")
+
+history_recorder = HistoryRecorder()
 
 @app.route('/')
 def dashboard():
     """Renders the main dashboard HTML shell."""
     # This route now only serves the static page.
-    # The data will be fetched by JavaScript.
+    # The data will be pushed to it over /stream.
     return render_template('index.html')
 
-# NEW: Data-only endpoint for JavaScript to call
+# Data-only endpoint, kept for clients that poll
 @app.route('/data')
 def get_plot_data():
-    """Returns all plot data as a single JSON object."""
-    ground_truth_data = get_ground_truth_plot_data()
-    agent_beliefs_data = get_agent_beliefs_plot_data()
-    
-    # We still define the layout here to keep the frontend simple
-    ground_truth_layout = {
-        'title': '<b>Ground Truth Reward Distributions</b>',
-        'yaxis': {'title': 'Reward Value', 'zeroline': True, 'range': PLOT_Y_AXIS_RANGE},
-        'xaxis': {'title': 'Slot Machine Arm'}
-    }
-    
-    agent_beliefs_layout = {
-        'title': '<b>Agent\'s Learned Beliefs</b> (Sampled)',
-        'yaxis': {'title': 'Expected Reward (Sampled)', 'zeroline': True, 'range': PLOT_Y_AXIS_RANGE},
-        'xaxis': {'title': 'Slot Machine Arm'}
-    }
-    
-    return jsonify({
-        'ground_truth': {'data': ground_truth_data, 'layout': ground_truth_layout},
-        'agent_beliefs': {'data': agent_beliefs_data, 'layout': agent_beliefs_layout}
-    })
+    """Returns the cached plot payload, waiting briefly for the first one."""
+    with DATA_REQUEST_SECONDS.time():
+        plot_cache.start()
+        payload, _ = plot_cache.wait_for_update(0, timeout=5)
+        if payload is None:
+            return Response('{"error": "Plot data not available yet."}', status=503, mimetype='application/json')
+        return Response(payload, mimetype='application/json')
+
+def history_payload(history, start, end, points):
+    """JSON body of GET /history for a BeliefHistory."""
+    tier, times, values = history.query(start, end, points)
+    fields = {name: values[:, :, i].T for i, name in enumerate(HISTORY_FIELDS)}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scale = np.sqrt(fields['beta'] / (fields['alpha'] * fields['nu']))
+
+    def rows(array):
+        # NaN (no beliefs yet) is not valid JSON: send null.
+        rounded = np.round(array.astype(np.float64), 4).astype(object)
+        rounded[np.isnan(array)] = None
+        return rounded.tolist()
+
+    return json.dumps({
+        'tier': tier, 'arm_ids': history.arm_ids, 't': np.round(times, 3).tolist(),
+        'mu': rows(fields['mu']), 'mu_lo': rows(fields['mu_lo']), 'mu_hi': rows(fields['mu_hi']),
+        'scale': rows(scale), 'nu': rows(fields['nu']),
+    }, separators=(',', ':'))
+
+@app.route('/history')
+def get_history():
+    """
+    Belief history of the tracked arms between the unix times `start` (default:
+    `seconds` before now, 3600 by default) and `end` (default: now), from the
+    finest tier that reaches back to `start`, merged down to at most `points`
+    (default 500) time points:
+    {"tier", "arm_ids", "t", "mu", "mu_lo", "mu_hi", "scale", "nu"}, every field
+    but "t" one list per arm. "scale" is the Student-t scale of the mean's posterior.
+    """
+    history_recorder.start()
+    history = history_recorder.history
+    if history is None:
+        return Response('{"error": "Belief history not available yet."}', status=503, mimetype='application/json')
+    try:
+        end = float(request.args.get('end', time.time()))
+        start = float(request.args.get('start', end - float(request.args.get('seconds', 3600))))
+        points = min(int(request.args.get('points', 500)), HISTORY_MAX_POINTS)
+    except ValueError:
+        return Response('{"error": "start, end, seconds and points must be numbers."}', status=400, mimetype='application/json')
+
+    return Response(history_payload(history, start, end, max(points, 1)), mimetype='application/json')
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint."""
+    return Response(generate_latest(), content_type=CONTENT_TYPE_LATEST)
+
+@app.route('/stream')
+def stream_plot_data():
+    """Server-Sent Events: pushes the payload whenever it changes."""
+    plot_cache.start()
+
+    def events():
+        last_sequence = 0
+        while True:
+            payload, sequence = plot_cache.wait_for_update(last_sequence, timeout=SSE_KEEPALIVE_SECONDS)
+            if sequence == last_sequence:
+                yield ": keep-alive\n\n"
+                continue
+            last_sequence = sequence
+            yield f"data: {payload}\n\n"
+
+    return Response(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
+    plot_cache.start()
+    history_recorder.start()
+    app.run(host='0.0.0.0', port=5000, threaded=True)
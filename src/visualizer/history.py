@@ -0,0 +1,155 @@
+# src/visualizer/history.py
+#
+# Belief history for the dashboard: periodic snapshots of every tracked arm's
+# posterior, kept in fixed-size ring buffers at several resolutions.
+#
+# Each tier is one preallocated array of `capacity` slots; the default tiers
+# keep 1 hour at 1 s, 1 day at 1 min and 30 days at 1 h. A slot holds, per arm:
+#   mu, mu_lo, mu_hi   mean / min / max of the posterior mean over the slot
+#   nu, alpha, beta    the last posterior parameters of the slot
+# as float32, so memory is fixed at 24 bytes per arm per slot, whatever the
+# run length. The finest tier takes raw samples; every coarser tier is fed by
+# the slots the tier below it completes, so a sample is aggregated once per tier.
+# A range query reads the finest tier that reaches back far enough and merges
+# its slots the same way down to the requested number of points.
+
+import threading
+import warnings
+
+import numpy as np
+
+HISTORY_FIELDS = ("mu", "mu_lo", "mu_hi", "nu", "alpha", "beta")
+# (name, seconds per slot, slots)
+DEFAULT_TIERS = (("1s", 1, 3600), ("1m", 60, 1440), ("1h", 3600, 720))
+
+
+class RingBuffer:
+    """`capacity` timestamped (num_arms, len(HISTORY_FIELDS)) slots; the oldest is overwritten first."""
+
+    def __init__(self, capacity: int, num_arms: int):
+        self.capacity = capacity
+        self.times = np.full(capacity, np.nan)
+        self.values = np.full((capacity, num_arms, len(HISTORY_FIELDS)), np.nan, dtype=np.float32)
+        self.head = 0 # Next slot to write
+        self.size = 0
+
+    def append(self, t: float, values: np.ndarray):
+        self.times[self.head] = t
+        self.values[self.head] = values
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def oldest(self) -> float:
+        return float(self.times[(self.head - self.size) % self.capacity]) if self.size else np.inf
+
+    def query(self, start: float, end: float) -> tuple[np.ndarray, np.ndarray]:
+        """(times, values) of the slots with start <= t <= end, oldest first."""
+        order = (self.head - self.size + np.arange(self.size)) % self.capacity
+        times = self.times[order]
+        lo, hi = np.searchsorted(times, start, side="left"), np.searchsorted(times, end, side="right")
+        return times[lo:hi], self.values[order[lo:hi]]
+
+
+class Tier:
+    """One resolution: aggregates incoming slots into `seconds`-long slots of its ring buffer."""
+
+    def __init__(self, name: str, seconds: float, capacity: int, num_arms: int):
+        self.name = name
+        self.seconds = seconds
+        self.buffer = RingBuffer(capacity, num_arms)
+        self._bucket = None # Index of the slot being aggregated
+        self._mu_sum = np.zeros(num_arms)
+        self._count = np.zeros(num_arms)
+        self._pending = np.full((num_arms, len(HISTORY_FIELDS)), np.nan)
+
+    def add(self, t: float, values: np.ndarray):
+        """
+        Adds one finer slot (given by its start time) or raw sample taken at
+        `t`. Returns the slot it completed, as (start time, values), when `t`
+        starts a new one; otherwise None.
+        """
+        bucket = int(t // self.seconds)
+        completed = None
+        if self._bucket is not None and bucket != self._bucket:
+            completed = self._flush()
+        self._bucket = bucket
+        mu, known = values[:, 0], ~np.isnan(values[:, 0])
+        self._mu_sum[known] += mu[known]
+        self._count[known] += 1
+        pending = self._pending
+        pending[known, 1] = np.fmin(pending[known, 1], values[known, 1])
+        pending[known, 2] = np.fmax(pending[known, 2], values[known, 2])
+        pending[known, 3:] = values[known, 3:]
+        return completed
+
+    def _flush(self):
+        start = self._bucket * self.seconds
+        pending = self._pending
+        with np.errstate(invalid="ignore", divide="ignore"):
+            pending[:, 0] = self._mu_sum / self._count # NaN for arms without beliefs in the slot
+        # Slots are stamped with their end, but passed on by their start, so the
+        # coarser tier counts a slot in the interval it covers, not the next one.
+        self.buffer.append(start + self.seconds, pending)
+        slot = (start, pending.copy())
+        self._mu_sum[:] = 0.0
+        self._count[:] = 0.0
+        pending[:] = np.nan
+        return slot
+
+
+class BeliefHistory:
+    """
+    Multi-resolution history of the (K, 4) (mu, nu, alpha, beta) posteriors of
+    `arm_ids`, recorded with `record`. Thread-safe.
+    """
+
+    def __init__(self, arm_ids: list[str], tiers=DEFAULT_TIERS):
+        self.arm_ids = list(arm_ids)
+        self.tiers = [Tier(name, seconds, capacity, len(arm_ids)) for name, seconds, capacity in tiers]
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(tier.buffer.values.nbytes + tier.buffer.times.nbytes for tier in self.tiers)
+
+    def record(self, t: float, posteriors: np.ndarray):
+        """Adds one snapshot taken at unix time `t`; NaN rows are arms without beliefs."""
+        posteriors = np.asarray(posteriors, dtype=np.float64)
+        values = np.column_stack([posteriors[:, 0], posteriors[:, 0], posteriors[:, 0], posteriors[:, 1:]])
+        with self._lock:
+            sample = (t, values)
+            for tier in self.tiers:
+                sample = tier.add(*sample)
+                if sample is None:
+                    break
+
+    def query(self, start: float, end: float, max_points: int):
+        """
+        Slots in [start, end] of the finest tier that reaches back to `start` (or
+        that reaches back furthest), merged k at a time to at most `max_points`:
+        (tier name, times, values).
+        """
+        with self._lock:
+            covering = [tier for tier in self.tiers if tier.buffer.oldest() <= start]
+            tier = covering[0] if covering else min(self.tiers, key=lambda tier: tier.buffer.oldest())
+            times, values = tier.buffer.query(start, end)
+        return tier.name, *decimate(times, values, max_points)
+
+
+def decimate(times: np.ndarray, values: np.ndarray, max_points: int):
+    """Merges consecutive slots k at a time, as a coarser tier would, so at most `max_points` remain."""
+    k = -(-len(times) // max_points)
+    if k <= 1:
+        return times, values
+    # Align groups on the newest slot; the oldest group may be partial.
+    pad = (-len(times)) % k
+    times = np.concatenate([np.full(pad, np.nan), times])
+    values = np.concatenate([np.full((pad,) + values.shape[1:], np.nan, dtype=values.dtype), values])
+    groups = values.reshape(-1, k, *values.shape[1:])
+    merged = groups[:, -1].copy() # nu, alpha, beta: the last slot of each group
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning) # All-NaN groups: arms without beliefs yet
+        merged[..., 0] = np.nanmean(groups[..., 0], axis=1)
+        merged[..., 1] = np.nanmin(groups[..., 1], axis=1)
+        merged[..., 2] = np.nanmax(groups[..., 2], axis=1)
+    return times.reshape(-1, k)[:, -1], merged
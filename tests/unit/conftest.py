@@ -0,0 +1,45 @@
+# tests/unit/conftest.py
+#
+# Every service runs from its own directory with flat imports, and the shared
+# modules of src/rl_agent are copied next to the others' code in their images.
+# The unit tests import the modules the same way, from these directories.
+# Modules whose names clash between services (config, main) are loaded with
+# `load_service_module` instead.
+
+import importlib.util
+import os
+import sys
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(__file__), "..", "..", "src")
+for service in ("rl_agent", "slot_machine_api", "visualizer", "orchestrator"):
+    path = os.path.abspath(os.path.join(SRC, service))
+    if path not in sys.path:
+        sys.path.append(path)
+
+
+def load_service_module(service: str, name: str):
+    """
+    Imports src/<service>/<name>.py as "<service>_<name>", resolving its flat
+    `config` import to the service's own config.py for the duration.
+    """
+    directory = os.path.abspath(os.path.join(SRC, service))
+    saved = sys.modules.pop("config", None)
+    sys.path.insert(0, directory)
+    try:
+        spec = importlib.util.spec_from_file_location(f"{service}_{name}", os.path.join(directory, f"{name}.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.remove(directory)
+        sys.modules.pop("config", None)
+        if saved is not None:
+            sys.modules["config"] = saved
+    return module
+
+
+@pytest.fixture(scope="session")
+def api():
+    """The slot machine API module (its Prometheus metrics can only be registered once per process)."""
+    return load_service_module("slot_machine_api", "main")
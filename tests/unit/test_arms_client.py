@@ -0,0 +1,43 @@
+# tests/unit/test_arms_client.py
+
+import pytest
+
+import arms_client
+
+ARM_IDS = [str(i) for i in range(25)]
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self.body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.body
+
+
+@pytest.fixture
+def requests_seen(monkeypatch):
+    """Serves GET /arms pages from ARM_IDS and records the (offset, limit) of every request."""
+    seen = []
+
+    def get(url, params, timeout):
+        assert url == "http://api/arms"
+        offset, limit = params['offset'], params['limit']
+        seen.append((offset, limit))
+        return FakeResponse({"total": len(ARM_IDS), "offset": offset, "arm_ids": ARM_IDS[offset:offset + limit]})
+
+    monkeypatch.setattr(arms_client.requests, "get", get)
+    return seen
+
+
+def test_fetch_arm_ids_pages_through_every_arm(requests_seen):
+    assert arms_client.fetch_arm_ids("http://api", page_size=10) == ARM_IDS
+    assert requests_seen == [(0, 10), (10, 10), (20, 10)]
+
+
+def test_fetch_arm_ids_stops_after_a_single_full_page(requests_seen):
+    assert arms_client.fetch_arm_ids("http://api", page_size=25) == ARM_IDS
+    assert requests_seen == [(0, 25)]
@@ -0,0 +1,104 @@
+# tests/unit/test_async_runtime.py
+#
+# AsyncThompsonSamplingAgent against fakeredis's asyncio client, and the
+# error handling of the logical agent loop.
+
+import asyncio
+
+import numpy as np
+import pytest
+import redis
+
+fakeredis = pytest.importorskip("fakeredis")
+
+import async_runtime  # noqa: E402
+from agent import normal_gamma_update, sufficient_statistics  # noqa: E402
+from belief_store import BELIEF_PRIOR  # noqa: E402
+
+ARM_IDS = ["0", "1", "2"]
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def make_agent(client):
+    agent = async_runtime.AsyncThompsonSamplingAgent(ARM_IDS, client)
+    await agent.initialize_state_in_redis()
+    return agent
+
+
+def test_update_belief_applies_the_conjugate_update_and_logs_the_reward():
+    async def scenario():
+        client = fakeredis.FakeAsyncRedis()
+        agent = await make_agent(client)
+        for reward in (1.0, 2.5, -0.5):
+            await agent.update_belief("2", reward)
+        return await agent._read_posteriors(), await client.xlen(agent.keys.reward_stream)
+
+    posteriors, logged = run(scenario())
+    expected = normal_gamma_update(np.array(BELIEF_PRIOR), *sufficient_statistics(np.array([1.0, 2.5, -0.5])))
+    np.testing.assert_allclose(posteriors, [BELIEF_PRIOR, BELIEF_PRIOR, expected], rtol=1e-10)
+    assert logged == 3
+
+
+def test_select_arm_picks_the_clear_best_arm():
+    async def scenario():
+        client = fakeredis.FakeAsyncRedis()
+        agent = await make_agent(client)
+        for arm_id, mu in zip(ARM_IDS, [0.0, 4.0, 1.0]):
+            await client.hset(agent.keys.arm(arm_id), mapping={"mu": mu, "nu": 1e6, "alpha": 1e6, "beta": 1e6, "epoch": 0})
+        return {await agent.select_arm() for _ in range(20)}
+
+    assert run(scenario()) == {"1"}
+
+
+def test_existing_beliefs_are_kept():
+    async def scenario():
+        client = fakeredis.FakeAsyncRedis()
+        agent = await make_agent(client)
+        await agent.update_belief("0", 3.0)
+        await make_agent(client) # A second process starting up
+        return await agent._read_posteriors()
+
+    assert run(scenario())[0, 1] == BELIEF_PRIOR[1] + 1
+
+
+class FlakyAgent:
+    """Raises a Redis error on the first decision; stops the loop on the second."""
+
+    def __init__(self, stop):
+        self.stop = stop
+        self.calls = 0
+
+    async def select_arm(self, mode):
+        self.calls += 1
+        if self.calls == 1:
+            raise redis.ConnectionError("Connection refused")
+        self.stop.set()
+        raise redis.ConnectionError("Still refused")
+
+
+class Mode:
+    mode = "LEARNING"
+
+
+def test_logical_agent_survives_redis_errors(monkeypatch):
+    monkeypatch.setattr(async_runtime, "ERROR_BACKOFF_SECONDS", 0)
+
+    async def scenario():
+        stop = asyncio.Event()
+        agent, stats = FlakyAgent(stop), async_runtime.RuntimeStats()
+        await async_runtime.run_logical_agent(agent, 1000.0, None, Mode(), stats, stop)
+        return agent.calls, stats.errors
+
+    assert run(scenario()) == (2, 2)
+
+
+def test_unsupported_settings_are_reported(monkeypatch):
+    assert async_runtime.unsupported_settings() == []
+    monkeypatch.setattr(async_runtime, "BELIEF_UPDATE_MODE", "delta")
+    monkeypatch.setattr(async_runtime, "ARM_SELECTION", "pruned")
+    monkeypatch.setattr(async_runtime, "AGENT_BATCH_SIZE", 8)
+    problems = async_runtime.unsupported_settings()
+    assert [problem.split("=")[0] for problem in problems] == ["BELIEF_UPDATE_MODE", "ARM_SELECTION", "AGENT_BATCH_SIZE"]
@@ -0,0 +1,111 @@
+# tests/unit/test_belief_epochs.py
+#
+# Epoch resets (belief_store.py) and the stale-update drop of the agent's
+# update paths, against fakeredis (its Lua support, through lupa, runs the
+# update scripts). The packed layout's script needs Lua's struct library,
+# which fakeredis does not provide, so only its decoding is covered here.
+
+import numpy as np
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from agent import ThompsonSamplingAgent  # noqa: E402
+from belief_store import BELIEF_PRIOR, PackedBeliefs, apply_epoch, hash_belief, pack_beliefs, reset_beliefs  # noqa: E402
+
+ARM_IDS = ["0", "1", "2"]
+PRIOR = dict(zip(("mu", "nu", "alpha", "beta"), BELIEF_PRIOR))
+UPDATE_MODES = ["script", "watch", "delta"]
+
+
+def test_apply_epoch_reads_stale_rows_as_the_prior():
+    posteriors = np.array([[1.0, 2.0, 3.0, 4.0], [5.0, 6.0, 7.0, 8.0], [np.nan] * 4, [9.0, 9.0, 9.0, 9.0]])
+    result = apply_epoch(posteriors, np.array([2.0, 1.0, 0.0, np.nan]), 2)
+    np.testing.assert_array_equal(result, [posteriors[0], BELIEF_PRIOR, [np.nan] * 4, BELIEF_PRIOR])
+    assert posteriors[1, 0] == 5.0 # The input is not modified
+
+
+def test_apply_epoch_returns_current_rows_as_they_are():
+    posteriors = np.ones((2, 4))
+    assert apply_epoch(posteriors, np.array([3.0, 4.0]), 3) is posteriors
+
+
+def test_hash_belief():
+    fields = {"mu": "1.5", "nu": "2", "alpha": "3", "beta": "4", "epoch": "2"}
+    assert hash_belief(fields, 2) == {"mu": 1.5, "nu": 2.0, "alpha": 3.0, "beta": 4.0}
+    assert hash_belief(fields, 3) == PRIOR
+    assert hash_belief({k: v for k, v in fields.items() if k != "epoch"}, 1) == PRIOR
+
+
+def test_packed_decode_applies_the_epoch():
+    packed = PackedBeliefs(["b", "a"])
+    packed.set_layout('["a", "b"]')
+    raw = pack_beliefs(np.array([[1.0, 2.0, 3.0, 4.0], [5.0, 6.0, 7.0, 8.0]]), epoch=1)
+    np.testing.assert_array_equal(packed.decode(raw, 1), [[5.0, 6.0, 7.0, 8.0], [1.0, 2.0, 3.0, 4.0]])
+    np.testing.assert_array_equal(packed.decode(raw, 2), [BELIEF_PRIOR, BELIEF_PRIOR])
+
+
+def make_agent(client, update_mode):
+    return ThompsonSamplingAgent(
+        arm_ids=ARM_IDS, redis_client=client, update_mode=update_mode,
+        flush_interval=1e9, # Delta mode flushes only when the test says so
+    )
+
+
+def update(agent, arm_id, reward):
+    agent.update_belief(arm_id, reward)
+    if agent.update_mode == "delta":
+        agent.flush()
+
+
+@pytest.mark.parametrize("update_mode", UPDATE_MODES)
+def test_reset_reads_every_arm_as_the_prior(update_mode):
+    client = fakeredis.FakeRedis()
+    agent = make_agent(client, update_mode)
+    for arm_id in ARM_IDS:
+        update(agent, arm_id, 3.0)
+    assert not np.allclose(agent._read_posteriors(), BELIEF_PRIOR)
+
+    assert reset_beliefs(client, agent.keys.version, agent.keys.epoch) == 1
+    np.testing.assert_array_equal(agent._read_posteriors(), np.tile(BELIEF_PRIOR, (len(ARM_IDS), 1)))
+    assert agent.epoch == 1
+
+
+@pytest.mark.parametrize("update_mode", UPDATE_MODES)
+def test_updates_pulled_before_a_reset_are_dropped(update_mode):
+    client = fakeredis.FakeRedis()
+    agent = make_agent(client, update_mode)
+    other = make_agent(client, update_mode)
+    agent._read_posteriors()
+    # Another process resets the beliefs after `agent` pulled its reward.
+    reset_beliefs(client, agent.keys.version, agent.keys.epoch)
+    update(agent, "1", 5.0)
+    assert agent.stats["stale_rewards"] == 1
+    assert agent.epoch == 1
+    np.testing.assert_array_equal(other._read_posteriors()[1], BELIEF_PRIOR)
+
+    # Once the agent has seen the new epoch, its updates apply again, from the prior.
+    update(agent, "1", 5.0)
+    assert agent.stats["stale_rewards"] == 1
+    assert other._read_posteriors()[1, 1] == BELIEF_PRIOR[1] + 1
+
+
+def test_delta_mode_drops_pending_rewards_after_a_reset_it_has_read():
+    client = fakeredis.FakeRedis()
+    agent = make_agent(client, "delta")
+    agent.update_beliefs({"0": np.array([4.0, 4.0])})
+    assert agent._read_posteriors()[0, 1] == BELIEF_PRIOR[1] + 2 # Unflushed rewards count locally
+    reset_beliefs(client, agent.keys.version, agent.keys.epoch)
+    np.testing.assert_array_equal(agent._read_posteriors()[0], BELIEF_PRIOR)
+    assert agent.stats["stale_rewards"] == 2
+    agent.flush()
+    np.testing.assert_array_equal(make_agent(client, "delta")._read_posteriors()[0], BELIEF_PRIOR)
+
+
+def test_watch_mode_reinitializes_lost_beliefs_without_logging_the_reward():
+    client = fakeredis.FakeRedis()
+    agent = make_agent(client, "watch")
+    client.flushdb() # Redis lost its state
+    agent.update_belief("1", 5.0)
+    assert client.xlen(agent.keys.reward_stream) == 0
+    np.testing.assert_array_equal(agent._read_posteriors(), np.tile(BELIEF_PRIOR, (len(ARM_IDS), 1)))
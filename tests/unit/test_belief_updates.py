@@ -0,0 +1,123 @@
+# tests/unit/test_belief_updates.py
+#
+# The server-side conjugate update (UPDATE_BELIEF_LUA) against its NumPy twin
+# normal_gamma_update, and the initial write of the hash layout
+# (INIT_BELIEFS_LUA), run by fakeredis's Lua support.
+
+import numpy as np
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from agent import (  # noqa: E402
+    INIT_BELIEFS_LUA, UPDATE_BELIEF_LUA, ThompsonSamplingAgent, init_beliefs_call, normal_gamma_update, sufficient_statistics,
+)
+from belief_store import BELIEF_FIELDS, BELIEF_PRIOR, ExperimentKeys  # noqa: E402
+from checkpoint import load_snapshot, write_snapshot  # noqa: E402
+
+KEYS = ExperimentKeys()
+
+
+def run_update(client, arm_key, n, mean, m2, channel="", epoch=0):
+    script = client.register_script(UPDATE_BELIEF_LUA)
+    return script(keys=[arm_key, KEYS.version, KEYS.epoch], args=[n, mean, m2, channel, epoch])
+
+
+def read_row(client, arm_key):
+    return np.array([float(client.hget(arm_key, field)) for field in BELIEF_FIELDS])
+
+
+@pytest.mark.parametrize("start", [BELIEF_PRIOR, [1.5, 4.0, 3.0, 2.5]])
+def test_script_matches_normal_gamma_update(start):
+    client = fakeredis.FakeRedis()
+    arm_key = KEYS.arm("0")
+    client.hset(arm_key, mapping={**dict(zip(BELIEF_FIELDS, start)), "epoch": 0})
+    rewards = np.random.default_rng(0).normal(2.0, 1.5, 40)
+    stats = sufficient_statistics(rewards)
+    assert run_update(client, arm_key, *stats) == [1, 0]
+    np.testing.assert_allclose(read_row(client, arm_key), normal_gamma_update(np.array(start), *stats), rtol=1e-12)
+    assert int(client.get(KEYS.version)) == 1
+
+
+def test_single_rewards_match_one_batch_update():
+    client = fakeredis.FakeRedis()
+    arm_key = KEYS.arm("0")
+    client.hset(arm_key, mapping={**dict(zip(BELIEF_FIELDS, BELIEF_PRIOR)), "epoch": 0})
+    rewards = np.random.default_rng(1).normal(-1.0, 0.5, 25)
+    for reward in rewards.tolist():
+        run_update(client, arm_key, 1, reward, 0.0)
+    expected = normal_gamma_update(np.array(BELIEF_PRIOR), *sufficient_statistics(rewards))
+    np.testing.assert_allclose(read_row(client, arm_key), expected, rtol=1e-10)
+    assert int(client.get(KEYS.version)) == len(rewards)
+
+
+def test_script_reports_a_missing_arm_without_writing_it():
+    client = fakeredis.FakeRedis()
+    assert run_update(client, KEYS.arm("7"), 1, 1.0, 0.0) == [0, 0]
+    assert not client.exists(KEYS.arm("7"))
+
+
+def test_script_publishes_the_new_parameters():
+    client = fakeredis.FakeRedis(decode_responses=True)
+    arm_key = KEYS.arm("3")
+    client.hset(arm_key, mapping={**dict(zip(BELIEF_FIELDS, BELIEF_PRIOR)), "epoch": 0})
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(KEYS.updates_channel)
+    run_update(client, arm_key, 1, 2.0, 0.0, channel=KEYS.updates_channel)
+    # The first call may only consume the subscription's confirmation.
+    message = pubsub.get_message(timeout=1.0) or pubsub.get_message(timeout=1.0)
+    key, *values = message["data"].split()
+    assert key == arm_key
+    np.testing.assert_allclose([float(v) for v in values], normal_gamma_update(np.array(BELIEF_PRIOR), 1, 2.0, 0.0))
+
+
+@pytest.mark.parametrize("update_mode", ["script", "watch"])
+def test_agent_update_paths_agree(update_mode):
+    client = fakeredis.FakeRedis()
+    agent = ThompsonSamplingAgent(arm_ids=["0", "1"], redis_client=client, update_mode=update_mode)
+    rewards = [0.5, 1.5, -0.25, 2.0]
+    for reward in rewards:
+        agent.update_belief("1", reward)
+    expected = normal_gamma_update(np.array(BELIEF_PRIOR), *sufficient_statistics(np.array(rewards)))
+    np.testing.assert_allclose(agent._read_posteriors(), [BELIEF_PRIOR, expected], rtol=1e-10)
+
+
+def write_checkpoint(tmp_path, rows, epoch):
+    path = str(tmp_path / "state.snap")
+    write_snapshot(path, {"beliefs": np.column_stack([rows, np.full(len(rows), epoch)])}, {"arm_ids": ["0", "1"]}, epoch=epoch)
+    return path
+
+
+def test_agent_restores_beliefs_and_epoch_from_a_checkpoint(tmp_path):
+    client = fakeredis.FakeRedis()
+    rows = np.array([[1.5, 4.0, 3.0, 2.5], [-0.5, 2.0, 1.5, 1.0]])
+    agent = ThompsonSamplingAgent(["0", "1"], client, checkpoint_path=write_checkpoint(tmp_path, rows, 3))
+    assert agent.epoch == 3 and int(client.get(KEYS.epoch)) == 3
+    for arm_id, row in zip(["0", "1"], rows):
+        np.testing.assert_array_equal(read_row(client, KEYS.arm(arm_id)), row)
+        assert float(client.hget(KEYS.arm(arm_id), "epoch")) == 3
+
+
+def test_init_script_leaves_existing_beliefs_alone(tmp_path):
+    client = fakeredis.FakeRedis()
+    client.set(KEYS.epoch, 5)
+    client.hset(KEYS.arm("0"), mapping={**dict(zip(BELIEF_FIELDS, [2.0, 9.0, 5.0, 4.0])), "epoch": 5})
+    snapshot = load_snapshot(write_checkpoint(tmp_path, np.ones((2, 4)), 3))
+    script = client.register_script(INIT_BELIEFS_LUA)
+    # An agent that found no beliefs and loaded the checkpoint before another one wrote them.
+    assert script(*init_beliefs_call(KEYS, ["0", "1"], snapshot)) == [0, 5]
+    np.testing.assert_array_equal(read_row(client, KEYS.arm("0")), [2.0, 9.0, 5.0, 4.0])
+    assert not client.exists(KEYS.arm("1"))
+
+
+def test_init_script_keeps_a_newer_epoch(tmp_path):
+    client = fakeredis.FakeRedis()
+    client.set(KEYS.epoch, 5)
+    snapshot = load_snapshot(write_checkpoint(tmp_path, np.ones((2, 4)), 3))
+    script = client.register_script(INIT_BELIEFS_LUA)
+    assert script(*init_beliefs_call(KEYS, ["0", "1"], snapshot)) == [1, 5]
+    # The restored rows predate the current epoch, so they read as the prior.
+    assert float(client.hget(KEYS.arm("1"), "epoch")) == 3
+    assert script(*init_beliefs_call(KEYS, ["2"])) == [1, 5]
+    np.testing.assert_array_equal(read_row(client, KEYS.arm("2")), BELIEF_PRIOR)
+    assert float(client.hget(KEYS.arm("2"), "epoch")) == 5
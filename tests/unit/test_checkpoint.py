@@ -0,0 +1,105 @@
+# tests/unit/test_checkpoint.py
+
+import os
+
+import numpy as np
+import pytest
+
+from belief_store import BELIEF_PRIOR
+from checkpoint import LOG_RECORD, BeliefLog, load_snapshot, log_path, read_log, write_snapshot
+from drift_detector import DriftMonitor
+
+ARM_IDS = ["a", "b", "c", "d"]
+
+
+def belief_rows(rng, epoch=2):
+    """(K, 5) packed rows: random posteriors, tagged with `epoch`."""
+    return np.column_stack([rng.normal(size=len(ARM_IDS)), rng.uniform(1, 50, (len(ARM_IDS), 3)), np.full(len(ARM_IDS), epoch)])
+
+
+def test_snapshot_round_trip(tmp_path):
+    rng = np.random.default_rng(0)
+    path = str(tmp_path / "state.snap")
+    rows = belief_rows(rng)
+    monitor = DriftMonitor(ARM_IDS, "adwin")
+    for _ in range(50):
+        monitor.update(ARM_IDS[rng.integers(4)], rng.normal(size=40))
+    detector = {f"detector.{name}": array for name, array in monitor.state().items()}
+    meta = {"arm_ids": ARM_IDS, "mode": "DRIFT_MONITORING"}
+    size = write_snapshot(path, {"beliefs": rows, **detector}, meta, epoch=2, created=123.0)
+
+    snapshot = load_snapshot(path)
+    assert size == os.path.getsize(path)
+    assert (snapshot.created, snapshot.epoch, snapshot.meta, snapshot.arm_ids) == (123.0, 2, meta, ARM_IDS)
+    np.testing.assert_array_equal(snapshot.arrays["beliefs"], rows)
+    np.testing.assert_array_equal(snapshot.posteriors_for(ARM_IDS), rows[:, :4])
+    restored = DriftMonitor(ARM_IDS, "adwin")
+    restored.load_state(snapshot.sections("detector."))
+    for name, array in monitor.state().items():
+        np.testing.assert_array_equal(restored.state()[name], array)
+    assert not os.path.exists(f"{path}.tmp")
+
+
+def test_posteriors_for_other_arms_and_stale_rows(tmp_path):
+    path = str(tmp_path / "state.snap")
+    rows = belief_rows(np.random.default_rng(1))
+    rows[1, 4] = 1 # Written before the snapshot's epoch
+    write_snapshot(path, {"beliefs": rows}, {"arm_ids": ARM_IDS}, epoch=2)
+    posteriors = load_snapshot(path).posteriors_for(["d", "b", "new"])
+    np.testing.assert_array_equal(posteriors, [rows[3, :4], BELIEF_PRIOR, BELIEF_PRIOR])
+
+
+def test_log_replay_restores_exact_posteriors(tmp_path):
+    rng = np.random.default_rng(2)
+    path = str(tmp_path / "state.snap")
+    rows = belief_rows(rng)
+    write_snapshot(path, {"beliefs": rows}, {"arm_ids": ARM_IDS}, epoch=2, created=100.0)
+    log = BeliefLog(log_path(path))
+    expected = rows.copy()
+    log.append(99.0, np.array([0]), belief_rows(rng)[:1]) # Older than the snapshot: ignored
+    for t in (101.0, 102.0, 103.0):
+        changed = rng.choice(len(ARM_IDS), 2, replace=False)
+        updates = belief_rows(rng)[changed]
+        assert log.append(t, changed, updates) == 2 * LOG_RECORD.itemsize
+        expected[changed] = updates
+
+    snapshot = load_snapshot(path)
+    assert snapshot.replayed == 6
+    np.testing.assert_array_equal(snapshot.arrays["beliefs"], expected)
+    np.testing.assert_array_equal(snapshot.posteriors_for(ARM_IDS), expected[:, :4])
+
+
+@pytest.mark.parametrize("tail", [1, LOG_RECORD.itemsize // 2, LOG_RECORD.itemsize - 1])
+def test_torn_log_tail_is_ignored(tmp_path, tail):
+    rng = np.random.default_rng(3)
+    path = str(tmp_path / "state.snap")
+    rows = belief_rows(rng)
+    write_snapshot(path, {"beliefs": rows}, {"arm_ids": ARM_IDS}, epoch=2, created=100.0)
+    log = BeliefLog(log_path(path))
+    complete = belief_rows(rng)[:1]
+    log.append(101.0, np.array([2]), complete)
+    log.append(102.0, np.array([3]), belief_rows(rng)[:1])
+    # A crash in the middle of the last append leaves part of its record.
+    with open(log.path, "r+b") as f:
+        f.truncate(LOG_RECORD.itemsize + tail)
+
+    assert len(read_log(log.path)) == 1
+    expected = rows.copy()
+    expected[2] = complete
+    np.testing.assert_array_equal(load_snapshot(path).posteriors_for(ARM_IDS), expected[:, :4])
+
+
+def test_new_snapshot_truncates_the_log(tmp_path):
+    path = str(tmp_path / "state.snap")
+    log = BeliefLog(log_path(path))
+    log.append(1.0, np.array([0]), np.ones((1, 5)))
+    log.truncate()
+    assert len(read_log(log.path)) == 0
+
+
+def test_missing_or_corrupt_snapshots_load_as_none(tmp_path):
+    assert load_snapshot("") is None
+    assert load_snapshot(str(tmp_path / "missing.snap")) is None
+    corrupt = tmp_path / "corrupt.snap"
+    corrupt.write_bytes(b"not a snapshot" * 10)
+    assert load_snapshot(str(corrupt)) is None
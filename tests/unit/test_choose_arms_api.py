@@ -0,0 +1,69 @@
+# tests/unit/test_choose_arms_api.py
+#
+# The batched POST /choose_arms endpoint and its three body encodings.
+
+import msgpack
+import numpy as np
+import pytest
+
+fastapi_testclient = pytest.importorskip("fastapi.testclient")
+
+
+@pytest.fixture
+def client(api):
+    api.load_scenario(None)
+    return fastapi_testclient.TestClient(api.app)
+
+
+PULLS = [[1, 3], [4, 2], [0, 0], [1, 1]]
+
+
+def test_json_returns_the_rewards_in_request_order(client, api):
+    response = client.post("/choose_arms", json={"pulls": PULLS})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["arm_ids"] == [1, 4, 0, 1] and body["counts"] == [3, 2, 0, 1]
+    rewards = np.array(body["rewards"])
+    assert len(rewards) == 6
+    # Arm 1 has mean 5 and std_dev 1, arm 4 mean -3 and std_dev 0.5: far apart.
+    assert np.all(rewards[[0, 1, 2, 5]] > 0) and np.all(rewards[[3, 4]] < 0)
+
+
+@pytest.mark.parametrize("format", ["raw", "msgpack"])
+def test_binary_formats_carry_float64_rewards(client, format):
+    response = client.post("/choose_arms", params={"format": format}, json={"pulls": PULLS})
+    assert response.status_code == 200
+    if format == "raw":
+        assert response.headers["content-type"] == "application/octet-stream"
+        rewards = np.frombuffer(response.content, dtype="<f8")
+    else:
+        assert response.headers["content-type"] == "application/msgpack"
+        body = msgpack.unpackb(response.content)
+        assert body["arm_ids"] == [1, 4, 0, 1] and body["counts"] == [3, 2, 0, 1]
+        rewards = np.frombuffer(body["rewards"], dtype="<f8")
+    assert len(rewards) == 6
+    assert np.all(rewards[[0, 1, 2, 5]] > 0) and np.all(rewards[[3, 4]] < 0)
+
+
+def test_batch_rewards_follow_the_arm_distribution(client):
+    response = client.post("/choose_arms", params={"format": "raw"}, json={"pulls": [[0, 20_000]]})
+    rewards = np.frombuffer(response.content, dtype="<f8")
+    assert rewards.mean() == pytest.approx(1.5, abs=0.02)
+    assert rewards.std() == pytest.approx(0.5, abs=0.02)
+
+
+@pytest.mark.parametrize("params, pulls, status", [
+    ({"format": "xml"}, [[1, 1]], 400),
+    ({}, [[1, -1]], 400),
+    ({}, [[1, 100_001]], 400),
+    ({}, [[99, 1]], 404),
+    ({}, [], 422),
+])
+def test_invalid_requests_are_rejected(client, params, pulls, status):
+    assert client.post("/choose_arms", params=params, json={"pulls": pulls}).status_code == status
+
+
+def test_choose_arm_serves_one_reward(client):
+    body = client.get("/choose_arm", params={"arm_id": 1}).json()
+    assert body["arm_id"] == 1 and body["reward"] > 0
+    assert client.get("/choose_arm", params={"arm_id": 99}).status_code == 404
@@ -0,0 +1,88 @@
+# tests/unit/test_delta_updates.py
+#
+# Sufficient statistics and the delta update mode: rewards merged locally and
+# flushed as one conjugate update per arm give the same beliefs as applying
+# them one at a time.
+
+import numpy as np
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from agent import (  # noqa: E402
+    ThompsonSamplingAgent, merge_sufficient_statistics, normal_gamma_update, sufficient_statistics,
+)
+from belief_store import BELIEF_PRIOR  # noqa: E402
+
+ARM_IDS = ["0", "1", "2"]
+
+
+def test_sufficient_statistics():
+    rewards = np.array([1.0, 2.0, 4.0, 9.0])
+    n, mean, m2 = sufficient_statistics(rewards)
+    assert (n, mean) == (4, 4.0)
+    assert m2 == pytest.approx(4 * rewards.var())
+
+
+def test_merged_statistics_equal_those_of_the_union():
+    rewards = np.random.default_rng(0).normal(3.0, 2.0, 100)
+    merged = merge_sufficient_statistics(sufficient_statistics(rewards[:37]), sufficient_statistics(rewards[37:]))
+    np.testing.assert_allclose(merged, sufficient_statistics(rewards), rtol=1e-12)
+    # An empty side leaves the other unchanged.
+    np.testing.assert_allclose(merge_sufficient_statistics((0, 0.0, 0.0), (3, 1.5, 2.0)), (3, 1.5, 2.0))
+
+
+def test_merge_works_elementwise():
+    a = (np.array([2.0, 0.0]), np.array([1.0, 0.0]), np.array([0.5, 0.0]))
+    b = (np.array([2.0, 1.0]), np.array([3.0, 7.0]), np.array([0.5, 0.0]))
+    n, mean, m2 = merge_sufficient_statistics(a, b)
+    np.testing.assert_allclose(n, [4.0, 1.0])
+    np.testing.assert_allclose(mean, [2.0, 7.0])
+    np.testing.assert_allclose(m2, [5.0, 0.0])
+
+
+def test_one_merged_update_equals_sequential_updates():
+    rewards = np.random.default_rng(1).normal(-0.5, 1.0, 50)
+    sequential = np.array(BELIEF_PRIOR)
+    for reward in rewards:
+        sequential = normal_gamma_update(sequential, 1, reward, 0.0)
+    np.testing.assert_allclose(normal_gamma_update(np.array(BELIEF_PRIOR), *sufficient_statistics(rewards)), sequential, rtol=1e-10)
+
+
+def test_delta_flush_matches_per_reward_updates():
+    rng = np.random.default_rng(2)
+    batches = [{arm_id: rng.normal(float(arm_id), 1.0, rng.integers(1, 6)) for arm_id in ARM_IDS} for _ in range(10)]
+
+    server = fakeredis.FakeServer()
+    delta = ThompsonSamplingAgent(
+        arm_ids=ARM_IDS, redis_client=fakeredis.FakeRedis(server=server), update_mode="delta", flush_interval=1e9,
+    )
+    reader = ThompsonSamplingAgent(arm_ids=ARM_IDS, redis_client=fakeredis.FakeRedis(server=server))
+    for batch in batches:
+        delta.update_beliefs(batch)
+    delta.update_belief("1", 0.25)
+    # Nothing is shared before the flush, but the agent's own reads count its rewards.
+    np.testing.assert_array_equal(reader._read_posteriors(), np.tile(BELIEF_PRIOR, (3, 1)))
+    local = delta._read_posteriors()
+    delta.flush()
+    assert delta.stats["flushes"] == 1 and delta.stats["round_trips"] == 1
+
+    script = ThompsonSamplingAgent(arm_ids=ARM_IDS, redis_client=fakeredis.FakeRedis())
+    for batch in batches:
+        for arm_id, rewards in batch.items():
+            for reward in rewards.tolist():
+                script.update_belief(arm_id, reward)
+    script.update_belief("1", 0.25)
+    np.testing.assert_allclose(reader._read_posteriors(), script._read_posteriors(), rtol=1e-10)
+    np.testing.assert_allclose(local, script._read_posteriors(), rtol=1e-10)
+
+    # The flush also logs every buffered reward, one stream entry per arm.
+    logged = sum(len(fields[b"rewards"]) // 8 for _, fields in reader.redis.xrange(reader.keys.reward_stream))
+    assert logged == sum(len(rewards) for batch in batches for rewards in batch.values()) + 1
+
+
+def test_delta_flushes_once_the_interval_has_passed():
+    agent = ThompsonSamplingAgent(arm_ids=ARM_IDS, redis_client=fakeredis.FakeRedis(), update_mode="delta", flush_interval=0.0)
+    agent.update_belief("2", 1.0)
+    assert agent.stats["flushes"] == 1
+    assert agent.redis.xlen(agent.keys.reward_stream) == 1
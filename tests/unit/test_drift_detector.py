@@ -0,0 +1,109 @@
+# tests/unit/test_drift_detector.py
+
+import numpy as np
+import pytest
+
+from drift_detector import ADWIN, CUSUM, DETECTORS, DriftMonitor, PageHinkley
+
+NAMES = sorted(DETECTORS)
+
+
+def trace(rng, before=2000, after=2000, shift=0.0):
+    return np.concatenate([rng.normal(0.0, 1.0, before), rng.normal(shift, 1.0, after)])
+
+
+def first_alarm(detector, values, batch=1):
+    """(index of the batch that alarmed first, direction), feeding `values` to stream 0 in batches."""
+    for i in range(0, len(values), batch):
+        direction = detector.update(0, values[i:i + batch])
+        if direction:
+            return i // batch, direction
+    return None, 0
+
+
+@pytest.mark.parametrize("name", NAMES)
+def test_batched_update_matches_per_sample_step(name):
+    rng = np.random.default_rng(1)
+    values = trace(rng, 1500, 500, shift=-1.5)
+    batch = 25
+    batched, stepped = DETECTORS[name](3), DETECTORS[name](3)
+    for i in range(0, len(values), batch):
+        chunk = values[i:i + batch]
+        direction = batched.update(1, chunk)
+        directions = [int(stepped.step(np.array([1]), np.array([value]))[0]) for value in chunk]
+        expected = next((d for d in directions if d), 0)
+        assert direction == expected, f"batch {i // batch}"
+        if direction:
+            return
+        for key, array in batched.state().items():
+            np.testing.assert_allclose(array, stepped.state()[key], rtol=1e-9, atol=1e-9, err_msg=key)
+    pytest.fail("No drift detected")
+
+
+@pytest.mark.parametrize("name", NAMES)
+def test_step_updates_several_streams_independently(name):
+    rng = np.random.default_rng(2)
+    values = rng.normal(0.0, 1.0, (300, 2))
+    together, apart = DETECTORS[name](2), DETECTORS[name](2)
+    for row in values:
+        together.step(np.array([0, 1]), row)
+        apart.step(np.array([1]), row[1:])
+        apart.step(np.array([0]), row[:1])
+    for key, array in together.state().items():
+        np.testing.assert_allclose(array, apart.state()[key], rtol=1e-12, err_msg=key)
+
+
+@pytest.mark.parametrize("name", NAMES)
+@pytest.mark.parametrize("shift", [2.0, -2.0])
+def test_detects_shifts_in_either_direction(name, shift):
+    rng = np.random.default_rng(3)
+    index, direction = first_alarm(DETECTORS[name](1), trace(rng, shift=shift))
+    assert direction == np.sign(shift)
+    assert 2000 <= index < 2300
+
+
+@pytest.mark.parametrize("name", NAMES)
+def test_no_alarm_on_a_stationary_trace(name):
+    rng = np.random.default_rng(4)
+    assert first_alarm(DETECTORS[name](1), trace(rng, 2500, 2500), batch=100) == (None, 0)
+
+
+@pytest.mark.parametrize("name", NAMES)
+def test_state_round_trip(name):
+    rng = np.random.default_rng(5)
+    arm_ids = [str(i) for i in range(4)]
+    original = DriftMonitor(arm_ids, name)
+    for _ in range(200):
+        original.update(str(rng.integers(4)), rng.normal(0.0, 1.0, rng.integers(1, 20)))
+    restored = DriftMonitor(arm_ids, name)
+    restored.load_state({key: np.array(array) for key, array in original.state().items()})
+    for key, array in original.state().items():
+        np.testing.assert_array_equal(restored.state()[key], array, err_msg=key)
+    # Both go on to make the same decisions, through a shift of arm 2.
+    for i in range(400):
+        arm = str(rng.integers(4))
+        rewards = rng.normal(3.0 if arm == "2" and i > 100 else 0.0, 1.0, 5)
+        assert original.update(arm, rewards) == restored.update(arm, rewards)
+
+
+def test_monitor_counts_observations_and_rejects_unknown_detectors():
+    monitor = DriftMonitor(["a", "b"], "cusum", warmup=10)
+    monitor.update("b", np.zeros(7))
+    assert monitor.observations.tolist() == [0, 7]
+    assert isinstance(monitor.detector, CUSUM) and monitor.detector.warmup == 10
+    monitor.reset()
+    assert monitor.observations.tolist() == [0, 0]
+    with pytest.raises(ValueError):
+        DriftMonitor(["a"], "kalman")
+
+
+def test_page_hinkley_waits_for_min_samples():
+    detector = PageHinkley(1, threshold=1.0, min_samples=50)
+    assert detector.update(0, np.r_[np.zeros(20), np.full(20, 10.0)]) == 0
+    assert detector.update(0, np.full(20, 10.0)) == 1
+
+
+def test_adwin_window_is_capped():
+    detector = ADWIN(1, max_window=500)
+    detector.update(0, np.random.default_rng(6).normal(0.0, 1.0, 5000))
+    assert detector.windows[0].width <= 500
@@ -0,0 +1,87 @@
+# tests/unit/test_history.py
+
+import warnings
+
+import numpy as np
+
+from history import HISTORY_FIELDS, BeliefHistory, RingBuffer, decimate
+
+T0 = 1_699_999_200.0 # A whole hour, so tier slots line up with the samples
+MU, MU_LO, MU_HI, NU = (HISTORY_FIELDS.index(field) for field in ("mu", "mu_lo", "mu_hi", "nu"))
+
+
+def posteriors_at(s: int, num_arms: int = 2) -> np.ndarray:
+    """Posteriors of the s-th sample: mu = s for arm 0, -s for arm 1; nu = s + 1."""
+    mu = np.array([s, -s][:num_arms], dtype=np.float64)
+    return np.column_stack([mu, np.full(num_arms, s + 1.0), np.ones(num_arms), np.ones(num_arms)])
+
+
+def recorded(seconds: int, num_arms: int = 2) -> BeliefHistory:
+    history = BeliefHistory([str(i) for i in range(num_arms)])
+    for s in range(seconds):
+        history.record(T0 + s, posteriors_at(s, num_arms))
+    return history
+
+
+def test_recent_range_reads_raw_samples():
+    history = recorded(600)
+    tier, times, values = history.query(T0 + 500, T0 + 600, max_points=1000)
+    assert tier == "1s"
+    # Slots are stamped with their end; sample s fills the slot ending at s + 1.
+    np.testing.assert_array_equal(times, T0 + np.arange(500, 600))
+    np.testing.assert_array_equal(values[:, 0, MU], np.arange(499, 599))
+    np.testing.assert_array_equal(values[:, 1, MU_LO], -np.arange(499, 599))
+
+
+def test_older_ranges_read_aggregated_tiers():
+    history = recorded(2 * 3600)
+    tier, times, values = history.query(T0, T0 + 2 * 3600, max_points=1000)
+    assert tier == "1m" # The 1s tier only reaches back an hour
+    np.testing.assert_array_equal(times[:3], T0 + 60 * np.arange(1, 4))
+    first = np.arange(60)
+    assert values[0, 0, MU] == first.mean()
+    assert (values[0, 0, MU_LO], values[0, 0, MU_HI]) == (first.min(), first.max())
+    assert (values[0, 1, MU_LO], values[0, 1, MU_HI]) == (-first.max(), -first.min())
+    assert values[0, 0, NU] == 60.0 # The last posterior of the slot
+
+
+def test_query_decimates_to_max_points():
+    history = recorded(1000)
+    tier, times, values = history.query(T0, T0 + 1000, max_points=100)
+    assert tier == "1s" and len(times) <= 100
+    full_times, full_values = history.tiers[0].buffer.query(T0, T0 + 1000)
+    # Groups are aligned on the newest slot, and merged like a coarser tier would.
+    k = -(-len(full_times) // 100)
+    assert times[-1] == full_times[-1]
+    assert values[-1, 0, MU] == full_values[-k:, 0, MU].mean()
+    assert values[-1, 0, MU_LO] == full_values[-k:, 0, MU_LO].min()
+    assert values[-1, 0, MU_HI] == full_values[-k:, 0, MU_HI].max()
+    assert values[-1, 0, NU] == full_values[-1, 0, NU]
+
+
+def test_decimate_keeps_short_ranges_and_ignores_missing_arms():
+    times, values = np.arange(5.0), np.ones((5, 2, len(HISTORY_FIELDS)), dtype=np.float32)
+    assert decimate(times, values, 10)[0] is times
+    values[:, 1] = np.nan # An arm without beliefs yet
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        merged_times, merged = decimate(times, values, 2)
+    np.testing.assert_array_equal(merged_times, [1.0, 4.0]) # k = 3, aligned on the newest slot
+    assert np.all(merged[:, 0] == 1.0) and np.all(np.isnan(merged[:, 1]))
+
+
+def test_memory_stays_fixed():
+    history = recorded(10)
+    size = history.nbytes
+    for s in range(10, 5000):
+        history.record(T0 + s, posteriors_at(s))
+    assert history.nbytes == size
+
+
+def test_ring_buffer_overwrites_the_oldest_slot():
+    buffer = RingBuffer(3, 1)
+    for t in range(5):
+        buffer.append(float(t), np.full((1, len(HISTORY_FIELDS)), t))
+    times, values = buffer.query(-np.inf, np.inf)
+    np.testing.assert_array_equal(times, [2.0, 3.0, 4.0])
+    assert buffer.oldest() == 2.0
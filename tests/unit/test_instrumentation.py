@@ -0,0 +1,56 @@
+# tests/unit/test_instrumentation.py
+
+import json
+
+import numpy as np
+import pytest
+from prometheus_client import REGISTRY
+
+import instrumentation
+from instrumentation import RateLimitedLog, log_event
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from agent import ThompsonSamplingAgent  # noqa: E402
+
+
+def test_log_event_writes_one_json_line(capsys):
+    log_event("pull", arm="3", reward=1.5)
+    record = json.loads(capsys.readouterr().out)
+    assert record["level"] == "INFO" and record["event"] == "pull"
+    assert record["arm"] == "3" and record["reward"] == 1.5
+
+
+def test_errors_go_to_stderr(capsys):
+    log_event("pull_error", level="ERROR", error="timeout")
+    out, err = capsys.readouterr()
+    assert out == "" and json.loads(err)["error"] == "timeout"
+
+
+def test_rate_limited_log_counts_what_it_drops(capsys, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(instrumentation.time, "monotonic", lambda: now[0])
+    log = RateLimitedLog("pull", interval=10.0)
+    for _ in range(5):
+        log(loop=1)
+    now[0] += 10.0
+    log(loop=2)
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [(record["loop"], record["suppressed"]) for record in records] == [(1, 0), (2, 4)]
+
+
+def sample(name, labels=None):
+    return REGISTRY.get_sample_value(name, labels or {}) or 0.0
+
+
+def test_agent_counts_decisions_updates_and_round_trips():
+    agent = ThompsonSamplingAgent(arm_ids=["0", "1"], redis_client=fakeredis.FakeRedis())
+    decisions = sample("bandit_agent_decisions_total", {"mode": "LEARNING"})
+    updates = sample("bandit_agent_belief_updates_total")
+    round_trips = sample("bandit_agent_redis_round_trips_total", {"operation": "update"})
+
+    counts = agent.select_arms(8)
+    agent.update_beliefs({arm_id: np.ones(count) for arm_id, count in counts.items()})
+    assert sample("bandit_agent_decisions_total", {"mode": "LEARNING"}) == decisions + 8
+    assert sample("bandit_agent_belief_updates_total") == updates + 8
+    assert sample("bandit_agent_redis_round_trips_total", {"operation": "update"}) == round_trips + 1
@@ -0,0 +1,107 @@
+# tests/unit/test_large_k_selection.py
+#
+# Large action spaces: CandidateIndex pruning against sampling every arm,
+# chunked sampling, and the paged GET /arms endpoint.
+
+import numpy as np
+import pytest
+from scipy import stats
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from agent import ThompsonSamplingAgent, sample_best_arms  # noqa: E402
+from arm_index import CandidateIndex, mean_marginals  # noqa: E402
+from belief_store import BELIEF_PRIOR, pack_beliefs  # noqa: E402
+
+NUM_ARMS = 1000
+
+
+def posteriors(num_prior=10, seed=0):
+    """Explored arms with means ~ N(0, 1) and 50 pulls each, plus `num_prior` arms still at the prior."""
+    rng = np.random.default_rng(seed)
+    rows = np.tile(BELIEF_PRIOR, (NUM_ARMS, 1))
+    num_explored = NUM_ARMS - num_prior
+    explored = np.sort(rng.choice(NUM_ARMS, num_explored, replace=False))
+    rows[explored] = np.column_stack([rng.normal(0.0, 1.0, num_explored), np.full(num_explored, 50.0),
+                                      np.full(num_explored, 25.0), np.full(num_explored, 25.0)])
+    return rows, explored
+
+
+def test_index_keeps_the_contenders_and_the_prior_arms():
+    rows, explored = posteriors()
+    rows[explored[0]] = np.nan # No beliefs yet
+    index = CandidateIndex(rows, tolerance=0.01)
+    assert len(index.prior_arms) == 10
+    assert set(index.candidates) <= set(explored[1:])
+    assert len(index.candidates) < len(explored) // 4 # Most explored arms cannot win
+    best = explored[1:][np.argmax(rows[explored[1:], 0])]
+    assert index.candidates[0] == best
+
+
+def test_sample_prior_max_matches_the_max_of_prior_samples():
+    rows, _ = posteriors()
+    index = CandidateIndex(rows)
+    m = len(index.prior_arms)
+    exact = index.sample_prior_max(4000, rng=np.random.default_rng(1))
+    df, loc, scale = (float(x) for x in mean_marginals(np.array(BELIEF_PRIOR)))
+    brute = (loc + scale * np.random.default_rng(2).standard_t(df, (4000, m))).max(axis=1)
+    # Heavy tails: compare ranks rather than moments.
+    assert stats.ks_2samp(exact, brute).pvalue > 0.001
+
+
+def decision_frequencies(arm_selection, rows, draws=20_000):
+    arm_ids = [str(i) for i in range(NUM_ARMS)]
+    client = fakeredis.FakeRedis()
+    agent = ThompsonSamplingAgent(
+        arm_ids=arm_ids, redis_client=client, belief_storage="packed", arm_selection=arm_selection,
+        posterior_cache_ttl=60.0,
+    )
+    client.set(agent.keys.packed_beliefs, pack_beliefs(rows))
+    np.random.seed(3)
+    frequencies = np.zeros(NUM_ARMS)
+    for arm_id, count in agent.select_arms(draws).items():
+        frequencies[int(arm_id)] = count / draws
+    return frequencies
+
+
+def test_pruned_decisions_take_prior_arms_as_often_as_full_sampling():
+    rows, explored = posteriors()
+    full = decision_frequencies("full", rows)
+    pruned = decision_frequencies("pruned", rows)
+    prior = np.ones(NUM_ARMS, dtype=bool)
+    prior[explored] = False
+    # The prior's heavy tails win most decisions, through one exact draw when pruned.
+    assert pruned[prior].sum() == pytest.approx(full[prior].sum(), abs=0.02)
+
+
+def test_pruned_decisions_follow_full_thompson_sampling():
+    rows, _ = posteriors(num_prior=0)
+    full = decision_frequencies("full", rows)
+    pruned = decision_frequencies("pruned", rows)
+    top = np.argsort(-rows[:, 0])[:5]
+    np.testing.assert_allclose(pruned[top], full[top], atol=0.015)
+    assert 0.5 * np.abs(pruned - full).sum() < 0.03 # Total variation distance
+
+
+def test_chunked_sampling_finds_the_clear_best_arm():
+    rows = np.tile([0.0, 1e6, 1e6, 1e6], (5000, 1))
+    rows[4321, 0] = 1.0
+    best, value = sample_best_arms(rows, size=10, chunk_size=256)
+    assert best.tolist() == [4321] * 10 and np.all(value > 0.9)
+    assert sample_best_arms(rows[:0]) == (0, -np.inf)
+
+
+@pytest.fixture
+def client(api):
+    testclient = pytest.importorskip("fastapi.testclient")
+    api.load_scenario(None)
+    return testclient.TestClient(api.app)
+
+
+def test_arms_pages_through_every_arm(client):
+    first = client.get("/arms", params={"offset": 0, "limit": 3}).json()
+    second = client.get("/arms", params={"offset": 3, "limit": 3}).json()
+    assert first["total"] == 5 and first["arm_ids"] == ["0", "1", "2"]
+    assert second["arm_ids"] == ["3", "4"] and second["means"] == [-1.0, -3.0]
+    assert client.get("/arms", params={"top": 2}).json()["arm_ids"] == ["1", "0"]
+    assert client.get("/arms", params={"limit": 0}).status_code == 400
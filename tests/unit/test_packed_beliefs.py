@@ -0,0 +1,70 @@
+# tests/unit/test_packed_beliefs.py
+#
+# The packed belief layout (belief_store.py) and the agent's packed storage.
+# The packed update script needs Lua's struct library, which fakeredis does
+# not provide, so only the layout, the initialization and the reads run here.
+
+import json
+
+import numpy as np
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from agent import ThompsonSamplingAgent  # noqa: E402
+from belief_store import BELIEF_PRIOR, ROW_BYTES, PackedBeliefs, pack_beliefs, unpack_beliefs  # noqa: E402
+
+POSTERIORS = np.array([[1.0, 2.0, 3.0, 4.0], [5.0, 6.0, 7.0, 8.0], [-1.5, 10.0, 5.2, 6.1]])
+
+
+def test_pack_round_trip():
+    raw = pack_beliefs(POSTERIORS, epoch=3)
+    assert len(raw) == len(POSTERIORS) * ROW_BYTES
+    rows = unpack_beliefs(raw)
+    np.testing.assert_array_equal(rows[:, :4], POSTERIORS)
+    assert rows[:, 4].tolist() == [3.0, 3.0, 3.0]
+
+
+def test_decode_is_a_view_when_the_layout_matches():
+    packed = PackedBeliefs(["a", "b", "c"])
+    packed.set_layout(packed.layout_json())
+    raw = pack_beliefs(POSTERIORS)
+    decoded = packed.decode(raw)
+    np.testing.assert_array_equal(decoded, POSTERIORS)
+    assert not decoded.flags.writeable and np.shares_memory(decoded, np.frombuffer(raw, dtype="<f8"))
+
+
+def test_decode_follows_the_stored_layout():
+    packed = PackedBeliefs(["c", "a", "x"])
+    packed.set_layout(json.dumps(["a", "b", "c"]))
+    decoded = packed.decode(pack_beliefs(POSTERIORS))
+    np.testing.assert_array_equal(decoded[:2], POSTERIORS[[2, 0]])
+    assert np.isnan(decoded[2]).all() # Not in the stored layout
+    assert packed.update_args("c", 1, 2.0, 0.0, "updates", 4) == [2, 1, 2.0, 0.0, "updates", "arm:c", 4]
+
+
+def test_decode_without_a_snapshot_is_all_nan():
+    packed = PackedBeliefs(["a", "b"])
+    assert np.isnan(packed.decode(None)).all()
+    packed.set_layout(packed.layout_json())
+    assert np.isnan(packed.decode(None)).all()
+
+
+def test_agents_share_the_first_layout_written():
+    client = fakeredis.FakeRedis()
+    first = ThompsonSamplingAgent(arm_ids=["0", "1", "2"], redis_client=client, belief_storage="packed")
+    np.testing.assert_array_equal(first._read_posteriors(), np.tile(BELIEF_PRIOR, (3, 1)))
+    # Rewrite the snapshot as if arm 2 had learned something.
+    rows = np.tile(BELIEF_PRIOR, (3, 1))
+    rows[2] = [4.0, 11.0, 5.2, 6.0]
+    client.set(first.keys.packed_beliefs, pack_beliefs(rows))
+
+    second = ThompsonSamplingAgent(arm_ids=["2", "0", "1"], redis_client=client, belief_storage="packed")
+    assert json.loads(client.get(first.keys.packed_arms)) == ["0", "1", "2"]
+    np.testing.assert_array_equal(second._read_posteriors()[0], rows[2])
+    assert client.get(first.keys.packed_beliefs) == pack_beliefs(rows) # Not overwritten by the second agent
+
+
+def test_packed_storage_refuses_the_watch_update_mode():
+    with pytest.raises(ValueError):
+        ThompsonSamplingAgent(arm_ids=["0"], redis_client=fakeredis.FakeRedis(), belief_storage="packed", update_mode="watch")
@@ -0,0 +1,83 @@
+# tests/unit/test_push_convergence.py
+#
+# The push-based orchestrator's probability-of-best stop rule, following the
+# belief updates agents publish (fakeredis).
+
+import numpy as np
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+import orchestrator  # noqa: E402
+from agent import ThompsonSamplingAgent  # noqa: E402
+from orchestrator import probability_not_best  # noqa: E402
+
+ARM_IDS = ["0", "1", "2"]
+
+
+def belief(mu, nu=100.0, alpha=50.0, beta=50.0):
+    return {"mu": mu, "nu": nu, "alpha": alpha, "beta": beta}
+
+
+def test_probability_not_best_of_two_identical_arms_is_one_half():
+    assert probability_not_best({"a": belief(1.0), "b": belief(1.0)}, "a") == pytest.approx(0.5)
+
+
+def test_probability_not_best_shrinks_with_the_gap_and_the_evidence():
+    close = probability_not_best({"a": belief(1.0), "b": belief(0.9)}, "a")
+    far = probability_not_best({"a": belief(1.0), "b": belief(0.0)}, "a")
+    assert 0.0 < far < close < 0.5
+    # Marginal variances are beta / (alpha * nu) = 0.01 each: a gap of 1 is ~7 standard deviations.
+    assert far < 1e-10
+    assert probability_not_best({"a": belief(1.0, nu=10.0), "b": belief(0.9, nu=10.0)}, "a") > close
+
+
+def test_probability_not_best_sums_over_the_other_arms():
+    beliefs = {"a": belief(1.0), "b": belief(0.9), "c": belief(0.9)}
+    two = probability_not_best({"a": belief(1.0), "b": belief(0.9)}, "a")
+    assert probability_not_best(beliefs, "a") == pytest.approx(2 * two)
+
+
+@pytest.fixture
+def system(monkeypatch):
+    """An agent and a push-mode monitor sharing one fakeredis server."""
+    monkeypatch.setattr(orchestrator, "get_scenario", lambda api_url: None)
+    monkeypatch.setattr(orchestrator, "CONVERGENCE_CRITERION", "probability_of_best")
+    monkeypatch.setattr(orchestrator, "PUSH_WAIT_SECONDS", 0.05)
+    server = fakeredis.FakeServer()
+    agent = ThompsonSamplingAgent(arm_ids=ARM_IDS, redis_client=fakeredis.FakeRedis(server=server))
+    monitor = orchestrator.SystemMonitor(
+        fakeredis.FakeRedis(server=server, decode_responses=True), ARM_IDS, fakeredis.FakeRedis(server=server),
+        orchestrator_mode="push",
+    )
+    monitor.process_belief_updates() # Consumes the subscription's confirmation
+    return agent, monitor
+
+
+def pull(agent, means, count, rng):
+    agent.update_beliefs({arm_id: rng.normal(mean, 1.0, count) for arm_id, mean in zip(ARM_IDS, means)})
+
+
+def test_push_monitor_converges_once_the_leader_is_clear(system):
+    agent, monitor = system
+    rng = np.random.default_rng(0)
+    pull(agent, [0.0, 3.0, 1.0], 10, rng)
+    monitor.process_belief_updates()
+    assert monitor.updates_seen == 3
+    assert monitor.mode == "CONVERGENCE_DETECTION" # The leader has fewer than CONVERGENCE_MIN_PULLS pulls
+
+    pull(agent, [0.0, 3.0, 1.0], 40, rng)
+    monitor.process_belief_updates()
+    assert monitor.mode == "DRIFT_MONITORING"
+    assert monitor.converged_best_arm == "1"
+    assert agent.redis.get(agent.keys.mode) == b"MONITORING"
+
+
+def test_push_monitor_waits_while_arms_are_close(system):
+    agent, monitor = system
+    rng = np.random.default_rng(1)
+    for _ in range(5):
+        pull(agent, [1.0, 1.05, 0.95], 40, rng)
+        monitor.process_belief_updates()
+    assert monitor.mode == "CONVERGENCE_DETECTION"
+    assert monitor.updates_seen == 15
@@ -0,0 +1,70 @@
+# tests/unit/test_reward_stream.py
+#
+# The reward stream: agents append every pulled reward, the orchestrator reads
+# them through its consumer group and feeds its drift detector.
+
+import numpy as np
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+import orchestrator  # noqa: E402
+from agent import ThompsonSamplingAgent, append_rewards  # noqa: E402
+
+ARM_IDS = ["0", "1", "2"]
+
+
+def entries(client, agent):
+    return [
+        (fields[b"arm"].decode(), np.frombuffer(fields[b"rewards"], dtype="<f8").tolist())
+        for _, fields in client.xrange(agent.keys.reward_stream)
+    ]
+
+
+def test_append_rewards_stores_float64_bytes():
+    client = fakeredis.FakeRedis()
+    append_rewards(client, "4", np.array([1.25, -3.5]), maxlen=100, stream_key="rewards")
+    [(_, fields)] = client.xrange("rewards")
+    assert fields[b"arm"] == b"4"
+    assert np.frombuffer(fields[b"rewards"], dtype="<f8").tolist() == [1.25, -3.5]
+
+
+@pytest.mark.parametrize("update_mode", ["script", "watch"])
+def test_single_updates_append_one_entry_each(update_mode):
+    client = fakeredis.FakeRedis()
+    agent = ThompsonSamplingAgent(arm_ids=ARM_IDS, redis_client=client, update_mode=update_mode)
+    agent.update_belief("1", 2.0)
+    agent.update_belief("0", -1.0)
+    assert entries(client, agent) == [("1", [2.0]), ("0", [-1.0])]
+
+
+def test_minibatch_appends_one_entry_per_arm():
+    client = fakeredis.FakeRedis()
+    agent = ThompsonSamplingAgent(arm_ids=ARM_IDS, redis_client=client)
+    agent.update_beliefs({"2": np.array([1.0, 2.0, 3.0]), "0": np.array([0.5]), "1": np.array([])})
+    assert entries(client, agent) == [("2", [1.0, 2.0, 3.0]), ("0", [0.5])]
+
+
+def test_orchestrator_detects_drift_from_the_stream(monkeypatch):
+    monkeypatch.setattr(orchestrator, "get_scenario", lambda api_url: None)
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeRedis(server=server)
+    agent = ThompsonSamplingAgent(arm_ids=ARM_IDS, redis_client=client)
+    monitor = orchestrator.SystemMonitor(
+        fakeredis.FakeRedis(server=server, decode_responses=True), ARM_IDS, fakeredis.FakeRedis(server=server),
+        orchestrator_mode="polling",
+    )
+    monitor.handle_convergence({"1": {"mu": 5.0}, "0": {"mu": 1.0}})
+    assert client.get(agent.keys.mode) == b"MONITORING"
+
+    rng = np.random.default_rng(0)
+    for _ in range(10): # The best arm keeps paying...
+        agent.update_beliefs({"1": rng.normal(5.0, 1.0, 100)})
+        monitor.check_drift()
+    assert monitor.mode == "DRIFT_MONITORING"
+    for _ in range(10): # ...until it gets much worse.
+        agent.update_beliefs({"1": rng.normal(1.0, 1.0, 100)})
+        monitor.check_drift()
+    assert monitor.mode == "CONVERGENCE_DETECTION"
+    assert client.get(agent.keys.mode) == b"FORCED_EXPLORATION"
+    assert int(client.get(agent.keys.epoch)) == 1
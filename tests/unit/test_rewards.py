@@ -0,0 +1,56 @@
+# tests/unit/test_rewards.py
+
+import numpy as np
+
+from rewards import INITIAL_BUFFER_SIZE, RewardStreams
+
+ARM_IDS = ["a", "b", "c"]
+
+
+def test_replay_does_not_depend_on_batching_or_interleaving():
+    reference = RewardStreams(ARM_IDS, seed=42, buffer_size=256)
+    expected = {arm_id: reference.take(arm_id, 3000) for arm_id in ARM_IDS}
+
+    streams = RewardStreams(ARM_IDS, seed=42, buffer_size=256)
+    drawn = {arm_id: [] for arm_id in ARM_IDS}
+    rng = np.random.default_rng(0)
+    while any(sum(map(len, chunks)) < 3000 for chunks in drawn.values()):
+        arm_id = ARM_IDS[rng.integers(len(ARM_IDS))]
+        left = 3000 - sum(map(len, drawn[arm_id]))
+        if left == 0:
+            continue
+        # Single pulls, small batches and batches larger than a whole buffer.
+        count = min(left, int(rng.choice([1, 7, 100, 600])))
+        drawn[arm_id].append(np.array([streams.next(arm_id)]) if count == 1 else streams.take(arm_id, count))
+    for arm_id in ARM_IDS:
+        np.testing.assert_array_equal(np.concatenate(drawn[arm_id]), expected[arm_id])
+
+
+def test_arms_and_stream_ids_get_independent_draws():
+    streams = RewardStreams(ARM_IDS, seed=7)
+    a, b = streams.take("a", 100), streams.take("b", 100)
+    other_worker = RewardStreams(ARM_IDS, seed=7, stream_id=1).take("a", 100)
+    assert not np.array_equal(a, b)
+    assert not np.array_equal(a, other_worker)
+    assert not np.array_equal(a, RewardStreams(ARM_IDS, seed=8).take("a", 100))
+
+
+def test_unseeded_runs_can_be_replayed_from_their_entropy():
+    first = RewardStreams(ARM_IDS)
+    rewards = first.take("c", 50)
+    np.testing.assert_array_equal(RewardStreams(ARM_IDS, seed=first.seed).take("c", 50), rewards)
+    assert not np.array_equal(RewardStreams(ARM_IDS).take("c", 50), rewards)
+
+
+def test_buffers_grow_up_to_the_configured_size():
+    streams = RewardStreams(ARM_IDS, seed=1, buffer_size=1000)
+    streams.next("a")
+    assert len(streams._streams["a"].buffer) == INITIAL_BUFFER_SIZE
+    streams.take("a", 5000)
+    assert len(streams._streams["a"].buffer) <= 1000
+    assert "b" not in streams._streams # Arms never pulled cost nothing
+
+
+def test_draws_are_standard_normal():
+    rewards = RewardStreams(ARM_IDS, seed=3).take("b", 100_000)
+    assert abs(rewards.mean()) < 0.02 and abs(rewards.std() - 1.0) < 0.02
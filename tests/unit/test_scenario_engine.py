@@ -0,0 +1,109 @@
+# tests/unit/test_scenario_engine.py
+
+import numpy as np
+import pytest
+
+from scenario_engine import WALK_BLOCK, ScenarioEngine
+
+ARM_IDS = ["0", "1", "2"]
+BASE_MEANS = np.array([1.0, 2.0, 3.0])
+BASE_STD_DEVS = np.ones(3)
+
+
+def engine(*events, clock="pulls"):
+    return ScenarioEngine({"clock": clock, "events": list(events)}, ARM_IDS, BASE_MEANS, BASE_STD_DEVS)
+
+
+def mean_offsets(scenario, arm: int, t):
+    return np.broadcast_to(scenario.offsets("mean", np.full(len(t), arm), np.asarray(t, dtype=np.float64)), len(t))
+
+
+def test_abrupt_shifts_at_its_change_point():
+    scenario = engine({"kind": "abrupt", "arms": ["1"], "at": 100, "shift": -2.0})
+    assert mean_offsets(scenario, 1, [0, 99, 100, 1000]).tolist() == [0.0, 0.0, -2.0, -2.0]
+    assert mean_offsets(scenario, 0, [100]).tolist() == [0.0]
+    assert scenario.change_points() == [{"t": 100.0, "kind": "abrupt", "param": "mean", "arms": ["1"]}]
+
+
+def test_abrupt_to_reaches_the_target_value():
+    scenario = engine({"kind": "abrupt", "arms": ["0", "2"], "at": 10, "to": 5.0})
+    assert mean_offsets(scenario, 0, [10]).tolist() == [4.0]
+    assert mean_offsets(scenario, 2, [10]).tolist() == [2.0]
+
+
+def test_linear_ramps_between_start_and_end():
+    scenario = engine({"kind": "linear", "arms": "all", "start": 100, "end": 200, "shift": 4.0})
+    assert mean_offsets(scenario, 2, [0, 100, 150, 200, 500]).tolist() == [0.0, 0.0, 2.0, 4.0, 4.0]
+    assert [point["t"] for point in scenario.change_points()] == [100.0]
+
+
+def test_periodic_starts_at_start():
+    scenario = engine({"kind": "periodic", "arms": ["0"], "start": 100, "period": 400, "amplitude": 0.5})
+    np.testing.assert_allclose(mean_offsets(scenario, 0, [99, 100, 200, 300, 400]), [0.0, 0.0, 0.5, 0.0, -0.5], atol=1e-12)
+    assert mean_offsets(scenario, 1, [200]).tolist() == [0.0]
+    assert scenario.change_points() == []
+
+
+def test_random_walk_steps_every_interval():
+    scenario = engine({"kind": "random_walk", "arms": ["0"], "start": 10, "every": 5, "step": 1.0, "seed": 3})
+    offsets = mean_offsets(scenario, 0, np.arange(0, 30))
+    assert np.all(offsets[:15] == 0.0) # Before start, and before the first increment at start + every
+    assert offsets[15] != 0.0
+    # Constant between two increments.
+    assert np.all(offsets[15:20] == offsets[15]) and offsets[20] != offsets[15]
+    assert mean_offsets(scenario, 1, [1000]).tolist() == [0.0]
+
+
+def test_random_walk_does_not_depend_on_batching():
+    spec = {"kind": "random_walk", "arms": "all", "every": 1, "step": 0.1, "seed": 7}
+    t = np.arange(3 * WALK_BLOCK + 17, dtype=np.float64)
+    arms = t.astype(np.intp) % 3
+    whole = engine(spec).offsets("mean", arms, t)
+
+    batched = engine(spec)
+    rng = np.random.default_rng(0)
+    bounds = np.sort(rng.choice(np.arange(1, len(t)), 40, replace=False))
+    parts = [batched.offsets("mean", a, b) for a, b in zip(np.split(arms, bounds), np.split(t, bounds))]
+    np.testing.assert_array_equal(np.concatenate(parts), whole)
+    # A pull lagging the clock by several blocks still gets the same walk.
+    np.testing.assert_array_equal(batched.offsets("mean", arms[:50], t[:50]), whole[:50])
+
+
+def test_random_walk_memory_is_bounded():
+    scenario = engine({"kind": "random_walk", "arms": "all", "every": 1, "step": 0.1})
+    walk = scenario.events[0]
+    for first in range(0, 50 * WALK_BLOCK, WALK_BLOCK // 2):
+        scenario.offsets("mean", np.zeros(8, dtype=np.intp), np.arange(first, first + 8, dtype=np.float64))
+    assert len(walk._blocks) <= 2
+
+
+@pytest.mark.parametrize("event", [
+    {"kind": "periodic", "arms": "all", "period": 0, "amplitude": 1.0},
+    {"kind": "periodic", "arms": "all", "period": -5, "amplitude": 1.0},
+    {"kind": "random_walk", "arms": "all", "every": 0, "step": 0.1},
+    {"kind": "random_walk", "arms": "all", "every": 10, "step": -0.1},
+    {"kind": "linear", "arms": "all", "start": 10, "end": 10, "shift": 1.0},
+    {"kind": "sawtooth", "arms": "all"},
+    {"kind": "abrupt", "arms": ["7"], "at": 1, "shift": 1.0},
+    {"kind": "abrupt", "arms": "12", "at": 1, "shift": 1.0},
+    {"kind": "abrupt", "arms": "all", "param": "median", "at": 1, "shift": 1.0},
+])
+def test_invalid_events_are_rejected(event):
+    with pytest.raises(ValueError):
+        engine(event)
+
+
+def test_unknown_clock_is_rejected():
+    with pytest.raises(ValueError):
+        engine(clock="days")
+
+
+@pytest.mark.parametrize("scenario", [
+    {"resolution": 0},
+    {"resolution": -1},
+    {"events": "x"},
+    {"events": ["abrupt"]},
+])
+def test_invalid_scenarios_are_rejected(scenario):
+    with pytest.raises(ValueError):
+        ScenarioEngine(scenario, ARM_IDS, BASE_MEANS, BASE_STD_DEVS)
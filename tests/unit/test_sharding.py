@@ -0,0 +1,88 @@
+# tests/unit/test_sharding.py
+
+import re
+
+import pytest
+
+from belief_store import (
+    BELIEF_UPDATES_CHANNEL, BELIEFS_EPOCH_KEY, BELIEFS_VERSION_KEY, PACKED_ARMS_KEY, PACKED_BELIEFS_KEY,
+    REWARD_STREAM_KEY, SYSTEM_MODE_KEY, ExperimentKeys,
+)
+from checkpoint import experiment_path
+from sharding import ShardRouter, parse_nodes
+
+NODES = [("redis-0", 6379), ("redis-1", 6379), ("redis-2", 6379)]
+EXPERIMENTS = [f"exp-{i}" for i in range(2000)]
+
+
+def key_names(keys: ExperimentKeys) -> list[str]:
+    return [
+        keys.packed_beliefs, keys.packed_arms, keys.epoch, keys.version, keys.updates_channel,
+        keys.reward_stream, keys.mode, keys.arm("7"),
+    ]
+
+
+def hash_tag(key: str) -> str:
+    """The part of `key` Redis Cluster hashes: the first non-empty {...}, or the whole key."""
+    match = re.search(r"\{([^}]+)\}", key)
+    return match.group(1) if match else key
+
+
+def test_placement_is_stable():
+    router = ShardRouter(NODES)
+    placement = [router.node_for(experiment) for experiment in EXPERIMENTS]
+    # Another process, listing the nodes in another order, places experiments the same way.
+    assert [ShardRouter(NODES[::-1]).node_for(experiment) for experiment in EXPERIMENTS] == placement
+    assert [router.node_for(experiment) for experiment in EXPERIMENTS] == placement
+
+
+def test_experiments_spread_over_all_nodes():
+    groups = ShardRouter(NODES).group(EXPERIMENTS)
+    assert set(groups) == set(NODES)
+    assert sum(map(len, groups.values())) == len(EXPERIMENTS)
+    assert all(len(group) > len(EXPERIMENTS) / len(NODES) / 2 for group in groups.values())
+
+
+def test_adding_a_node_only_moves_experiments_onto_it():
+    before, after = ShardRouter(NODES), ShardRouter(NODES + [("redis-3", 6379)])
+    moved = [experiment for experiment in EXPERIMENTS if before.node_for(experiment) != after.node_for(experiment)]
+    assert all(after.node_for(experiment) == ("redis-3", 6379) for experiment in moved)
+    # About 1/4 of the experiments, far from the ~3/4 a modulo placement would move.
+    assert 0.15 < len(moved) / len(EXPERIMENTS) < 0.35
+
+
+def test_router_needs_a_node():
+    with pytest.raises(ValueError):
+        ShardRouter([])
+
+
+def test_parse_nodes():
+    assert parse_nodes("", "redis", 6379) == [("redis", 6379)]
+    assert parse_nodes(" a:7000, b ,,[::1]:7002", "redis", 6379) == [("a", 7000), ("b", 6379), ("[::1]", 7002)]
+
+
+@pytest.mark.parametrize("spec", ["a:port", ":7000", "a:", "a:70000", "a:0", "a:-1"])
+def test_parse_nodes_rejects_invalid_nodes(spec):
+    with pytest.raises(ValueError, match="Invalid Redis node"):
+        parse_nodes(spec, "redis", 6379)
+
+
+def test_default_experiment_keeps_the_global_key_names():
+    assert key_names(ExperimentKeys()) == [
+        PACKED_BELIEFS_KEY, PACKED_ARMS_KEY, BELIEFS_EPOCH_KEY, BELIEFS_VERSION_KEY, BELIEF_UPDATES_CHANNEL,
+        REWARD_STREAM_KEY, SYSTEM_MODE_KEY, "arm:7",
+    ]
+
+
+def test_experiment_keys_share_the_hash_tag():
+    names = key_names(ExperimentKeys("checkout-42"))
+    assert all(name.startswith("exp:{checkout-42}:") for name in names)
+    assert {hash_tag(name) for name in names} == {"checkout-42"}
+    # Two experiments never share a key.
+    assert not set(names) & set(key_names(ExperimentKeys("checkout-43")))
+
+
+def test_experiment_path():
+    assert experiment_path("/data/state.snap", "") == "/data/state.snap"
+    assert experiment_path("/data/state.snap", "exp-1") == "/data/state.snap.exp-1"
+    assert experiment_path("", "exp-1") == ""
@@ -0,0 +1,47 @@
+# tests/unit/test_simulator.py
+
+import numpy as np
+import pytest
+
+from simulator import BanditSimulator, load_arm_configs
+
+ARMS = {"0": {"mean": 0.0, "std_dev": 1.0}, "1": {"mean": 2.0, "std_dev": 1.0}, "2": {"mean": 1.0, "std_dev": 1.0}}
+
+
+def test_loads_the_api_arms():
+    configs = load_arm_configs()
+    assert set(configs) == {"0", "1", "2", "3", "4"}
+    assert configs["1"] == {"mean": 5.0, "std_dev": 1.0}
+
+
+def test_seeded_runs_are_reproducible():
+    first = BanditSimulator(ARMS, num_instances=50, num_steps=200, seed=3).run()
+    second = BanditSimulator(ARMS, num_instances=50, num_steps=200, seed=3).run()
+    np.testing.assert_array_equal(first["cumulative_regret"], second["cumulative_regret"])
+    np.testing.assert_array_equal(first["convergences"], second["convergences"])
+
+
+def test_instances_learn_and_converge():
+    result = BanditSimulator(ARMS, num_instances=200, num_steps=600, seed=0).run()
+    regret = np.diff(result["cumulative_regret"], prepend=0.0)
+    # Regret per step shrinks as the instances find arm 1.
+    assert regret[-100:].mean() < 0.2 * regret[:20].mean()
+    assert result["regret_quantiles"].shape == (3, 600)
+    assert result["convergences"].sum() > 100
+
+
+def test_drift_of_the_best_arm_is_detected():
+    drift_step = 600
+    result = BanditSimulator(
+        ARMS, num_instances=200, num_steps=1200, drift_schedule=[(drift_step, "1", -2.0)], seed=1,
+    ).run()
+    detections = result["drift_detections"]
+    assert detections[drift_step:].sum() > 5 * detections[:drift_step].sum()
+    # After re-learning, instances settle on arm 2, the new best.
+    regret = np.diff(result["cumulative_regret"], prepend=0.0)
+    assert regret[-100:].mean() < 0.5
+
+
+def test_unvectorized_detectors_are_rejected():
+    with pytest.raises(ValueError):
+        BanditSimulator(ARMS, drift_detector="adwin")
@@ -0,0 +1,74 @@
+# tests/unit/test_supervisor.py
+
+import threading
+
+import pytest
+import redis
+
+import supervisor
+
+
+@pytest.mark.parametrize("agents, workers, expected", [
+    (10, 4, [3, 3, 2, 2]),
+    (8, 4, [2, 2, 2, 2]),
+    (3, 3, [1, 1, 1]),
+])
+def test_split_agents_is_as_even_as_possible(agents, workers, expected):
+    assert supervisor.split_agents(agents, workers) == expected
+
+
+def test_supervisor_starts_no_more_workers_than_agents():
+    assert supervisor.Supervisor(num_agents=3, num_workers=8).agents_per_worker == [1, 1, 1]
+    assert supervisor.Supervisor(num_agents=10, num_workers=4).agents_per_worker == [3, 3, 2, 2]
+
+
+def snapshot(worker, pid, pulls, cpu, uptime):
+    return {"worker": worker, "pid": pid, "agents": 2, "pulls": pulls, "errors": 0, "round_trips": pulls,
+            "watch_retries": 0, "cpu_seconds": cpu, "max_rss_mb": 50.0, "uptime": uptime}
+
+
+def test_report_rates_are_per_interval_and_survive_restarts():
+    pool = supervisor.Supervisor(num_agents=4, num_workers=2)
+    pool.latest = {0: snapshot(0, 100, 1000, 1.0, 10.0), 1: snapshot(1, 200, 500, 0.5, 10.0)}
+    pool.report()
+    pool.latest = {0: snapshot(0, 100, 3000, 2.0, 20.0), 1: snapshot(1, 201, 100, 0.1, 2.0)} # Worker 1 restarted
+    lines = pool.report().splitlines()
+    assert "pulls/s=200.0" in lines[0] # (3000 - 1000) / 10 s
+    assert "pulls/s=50.0" in lines[1] # 100 / 2 s since its restart
+    assert lines[2].startswith("STATS total agents=4 pulls/s=250.0")
+    assert "pulls/s=150.0" in pool.report(final=True).splitlines()[0] # Whole run: 3000 / 20 s
+
+
+class DeltaAgent:
+    update_mode = "delta"
+
+    def __init__(self):
+        self.flushed = False
+
+    def flush(self):
+        self.flushed = True
+
+
+def test_agent_thread_survives_redis_errors_and_flushes_on_stop(monkeypatch):
+    monkeypatch.setattr(supervisor, "PULL_INTERVAL_SECONDS", 0.0)
+    monkeypatch.setattr(supervisor, "ERROR_BACKOFF_SECONDS", 0.0)
+    stop, errors, calls = threading.Event(), [], []
+
+    def run_iteration(agent, mode, pull_count, http):
+        calls.append(pull_count)
+        if pull_count == 1:
+            raise redis.ConnectionError("Connection refused")
+        if pull_count == 3:
+            stop.set()
+        return True
+
+    monkeypatch.setattr(supervisor, "run_iteration", run_iteration)
+
+    class Poller:
+        mode = "LEARNING"
+
+    agent = DeltaAgent()
+    supervisor.run_agent(agent, None, Poller(), errors, stop)
+    assert calls == [1, 2, 3]
+    assert errors == [1]
+    assert agent.flushed
@@ -0,0 +1,81 @@
+# tests/unit/test_thompson_selection.py
+#
+# Batched posterior reads and vectorized Thompson Sampling of
+# ThompsonSamplingAgent, against fakeredis.
+
+import numpy as np
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from agent import ThompsonSamplingAgent, sample_posterior_means  # noqa: E402
+from belief_store import BELIEF_PRIOR  # noqa: E402
+
+ARM_IDS = ["0", "1", "2", "3"]
+
+
+def make_agent(client, **kwargs):
+    return ThompsonSamplingAgent(arm_ids=ARM_IDS, redis_client=client, **kwargs)
+
+
+def set_belief(client, agent, arm_id, mu, nu=1e6, alpha=1e6, beta=1e6):
+    client.hset(agent.keys.arm(arm_id), mapping={"mu": mu, "nu": nu, "alpha": alpha, "beta": beta, "epoch": 0})
+
+
+def test_sample_posterior_means_draws_around_mu():
+    posteriors = np.array([[0.0, 10.0, 50.0, 50.0], [3.0, 1000.0, 500.0, 500.0]])
+    draws = sample_posterior_means(posteriors, size=20_000, rng=np.random.default_rng(0))
+    assert draws.shape == (20_000, 2)
+    np.testing.assert_allclose(draws.mean(axis=0), [0.0, 3.0], atol=0.01)
+    # The spread shrinks with nu: the mean's variance is about beta / (alpha * nu).
+    np.testing.assert_allclose(draws.var(axis=0), [0.1, 0.001], rtol=0.1)
+    assert sample_posterior_means(posteriors, rng=np.random.default_rng(0)).shape == (2,)
+
+
+def test_read_posteriors_returns_every_arm_in_order():
+    client = fakeredis.FakeRedis()
+    agent = make_agent(client)
+    np.testing.assert_array_equal(agent._read_posteriors(), np.tile(BELIEF_PRIOR, (len(ARM_IDS), 1)))
+    set_belief(client, agent, "2", mu=1.5, nu=3.0, alpha=2.0, beta=4.0)
+    client.delete(agent.keys.arm("3"))
+    posteriors = agent._read_posteriors()
+    np.testing.assert_array_equal(posteriors[2], [1.5, 3.0, 2.0, 4.0])
+    assert np.isnan(posteriors[3]).all() # No beliefs: NaN, never selected
+
+
+def test_posterior_cache_reuses_the_snapshot():
+    client = fakeredis.FakeRedis()
+    agent = make_agent(client, posterior_cache_ttl=60.0)
+    first = agent._read_posteriors()
+    set_belief(client, agent, "1", mu=9.0)
+    assert agent._read_posteriors() is first
+
+
+def test_select_arm_picks_the_clear_best_arm():
+    client = fakeredis.FakeRedis()
+    agent = make_agent(client)
+    for arm_id, mu in zip(ARM_IDS, [0.0, 5.0, 1.0, 2.0]):
+        set_belief(client, agent, arm_id, mu)
+    assert {agent.select_arm() for _ in range(20)} == {"1"}
+    assert agent.select_arms(500) == {"1": 500}
+
+
+def test_select_arm_skips_arms_without_beliefs():
+    client = fakeredis.FakeRedis()
+    agent = make_agent(client)
+    set_belief(client, agent, "0", mu=0.0)
+    set_belief(client, agent, "1", mu=5.0)
+    set_belief(client, agent, "2", mu=1.0)
+    client.delete(agent.keys.arm("1"))
+    assert set(agent.select_arms(300)) <= {"0", "2", "3"}
+
+
+def test_forced_exploration_ignores_the_beliefs():
+    client = fakeredis.FakeRedis()
+    agent = make_agent(client)
+    set_belief(client, agent, "1", mu=5.0)
+    np.random.seed(0)
+    counts = agent.select_arms(4000, mode="FORCED_EXPLORATION")
+    assert sum(counts.values()) == 4000
+    assert set(counts) == set(ARM_IDS)
+    assert min(counts.values()) > 800
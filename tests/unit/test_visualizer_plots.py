@@ -0,0 +1,25 @@
+# tests/unit/test_visualizer_plots.py
+
+import numpy as np
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+import app  # noqa: E402
+
+ARM_IDS = ["0", "1", "2"]
+
+
+def test_arms_without_beliefs_keep_their_place_on_the_x_axis(monkeypatch):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(app, "redis_client", client)
+    monkeypatch.setattr(app, "BELIEF_STORAGE", "hash")
+    for arm_id in ("0", "2"): # Arm 1 has no beliefs yet
+        client.hset(app.KEYS.arm(arm_id), mapping={"mu": 1.0, "nu": 5.0, "alpha": 3.0, "beta": 2.0, "epoch": 0})
+
+    *densities, box = app.get_agent_beliefs_plot_data(ARM_IDS)
+    assert [trace['name'] for trace in densities] == ["Arm 0", "Arm 2"]
+    # Each outline is symmetric around its arm's tick.
+    assert [np.mean(trace['x']) for trace in densities] == pytest.approx([0.0, 2.0], abs=1e-3)
+    assert box['x'] == [0, 2]
+    assert app.xaxis(ARM_IDS)['tickvals'] == [0, 1, 2]